@@ -1,5 +1,5 @@
 from flask import jsonify, jsonify
-from flask import Flask, render_template, request, redirect, url_for, flash, send_file, jsonify
+from flask import Flask, render_template, request, redirect, url_for, flash, send_file, jsonify, g, make_response, session, has_request_context, Response
 from flask_login import LoginManager, UserMixin, login_user, logout_user, login_required, current_user
 from flask_wtf import FlaskForm, CSRFProtect
 from flask_limiter import Limiter
@@ -7,14 +7,19 @@ from flask_limiter.util import get_remote_address
 from wtforms import StringField, PasswordField, SelectField, TextAreaField, validators
 from wtforms.validators import DataRequired, Email, Length
 import ldap3
-from ldap3 import Server, Connection, ALL, SUBTREE, MODIFY_REPLACE, MODIFY_ADD, MODIFY_DELETE
-import bcrypt
-import redis
+from ldap3 import Server, Connection, ALL, SUBTREE, ASYNC, NO_ATTRIBUTES, AUTO_BIND_NONE, MODIFY_REPLACE, MODIFY_ADD, MODIFY_DELETE
+from ldap3.core.exceptions import LDAPBindError, LDAPCommunicationError, LDAPStartTLSError
+import importlib
 import logging
+import math
 import os
+import ssl
+import threading
+import time
 from datetime import datetime, timedelta
 import secrets
 import json
+from contextlib import contextmanager
 from functools import wraps
 from dotenv import load_dotenv
 
@@ -22,23 +27,74 @@ from dotenv import load_dotenv
 load_dotenv()
 
 # Initialize Flask app
-from tak_server import TAKServerAPI
+from cost_limiter import CostLimiter
+from ldap_concurrency import AdaptiveConcurrencyLimiter, LDAPOverloaded
+from ldap_breaker import CircuitBreaker, CircuitOpenError, retry_with_jitter
+from ldap_topology import LDAPTopology
+from ldap_hedge import HedgedSearcher, LatencyWindow
+from ldap_pool import LDAPConnectionPool, PooledConnection
+from ldap_fanout import attribute_value, search_many
+from directory_cache import DirectoryCache
+from audit_log import AuditWriter, FileSink, RedisStreamSink
+from audit_store import AuditStore, parse_since
+from event_bus import EventBus
+from metrics import REQUEST_SECONDS, REJECTED_REQUESTS, observe_ldap_span, record_snapshot, render as render_metrics
+from ldap_trace import LDAPTracer
+from profiler import RequestProfile, RollingSampler, render_collapsed, render_html
+from resource_usage import ResourceMonitor
+from traffic import TrafficRecorder
 import os
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', secrets.token_hex(32))
 app.config['WTF_CSRF_TIME_LIMIT'] = 3600
-# Initialize TAK Server API
-tak_server_api = TAKServerAPI(
-    app.config.get('TAK_SERVER_URL', 'https://opssmdtak.org'),
-    app.config.get('TAK_ADMIN_USERNAME', 'admin'),
-    app.config.get('TAK_ADMIN_PASSWORD', 'AdminPassword123!')
-)
+# RATELIMIT_ENABLED=false turns off request and LDAP budget limits (load and soak tests)
+app.config['RATELIMIT_ENABLED'] = os.environ.get('RATELIMIT_ENABLED', 'true').lower() == 'true'
+
+# Expensive resources (Redis, TAK Server API, password hashes) are built on
+# first use instead of at import, so workers boot fast and a preloaded master
+# forks before any sockets are open. Read them with get_resource(name); they
+# are also exposed as module attributes.
+_RESOURCE_FACTORIES = {}
+_resource_lock = threading.RLock()
+
+def lazy_resource(name):
+    """Register the decorated function as the factory for resource name"""
+    def decorator(factory):
+        _RESOURCE_FACTORIES[name] = factory
+        return factory
+    return decorator
+
+def get_resource(name):
+    """Return resource name, creating it on first use"""
+    module_globals = globals()
+    if name not in module_globals:
+        with _resource_lock:
+            if name not in module_globals:
+                module_globals[name] = _RESOURCE_FACTORIES[name]()
+    return module_globals[name]
 
-# Ensure directories exist
-os.makedirs("static/enrollment_packages", exist_ok=True)
-os.makedirs("static/certificates", exist_ok=True)
+def __getattr__(name):
+    if name in _RESOURCE_FACTORIES:
+        return get_resource(name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
+# Modules only some code paths need are imported on first use too. With the
+# default Redis rate limit storage the limiter imports redis at startup
+# anyway; only the client and its connection are deferred then.
+for _module in ('bcrypt', 'redis'):
+    lazy_resource(_module)(lambda _module=_module: importlib.import_module(_module))
+
+@lazy_resource('tak_server_api')
+def _create_tak_server_api():
+    from tak_server import TAKServerAPI  # pulls in requests
+    os.makedirs("static/enrollment_packages", exist_ok=True)
+    os.makedirs("static/certificates", exist_ok=True)
+    return TAKServerAPI(
+        app.config.get('TAK_SERVER_URL', 'https://opssmdtak.org'),
+        app.config.get('TAK_ADMIN_USERNAME', 'admin'),
+        app.config.get('TAK_ADMIN_PASSWORD', 'AdminPassword123!')
+    )
 
 # Security configurations
 csrf = CSRFProtect(app)
@@ -48,59 +104,218 @@ login_manager.login_view = 'login'
 login_manager.login_message = 'Please log in to access this page.'
 login_manager.login_message_category = 'info'
 
+# Redis for session storage and shared rate limit counters
+REDIS_CONFIG = {
+    'host': os.environ.get('REDIS_HOST', 'localhost'),
+    'port': int(os.environ.get('REDIS_PORT', 6379)),
+    'db': int(os.environ.get('REDIS_DB', 0))
+}
+
+@lazy_resource('redis_client')
+def _create_redis_client():
+    try:
+        client = get_resource('redis').Redis(**REDIS_CONFIG, decode_responses=True, socket_connect_timeout=0.25)
+        client.ping()
+        return client
+    except:
+        return None
+
 # Rate limiting
-limiter = Limiter(
-    app=app,
-    key_func=get_remote_address,
-    default_limits=["200 per day", "50 per hour"]
+# Counters are kept in Redis so every gunicorn worker and node shares them.
+# The moving-window strategy is a single atomic Lua call per limit, checked
+# one after another: a route with its own limit costs one round trip, a route
+# on the two default limits costs two. Redis is not contacted at import: if
+# it is unreachable the first limited request fails over to per-process
+# memory until it comes back.
+RATELIMIT_STORAGE_URI = os.environ.get(
+    'RATELIMIT_STORAGE_URI',
+    f"redis://{REDIS_CONFIG['host']}:{REDIS_CONFIG['port']}/{REDIS_CONFIG['db']}"
 )
+RATELIMIT_OPTIONS = {
+    'key_func': get_remote_address,
+    'default_limits': ["200 per day", "50 per hour"],
+    'storage_options': {'socket_connect_timeout': 0.25, 'socket_timeout': 0.25},
+    'strategy': 'moving-window',
+    'key_prefix': 'ldap-admin',
+    'in_memory_fallback_enabled': True
+}
+limiter = Limiter(app=app, storage_uri=RATELIMIT_STORAGE_URI, **RATELIMIT_OPTIONS)
 
-# Redis for session storage
-try:
-    redis_client = redis.Redis(host='localhost', port=6379, db=0, decode_responses=True)
-    redis_client.ping()
-except:
-    redis_client = None
-
-# Logging configuration
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s %(levelname)s %(name)s %(message)s',
-    handlers=[
-        logging.FileHandler('/var/log/ldap-admin.log'),
-        logging.StreamHandler()
-    ]
+# Per-user LDAP budget: endpoints spend tokens in proportion to the directory
+# work they cause, so full scans are throttled without starving cheap calls
+@lazy_resource('cost_limiter')
+def _create_cost_limiter():
+    return CostLimiter(
+        capacity=float(os.environ.get('LDAP_BUDGET_CAPACITY', 1000)),
+        refill_rate=float(os.environ.get('LDAP_BUDGET_REFILL_RATE', 5)),
+        redis_client=get_resource('redis_client')
+    )
+
+# Adaptive cap on in-flight LDAP work per worker; when slapd slows down the
+# cap shrinks and excess requests are shed with 503 instead of piling up
+ldap_concurrency = AdaptiveConcurrencyLimiter(
+    initial_limit=int(os.environ.get('LDAP_CONCURRENCY_INITIAL', 8)),
+    max_limit=int(os.environ.get('LDAP_CONCURRENCY_MAX', 32)),
+    latency_target=float(os.environ.get('LDAP_LATENCY_TARGET_MS', 500)) / 1000
 )
+
+# Logging configuration (applied by create_app)
+def configure_logging():
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s %(levelname)s %(name)s %(message)s',
+        handlers=[
+            logging.FileHandler(os.environ.get('LOG_FILE', '/var/log/ldap-admin.log')),
+            logging.StreamHandler()
+        ]
+    )
+    # LDAP operations slower than LDAP_SLOW_MS also go to their own file
+    slow_handler = logging.FileHandler(os.environ.get('LDAP_SLOW_LOG', '/var/log/ldap-admin-slow.log'))
+    slow_handler.setFormatter(logging.Formatter('%(asctime)s %(message)s'))
+    logging.getLogger('ldap_admin.slow_ldap').addHandler(slow_handler)
+
 logger = logging.getLogger(__name__)
 
+# Audit events are queued by the request thread and written in batches by a
+# background thread; see audit_log.AuditWriter for the overflow policy
+@lazy_resource('audit_log')
+def _create_audit_log():
+    sinks = [FileSink(
+        os.environ.get('AUDIT_LOG_FILE', '/var/log/ldap-admin-audit.log'),
+        max_bytes=int(os.environ.get('AUDIT_LOG_MAX_BYTES', 50 * 1024 * 1024)),
+        max_age=float(os.environ.get('AUDIT_LOG_MAX_AGE_SECONDS', 86400)),
+        backup_count=int(os.environ.get('AUDIT_LOG_BACKUPS', 14))
+    )]
+    if os.environ.get('AUDIT_DB_DIR', '/var/lib/ldap-admin/audit'):
+        sinks.append(get_resource('audit_store'))
+    if os.environ.get('AUDIT_REDIS_STREAM', 'false').lower() == 'true':
+        sinks.append(RedisStreamSink(lambda: get_resource('redis_client')))
+    return AuditWriter(
+        sinks,
+        max_queue=int(os.environ.get('AUDIT_QUEUE_SIZE', 10000)),
+        overflow=os.environ.get('AUDIT_OVERFLOW', 'drop')
+    )
+
+# Push channel for open dashboards, shared by all workers over Redis pub/sub
+@lazy_resource('event_bus')
+def _create_event_bus():
+    return EventBus(lambda: get_resource('redis_client'))
+
+# Indexed, day-partitioned copy of the audit trail behind /api/audit
+@lazy_resource('audit_store')
+def _create_audit_store():
+    return AuditStore(
+        os.environ.get('AUDIT_DB_DIR', '/var/lib/ldap-admin/audit'),
+        retention_days=int(os.environ.get('AUDIT_RETENTION_DAYS', 365))
+    )
+
 # LDAP Configuration
+def ldap_socket_timeout(seconds):
+    """Receive timeout as ldap3 accepts it: whole seconds, at least 1"""
+    return max(1, math.ceil(seconds))
+
 LDAP_CONFIG = {
     'server': os.environ.get('LDAP_SERVER', 'ldap://localhost:389'),
     'base_dn': os.environ.get('LDAP_BASE_DN', 'dc=tak,dc=local'),
     'admin_dn': os.environ.get('LDAP_ADMIN_DN', 'cn=admin,dc=tak,dc=local'),
     'admin_password': os.environ.get('LDAP_ADMIN_PASSWORD', 'takserver123'),
     'users_ou': 'ou=users',
-    'groups_ou': 'ou=groups'
+    'groups_ou': 'ou=groups',
+    'connect_timeout': float(os.environ.get('LDAP_CONNECT_TIMEOUT', 3)),
+    'receive_timeout': float(os.environ.get('LDAP_RECEIVE_TIMEOUT', 10)),
+    'read_retries': int(os.environ.get('LDAP_READ_RETRIES', 2)),
+    'replicas': [url.strip() for url in os.environ.get('LDAP_REPLICAS', '').split(',') if url.strip()],
+    'read_your_writes_window': float(os.environ.get('LDAP_READ_YOUR_WRITES_SECONDS', 10)),
+    'hedge_reads': os.environ.get('LDAP_HEDGE_READS', 'false').lower() == 'true',
+    'hedge_min_delay': float(os.environ.get('LDAP_HEDGE_MIN_DELAY_MS', 20)) / 1000,
+    'start_tls': os.environ.get('LDAP_START_TLS', 'false').lower() == 'true',
+    'ca_cert': os.environ.get('LDAP_CA_CERT'),
+    'tls_pin_sha256': os.environ.get('LDAP_TLS_PIN_SHA256'),
+    'pool_max_idle': float(os.environ.get('LDAP_POOL_MAX_IDLE_SECONDS', 30)),
+    'listing_cache_seconds': float(os.environ.get('LDAP_LISTING_CACHE_SECONDS', 0))
 }
 
+# ldap3 sets the receive timeout as SO_RCVTIMEO with struct.pack('LL', ...),
+# so sockets wait whole seconds; multiplexed searches wait the exact value
+if LDAP_CONFIG['receive_timeout'] <= 0:
+    raise ValueError(f"LDAP_RECEIVE_TIMEOUT must be positive, got {LDAP_CONFIG['receive_timeout']}")
+if LDAP_CONFIG['receive_timeout'] != ldap_socket_timeout(LDAP_CONFIG['receive_timeout']):
+    logger.warning(f"LDAP_RECEIVE_TIMEOUT={LDAP_CONFIG['receive_timeout']} is applied to LDAP sockets as "
+                   f"{ldap_socket_timeout(LDAP_CONFIG['receive_timeout'])} s")
+
+# Offline mode: LDAP_MODE=demo serves every connection from an in-process
+# directory of synthetic TAK users and groups instead of LDAP_SERVER
+LDAP_DEMO_MODE = os.environ.get('LDAP_MODE', 'server').lower() == 'demo'
+
+@lazy_resource('demo_directory')
+def _create_demo_directory():
+    from demo_directory import open_demo_directory
+    return open_demo_directory(
+        LDAP_CONFIG['base_dn'],
+        LDAP_CONFIG['admin_dn'],
+        LDAP_CONFIG['admin_password'],
+        users=int(os.environ.get('DEMO_USERS', 1000)),
+        groups=int(os.environ.get('DEMO_GROUPS', 100)),
+        seed=int(os.environ.get('DEMO_SEED', 0)),
+        snapshot=os.environ.get('DEMO_SNAPSHOT')
+    )
+
+# TLS via ldaps:// URLs or StartTLS. The CA in LDAP_CA_CERT is the only trust
+# anchor, and sessions are resumed across reconnects. Encrypted connections
+# are pooled by default so the handshake is paid per connection, not per
+# request.
+LDAP_TLS_ENABLED = LDAP_CONFIG['start_tls'] or any(
+    url.startswith('ldaps://') for url in [LDAP_CONFIG['server']] + LDAP_CONFIG['replicas']
+)
+LDAP_CONFIG['pool_size'] = int(os.environ.get('LDAP_POOL_SIZE', 4 if LDAP_TLS_ENABLED else 0))
+if LDAP_TLS_ENABLED:
+    from ldap_tls import ResumableTls
+    ldap_tls = ResumableTls(
+        validate=ssl.CERT_REQUIRED,
+        ca_certs_file=LDAP_CONFIG['ca_cert'],
+        pin_sha256=LDAP_CONFIG['tls_pin_sha256']
+    )
+else:
+    ldap_tls = None
+
+# LDAP_CONFIG['server'] is the provider and takes all writes; reads are spread
+# over LDAP_REPLICAS. Each server gets its own circuit breaker so an outage
+# fails requests immediately instead of each one waiting out the timeout.
+ldap_topology = LDAPTopology(
+    LDAP_CONFIG['server'],
+    LDAP_CONFIG['replicas'],
+    breaker_factory=lambda: CircuitBreaker(
+        failure_threshold=int(os.environ.get('LDAP_BREAKER_THRESHOLD', 5)),
+        reset_timeout=float(os.environ.get('LDAP_BREAKER_RESET_SECONDS', 30))
+    )
+)
+ldap_breaker = ldap_topology.breakers[LDAP_CONFIG['server']]
+
 # Admin users configuration (move to database in production)
-ADMIN_USERS = {
-    'admin': {
-        'password_hash': bcrypt.hashpw(b'admin123', bcrypt.gensalt()),
-        'role': 'super_admin',
-        'name': 'System Administrator'
-    },
-    'operator': {
-        'password_hash': bcrypt.hashpw(b'operator123', bcrypt.gensalt()),
-        'role': 'operator',
-        'name': 'LDAP Operator'
-    },
-    'viewer': {
-        'password_hash': bcrypt.hashpw(b'viewer123', bcrypt.gensalt()),
-        'role': 'viewer',
-        'name': 'Read Only User'
+@lazy_resource('ADMIN_USERS')
+def _create_admin_users():
+    bcrypt = get_resource('bcrypt')
+    return {
+        'admin': {
+            'password_hash': bcrypt.hashpw(b'admin123', bcrypt.gensalt()),
+            'role': 'super_admin',
+            'name': 'System Administrator'
+        },
+        'operator': {
+            'password_hash': bcrypt.hashpw(b'operator123', bcrypt.gensalt()),
+            'role': 'operator',
+            'name': 'LDAP Operator'
+        },
+        'viewer': {
+            'password_hash': bcrypt.hashpw(b'viewer123', bcrypt.gensalt()),
+            'role': 'viewer',
+            'name': 'Read Only User'
+        }
     }
-}
+
+# Forget resources cached by a previous import (importlib.reload)
+for _name in _RESOURCE_FACTORIES:
+    globals().pop(_name, None)
 
 # User class for Flask-Login
 class User(UserMixin):
@@ -121,8 +336,9 @@ class User(UserMixin):
 
 @login_manager.user_loader
 def load_user(username):
-    if username in ADMIN_USERS:
-        user_data = ADMIN_USERS[username]
+    admin_users = get_resource('ADMIN_USERS')
+    if username in admin_users:
+        user_data = admin_users[username]
         return User(username, user_data['role'], user_data['name'])
     return None
 
@@ -139,22 +355,307 @@ def role_required(*roles):
         return decorated_function
     return decorator
 
+# LDAP cost accounting decorator
+def ldap_cost(base, per_entry=0):
+    """Charge base tokens up front and per_entry tokens per result in g.ldap_result_size.
+
+    The base is refunded when ldap_guard sheds the request before it reaches LDAP.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            if not (limiter.enabled and app.config.get('RATELIMIT_ENABLED', True)):
+                return f(*args, **kwargs)
+            key = current_user.username if current_user.is_authenticated else get_remote_address()
+            allowed, retry_after = get_resource('cost_limiter').consume(key, base)
+            if not allowed:
+                log_action('ldap_budget_exceeded', f'{request.endpoint} cost {base}')
+                REJECTED_REQUESTS.labels('ldap_cost', request.endpoint).inc()
+                if request.path.startswith('/api/'):
+                    response = jsonify({'error': 'LDAP budget exceeded', 'retry_after': retry_after})
+                else:
+                    response = make_response(render_template('error.html', error_code=429, error_message="Rate limit exceeded"))
+                response.status_code = 429
+                response.headers['Retry-After'] = str(retry_after)
+                return response
+            g.ldap_result_size = 0
+            g.ldap_shed = False
+            response = f(*args, **kwargs)
+            if g.ldap_shed:
+                get_resource('cost_limiter').refund(key, base)
+            else:
+                get_resource('cost_limiter').charge(key, per_entry * g.ldap_result_size)
+            return response
+        return decorated_function
+    return decorator
+
+# LDAP load shedding decorator
+def ldap_guard(f):
+    """Run the view in an LDAP concurrency slot, failing fast with 503 when none is free"""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        try:
+            with ldap_concurrency.slot() as slot:
+                response = f(*args, **kwargs)
+                status = response[1] if isinstance(response, tuple) else getattr(response, 'status_code', 200)
+                slot.success = status < 500
+                return response
+        except LDAPOverloaded as e:
+            logger.warning(f"Shedding {request.endpoint}: {str(e)}")
+            g.ldap_shed = True
+            REJECTED_REQUESTS.labels('ldap_concurrency', request.endpoint).inc()
+            if request.path.startswith('/api/'):
+                response = jsonify({'error': 'LDAP backend busy', 'retry_after': e.retry_after})
+            else:
+                response = make_response(render_template('error.html', error_code=503, error_message="Directory service busy, please retry"))
+            response.status_code = 503
+            response.headers['Retry-After'] = str(e.retry_after)
+            return response
+    return decorated_function
+
+def observe_replica_latency(span):
+    """LDAPTracer listener keeping server latency current while pooled connections are reused"""
+    if span.name == 'search' and 'server' in span.attributes and not span.failed:
+        ldap_topology.record_latency(span.attributes['server'], span.duration)
+
+# Every LDAP step is traced; spans feed /metrics, the slow-query log and,
+# with LDAP_TRACE_FILE set, an OTLP/JSON trace file
+ldap_tracer = LDAPTracer(
+    slow_threshold=float(os.environ.get('LDAP_SLOW_MS', 200)) / 1000,
+    exporter=AuditWriter([FileSink(os.environ['LDAP_TRACE_FILE'])]) if os.environ.get('LDAP_TRACE_FILE') else None,
+    listeners=[observe_ldap_span, observe_replica_latency]
+)
+
 # LDAP Helper Functions
-def get_ldap_connection():
-    """Get LDAP connection"""
+def _open_ldap_connection(url, **options):
+    """Open and bind a new LDAP connection to url"""
+    if LDAP_DEMO_MODE:
+        with ldap_tracer.span('bind', server='demo', dn=LDAP_CONFIG['admin_dn']):
+            conn = get_resource('demo_directory').connect(asynchronous=options.get('client_strategy') == ASYNC)
+        return ldap_tracer.instrument(conn)
+    start = time.monotonic()
+    server = Server(url, get_info=ALL, connect_timeout=LDAP_CONFIG['connect_timeout'], tls=ldap_tls)
+    conn = Connection(
+        server,
+        LDAP_CONFIG['admin_dn'],
+        LDAP_CONFIG['admin_password'],
+        auto_bind=AUTO_BIND_NONE,
+        receive_timeout=ldap_socket_timeout(LDAP_CONFIG['receive_timeout']),
+        **options
+    )
+    # Connect, StartTLS and bind are separate steps so each gets its own span
+    with ldap_tracer.span('connect', server=url):
+        conn.open(read_server_info=False)
+    if LDAP_CONFIG['start_tls'] and not url.startswith('ldaps://'):
+        with ldap_tracer.span('start_tls', server=url):
+            if not conn.start_tls(read_server_info=False):
+                conn.unbind()
+                raise LDAPStartTLSError(f"StartTLS to {url} failed: {conn.last_error}")
+    with ldap_tracer.span('bind', server=url, dn=LDAP_CONFIG['admin_dn']):
+        conn.bind(read_server_info=True)
+    if not conn.bound:
+        conn.unbind()
+        raise LDAPBindError(f"Bind to {url} failed: {conn.last_error}")
+    ldap_topology.record_latency(url, time.monotonic() - start)
+    return ldap_tracer.instrument(conn, server=url)
+
+def mark_ldap_write():
+    """Pin this session's reads to the provider until replicas have caught up"""
+    session['ldap_ryw_until'] = time.time() + LDAP_CONFIG['read_your_writes_window']
+    if directory_cache:
+        directory_cache.invalidate()
+
+def _reads_pinned_to_provider():
+    return has_request_context() and session.get('ldap_ryw_until', 0) > time.time()
+
+def get_ldap_connection(readonly=False, asynchronous=False):
+    """Get LDAP connection through the circuit breaker; read-only callers retry with jitter.
+
+    asynchronous=True returns an ldap3 ASYNC connection for use with search_many().
+    """
+    attempts = LDAP_CONFIG['read_retries'] + 1 if readonly else 1
+    use_replicas = readonly and not _reads_pinned_to_provider()
+    pool = ldap_async_pool if asynchronous else ldap_pool
+    options = {'client_strategy': ASYNC} if asynchronous else {}
+    tried = []
+
+    def connect():
+        url = ldap_topology.read_server(exclude=tried) if use_replicas else ldap_topology.write_server()
+        tried.append(url)
+        if pool:
+            return pool.acquire(url)
+        return ldap_topology.breakers[url].call(_open_ldap_connection, url, **options)
+
     try:
-        server = Server(LDAP_CONFIG['server'], get_info=ALL)
-        conn = Connection(
-            server,
-            LDAP_CONFIG['admin_dn'],
-            LDAP_CONFIG['admin_password'],
-            auto_bind=True
-        )
-        return conn
+        return retry_with_jitter(connect, attempts=attempts)
+    except CircuitOpenError as e:
+        logger.warning(f"LDAP connection failed: {str(e)}")
+        return None
     except Exception as e:
         logger.error(f"LDAP connection failed: {str(e)}")
         return None
 
+@contextmanager
+def ldap_connection(readonly=False, asynchronous=False):
+    """get_ldap_connection() for a with block; yields None when no connection could be made.
+
+    The connection is released on every way out of the block. When the
+    block raised, a pooled connection is closed instead of going back to
+    the pool, since replies may still be in flight on it.
+    """
+    conn = get_ldap_connection(readonly=readonly, asynchronous=asynchronous)
+    failed = False
+    try:
+        yield conn
+    except Exception:
+        failed = True
+        raise
+    finally:
+        if conn:
+            try:
+                if failed and isinstance(conn, PooledConnection):
+                    conn.discard()
+                else:
+                    conn.unbind()
+            except Exception as e:
+                logger.warning(f"Releasing LDAP connection failed: {str(e)}")
+
+# Long-lived connections reused across requests; unbind() on a pooled
+# connection returns it to the pool
+ldap_pool = LDAPConnectionPool(
+    lambda url: ldap_topology.breakers[url].call(_open_ldap_connection, url),
+    max_size=LDAP_CONFIG['pool_size'],
+    max_idle=LDAP_CONFIG['pool_max_idle'],
+    on_release=ldap_tls.remember_session if ldap_tls else None
+) if LDAP_CONFIG['pool_size'] else None
+ldap_async_pool = LDAPConnectionPool(
+    lambda url: ldap_topology.breakers[url].call(_open_ldap_connection, url, client_strategy=ASYNC),
+    max_size=LDAP_CONFIG['pool_size'],
+    max_idle=LDAP_CONFIG['pool_max_idle'],
+    on_release=ldap_tls.remember_session if ldap_tls else None
+) if LDAP_CONFIG['pool_size'] else None
+
+def _open_async_ldap_connection(url):
+    if ldap_async_pool:
+        return ldap_async_pool.acquire(url)
+    return ldap_topology.breakers[url].call(_open_ldap_connection, url, client_strategy=ASYNC)
+
+# Hedged reads: a listing search that has not answered within the recent p95
+# is re-issued to a second replica and the slower one is abandoned
+ldap_hedger = HedgedSearcher(
+    _open_async_ldap_connection,
+    timeout=LDAP_CONFIG['receive_timeout'],
+    window=LatencyWindow(min_budget=LDAP_CONFIG['hedge_min_delay'])
+)
+
+def hedged_read_servers():
+    """Two distinct replicas to hedge a read across, or None when hedging does not apply"""
+    if not LDAP_CONFIG['hedge_reads'] or _reads_pinned_to_provider():
+        return None
+    first = ldap_topology.read_server()
+    second = ldap_topology.read_server(exclude=[first])
+    return [first, second] if second != first else None
+
+def load_directory():
+    """(user entries, group entries) for everything the listings show"""
+    searches = directory_searches(user_attributes=USER_LISTING_ATTRIBUTES, group_attributes=GROUP_LISTING_ATTRIBUTES)
+    hedge_servers = hedged_read_servers()
+    if hedge_servers:
+        return ldap_hedger.search_many(hedge_servers, searches)[0]
+    with ldap_connection(readonly=True, asynchronous=True) as conn:
+        if not conn:
+            raise LDAPCommunicationError('LDAP connection failed')
+        return search_many(conn, searches, timeout=LDAP_CONFIG['receive_timeout'])
+
+# Listings served from a compact per-worker copy of the directory for
+# LDAP_LISTING_CACHE_SECONDS (off by default). A write drops this worker's
+# copy; sessions that just wrote read the directory until replicas catch up
+directory_cache = DirectoryCache(
+    load_directory, LDAP_CONFIG['listing_cache_seconds']
+) if LDAP_CONFIG['listing_cache_seconds'] > 0 else None
+
+def cached_directory():
+    """The listing cache's snapshot, or None when listings should search"""
+    if directory_cache is None or _reads_pinned_to_provider():
+        return None
+    return directory_cache.get()
+
+def directory_searches(user_attributes=None, group_attributes=None):
+    """Search definitions for all users and all groups"""
+    return [
+        dict(search_base=f"{LDAP_CONFIG['users_ou']},{LDAP_CONFIG['base_dn']}", search_filter='(objectClass=inetOrgPerson)',
+             search_scope=SUBTREE, attributes=user_attributes or [NO_ATTRIBUTES]),
+        dict(search_base=f"{LDAP_CONFIG['groups_ou']},{LDAP_CONFIG['base_dn']}", search_filter='(objectClass=groupOfNames)',
+             search_scope=SUBTREE, attributes=group_attributes or [NO_ATTRIBUTES])
+    ]
+
+def directory_counts(conn):
+    """Count users and groups with both searches in flight at once"""
+    users, groups = search_many(conn, directory_searches(), timeout=LDAP_CONFIG['receive_timeout'])
+    return len(users), len(groups)
+
+# Counting means scanning every user and group, far more work than the write
+# itself, so writes push a delta and a worker recounts at most once per
+# STATS_RESCAN_SECONDS to correct any drift
+STATS_RESCAN_SECONDS = float(os.environ.get('STATS_RESCAN_SECONDS', 60))
+_stats_rescan = {'at': float('-inf')}
+_stats_rescan_lock = threading.Lock()
+
+def publish_directory_change(conn, action, delta, **details):
+    """Push a directory change and the change in counts to subscribed browsers"""
+    try:
+        bus = get_resource('event_bus')
+        bus.publish('directory', dict(action=action, **details))
+        now = time.monotonic()
+        with _stats_rescan_lock:
+            rescan = now - _stats_rescan['at'] >= STATS_RESCAN_SECONDS
+            if rescan:
+                _stats_rescan['at'] = now
+        if rescan:
+            users, groups = directory_counts(conn)
+            bus.publish('stats', {'users': users, 'groups': groups, 'status': 'connected'})
+        else:
+            bus.publish('stats', {'delta': delta, 'status': 'connected'})
+    except Exception as e:
+        logger.warning(f"Failed to publish {action} event: {str(e)}")
+
+# Only what the listings return: every attribute asked for is decoded by
+# ldap3 for every entry, whether or not anything reads it
+USER_LISTING_ATTRIBUTES = ['uid', 'givenName', 'sn', 'mail']
+GROUP_LISTING_ATTRIBUTES = ['cn', 'description', 'member']
+
+def user_records(user_entries, membership):
+    """Listing records straight from raw search response entries.
+
+    Raw response dicts rather than conn.entries: ldap3 builds an Entry with
+    an attribute wrapper per attribute on first access to conn.entries,
+    which costs more than the rest of the listing together.
+    """
+    return [{
+        'username': attribute_value(entry['attributes'], 'uid'),
+        'first_name': attribute_value(entry['attributes'], 'givenName'),
+        'last_name': attribute_value(entry['attributes'], 'sn'),
+        'email': attribute_value(entry['attributes'], 'mail'),
+        'groups': membership.get(entry['dn'].lower(), [])
+    } for entry in user_entries]
+
+def group_records(group_entries):
+    """Group listing records from raw search response entries"""
+    return [{
+        'name': attribute_value(entry['attributes'], 'cn'),
+        'description': attribute_value(entry['attributes'], 'description'),
+        'member_count': len(entry['attributes'].get('member') or [])
+    } for entry in group_entries]
+
+def group_membership(group_entries):
+    """Map each member DN (lowercased) to the names of the groups listing it"""
+    membership = {}
+    for entry in group_entries:
+        name = attribute_value(entry['attributes'], 'cn')
+        for member in entry['attributes'].get('member') or []:
+            membership.setdefault(str(member).lower(), []).append(name)
+    return membership
+
 def log_action(action, details=""):
     """Log user actions"""
     log_entry = {
@@ -164,7 +665,137 @@ def log_action(action, details=""):
         'details': details,
         'ip': request.remote_addr
     }
-    logger.info(f"Action: {json.dumps(log_entry)}")
+    get_resource('audit_log').emit(log_entry)
+
+# Request metrics
+_metrics_refreshed = 0.0
+
+def refresh_component_metrics():
+    """Copy pool, limiter, breaker and queue snapshots into the component gauges"""
+    global _metrics_refreshed
+    _metrics_refreshed = time.monotonic()
+    components = {
+        'ldap_pool': ldap_pool,
+        'ldap_async_pool': ldap_async_pool,
+        'ldap_concurrency': ldap_concurrency,
+        'ldap_hedge': ldap_hedger,
+        'ldap_tls': ldap_tls,
+        # Lazy resources are only reported once something has created them
+        'audit_log': globals().get('audit_log'),
+        'event_bus': globals().get('event_bus'),
+        'traffic_recorder': traffic_recorder,
+        'directory_cache': directory_cache
+    }
+    for name, component in components.items():
+        if component is not None:
+            record_snapshot(name, component.snapshot())
+    for url, breaker in ldap_topology.breakers.items():
+        record_snapshot(f'ldap_breaker:{url}', breaker.snapshot())
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+    g.request_started_at = time.time()
+
+@app.after_request
+def record_request_metrics(response):
+    started = g.pop('request_started', None)
+    if started is not None:
+        REQUEST_SECONDS.labels(
+            request.endpoint or 'unmatched', request.method, str(response.status_code)
+        ).observe(time.perf_counter() - started)
+    # Each worker refreshes its component gauges at most once a second
+    if time.monotonic() - _metrics_refreshed > 1.0:
+        refresh_component_metrics()
+    return response
+
+@app.after_request
+def finish_ldap_trace(response):
+    """Summarise the request's LDAP spans in Server-Timing and export them"""
+    spans = g.pop('ldap_spans', None)
+    if spans:
+        ldap_ms = sum(span.duration for span in spans) * 1000
+        response.headers.add('Server-Timing', f'ldap;dur={ldap_ms:.1f};desc="{len(spans)} LDAP steps"')
+        ldap_tracer.export(
+            f"{request.method} {request.url_rule or request.path}",
+            g.get('request_started_at', spans[0].start), time.time(), spans,
+            traceparent=request.headers.get('traceparent'),
+            attributes={
+                'http.request.method': request.method,
+                'http.route': str(request.url_rule or ''),
+                'http.response.status_code': response.status_code,
+                'enduser.id': current_user.username if current_user.is_authenticated else 'anonymous'
+            }
+        )
+    return response
+
+# Profiling: super_admins can profile any request with ?__profile=1 (or
+# =cprofile), or an X-Profile header; a rolling sampler watches the threads
+# currently serving requests
+_request_threads = set()
+rolling_sampler = RollingSampler(
+    lambda: list(_request_threads),
+    interval=float(os.environ.get('PROFILER_SAMPLE_INTERVAL', 0.02)),
+    window=int(os.environ.get('PROFILER_WINDOW_SECONDS', 300))
+)
+# Descriptor, socket and allocation counts per worker, for leak hunting in
+# soak runs; allocations are listed once tracing is on (?trace=1)
+resource_monitor = ResourceMonitor(top=int(os.environ.get('PROFILER_RESOURCE_TOP', 10)))
+
+@app.before_request
+def start_profiling():
+    _request_threads.add(threading.get_ident())
+    if os.environ.get('PROFILER_ROLLING', 'true').lower() == 'true':
+        rolling_sampler.ensure_started()
+    mode = request.args.get('__profile') or request.headers.get('X-Profile')
+    if mode and current_user.is_authenticated and current_user.role == 'super_admin':
+        g.profile = RequestProfile(mode)
+        g.profile.start()
+
+@app.after_request
+def finish_profiling(response):
+    """Replace the response with the profile when one was requested"""
+    profile = g.pop('profile', None)
+    if profile is None:
+        return response
+    profile.stop()
+    fmt = request.args.get('__profile_format') or request.headers.get('X-Profile-Format', '')
+    body, mimetype = profile.render(fmt, f"{request.method} {request.full_path}")
+    log_action('profile_request', f'{profile.mode} profile of {request.path}')
+    report = Response(body, mimetype=mimetype)
+    report.headers['X-Profile-Status'] = str(response.status_code)
+    if mimetype == 'text/plain' and profile.mode == 'sample':
+        report.headers['Content-Disposition'] = f'attachment; filename="{request.endpoint or "request"}.folded"'
+    return report
+
+@app.teardown_request
+def stop_sampling_request(exc):
+    _request_threads.discard(threading.get_ident())
+
+# Traffic recording: with TRAFFIC_RECORD_FILE set, a sanitized trace of each
+# request (TRAFFIC_RECORD_SAMPLE of them) is written for benchmarks/replay.py
+traffic_recorder = TrafficRecorder(
+    AuditWriter([FileSink(os.environ['TRAFFIC_RECORD_FILE'])]),
+    sample_rate=float(os.environ.get('TRAFFIC_RECORD_SAMPLE', 1.0)),
+    # Shared by preloaded workers; set it to line up pseudonyms across restarts
+    salt=os.environ.get('TRAFFIC_RECORD_SALT', '').encode() or None
+) if os.environ.get('TRAFFIC_RECORD_FILE') else None
+
+@app.after_request
+def record_traffic(response):
+    if traffic_recorder is None or not traffic_recorder.wants(request, response):
+        return response
+    try:
+        started = g.get('request_started')
+        traffic_recorder.record(
+            request, response,
+            current_user.role if current_user.is_authenticated else 'anonymous',
+            g.get('request_started_at', time.time()),
+            time.perf_counter() - started if started is not None else 0.0
+        )
+    except Exception as e:
+        logger.error(f"Failed to record request trace: {str(e)}")
+    return response
 
 # Forms
 class LoginForm(FlaskForm):
@@ -199,10 +830,11 @@ def login():
         username = form.username.data.lower().strip()
         password = form.password.data.encode('utf-8')
         
-        if username in ADMIN_USERS:
-            stored_hash = ADMIN_USERS[username]['password_hash']
-            if bcrypt.checkpw(password, stored_hash):
-                user_data = ADMIN_USERS[username]
+        admin_users = get_resource('ADMIN_USERS')
+        if username in admin_users:
+            stored_hash = admin_users[username]['password_hash']
+            if get_resource('bcrypt').checkpw(password, stored_hash):
+                user_data = admin_users[username]
                 user = User(username, user_data['role'], user_data['name'])
                 login_user(user, remember=True)
                 log_action('login_success')
@@ -225,30 +857,17 @@ def logout():
 
 @app.route('/')
 @login_required
+@ldap_cost(10, per_entry=0.01)
+@ldap_guard
 def dashboard():
     try:
         # Get statistics
-        conn = get_ldap_connection()
         stats = {'users': 0, 'groups': 0, 'status': 'disconnected'}
-        
-        if conn:
-            # Count users
-            conn.search(
-                f"{LDAP_CONFIG['users_ou']},{LDAP_CONFIG['base_dn']}",
-                '(objectClass=inetOrgPerson)',
-                SUBTREE
-            )
-            stats['users'] = len(conn.entries)
-            
-            # Count groups
-            conn.search(
-                f"{LDAP_CONFIG['groups_ou']},{LDAP_CONFIG['base_dn']}",
-                '(objectClass=groupOfNames)',
-                SUBTREE
-            )
-            stats['groups'] = len(conn.entries)
-            stats['status'] = 'connected'
-            conn.unbind()
+        with ldap_connection(readonly=True, asynchronous=True) as conn:
+            if conn:
+                stats['users'], stats['groups'] = directory_counts(conn)
+                stats['status'] = 'connected'
+                g.ldap_result_size = stats['users'] + stats['groups']
         
         return render_template('dashboard.html', stats=stats)
     except Exception as e:
@@ -275,31 +894,32 @@ def settings():
 @app.route('/api/users', methods=['GET'])
 @login_required
 @limiter.limit("20 per minute")
+@ldap_cost(10, per_entry=0.1)
+@ldap_guard
 def api_get_users():
     try:
-        conn = get_ldap_connection()
-        if not conn:
-            return jsonify({'error': 'LDAP connection failed'}), 500
-        
-        conn.search(
-            f"{LDAP_CONFIG['users_ou']},{LDAP_CONFIG['base_dn']}",
-            '(objectClass=inetOrgPerson)',
-            SUBTREE,
-            attributes=['cn', 'sn', 'givenName', 'mail', 'uid', 'displayName']
-        )
-        
-        users = []
-        for entry in conn.entries:
-            user_data = {
-                'username': str(entry.uid) if entry.uid else '',
-                'first_name': str(entry.givenName) if entry.givenName else '',
-                'last_name': str(entry.sn) if entry.sn else '',
-                'email': str(entry.mail) if entry.mail else '',
-		'groups': [str(group).split(',')[0].replace('cn=', '') for group in getattr(entry, 'memberOf', [])]
-            }
-            users.append(user_data)
-        
-        conn.unbind()
+        snapshot = cached_directory()
+        if snapshot:
+            with ldap_tracer.span('materialize', entries=len(snapshot.uids), cached=True):
+                users = snapshot.users()
+        else:
+            # Users and groups are fetched together; membership comes from the groups
+            searches = directory_searches(
+                user_attributes=USER_LISTING_ATTRIBUTES,
+                group_attributes=['cn', 'member']
+            )
+            hedge_servers = hedged_read_servers()
+            if hedge_servers:
+                (user_entries, group_entries), _ = ldap_hedger.search_many(hedge_servers, searches)
+            else:
+                with ldap_connection(readonly=True, asynchronous=True) as conn:
+                    if not conn:
+                        return jsonify({'error': 'LDAP connection failed'}), 500
+                    user_entries, group_entries = search_many(conn, searches, timeout=LDAP_CONFIG['receive_timeout'])
+
+            with ldap_tracer.span('materialize', entries=len(user_entries) + len(group_entries)):
+                users = user_records(user_entries, group_membership(group_entries))
+        g.ldap_result_size = len(users)
         log_action('list_users', f'Retrieved {len(users)} users')
         return jsonify(users)
         
@@ -310,6 +930,8 @@ def api_get_users():
 @app.route('/api/users', methods=['POST'])
 @role_required('super_admin', 'operator')
 @limiter.limit("10 per minute")
+@ldap_cost(5)
+@ldap_guard
 def api_add_user():
     try:
         data = request.get_json()
@@ -320,95 +942,102 @@ def api_add_user():
             if not data.get(field):
                 return jsonify({'error': f'Missing required field: {field}'}), 400
         
-        conn = get_ldap_connection()
-        if not conn:
-            return jsonify({'error': 'LDAP connection failed'}), 500
+        with ldap_connection() as conn:
+            if not conn:
+                return jsonify({'error': 'LDAP connection failed'}), 500
         
-        username = data['username'].lower().strip()
-        user_dn = f"uid={username},{LDAP_CONFIG['users_ou']},{LDAP_CONFIG['base_dn']}"
+            username = data['username'].lower().strip()
+            user_dn = f"uid={username},{LDAP_CONFIG['users_ou']},{LDAP_CONFIG['base_dn']}"
         
-        # Check if user already exists
-        if conn.search(user_dn, '(objectClass=*)'):
-            return jsonify({'error': 'User already exists'}), 409
+            # Check if user already exists
+            if conn.search(user_dn, '(objectClass=*)'):
+                return jsonify({'error': 'User already exists'}), 409
         
-        # Create user entry
-        user_attrs = {
-            'objectClass': ['inetOrgPerson', 'posixAccount'],
-            'uid': username,
-            'cn': f"{data['first_name']} {data['last_name']}",
-            'sn': data['last_name'],
-            'givenName': data['first_name'],
-            'mail': data['email'],
-            'userPassword': data['password'],  # LDAP will hash this
-            'uidNumber': str(hash(username) % 10000 + 1000),
-            'gidNumber': '1000',
-            'homeDirectory': f'/home/{username}',
-            'loginShell': '/bin/bash'
-        }
+            # Create user entry
+            user_attrs = {
+                'objectClass': ['inetOrgPerson', 'posixAccount'],
+                'uid': username,
+                'cn': f"{data['first_name']} {data['last_name']}",
+                'sn': data['last_name'],
+                'givenName': data['first_name'],
+                'mail': data['email'],
+                'userPassword': data['password'],  # LDAP will hash this
+                'uidNumber': str(hash(username) % 10000 + 1000),
+                'gidNumber': '1000',
+                'homeDirectory': f'/home/{username}',
+                'loginShell': '/bin/bash'
+            }
         
-        if conn.add(user_dn, attributes=user_attrs):
-            log_action('add_user', f'Added user: {username}')
-            return jsonify({'success': True, 'message': 'User added successfully'})
-        else:
-            return jsonify({'error': 'Failed to add user to LDAP'}), 500
+            if conn.add(user_dn, attributes=user_attrs):
+                mark_ldap_write()
+                log_action('add_user', f'Added user: {username}')
+                publish_directory_change(conn, 'user_added', {'users': 1}, username=username, user={
+                    'username': username,
+                    'first_name': data['first_name'],
+                    'last_name': data['last_name'],
+                    'email': data['email'],
+                    'groups': []
+                })
+                return jsonify({'success': True, 'message': 'User added successfully'})
+            else:
+                return jsonify({'error': 'Failed to add user to LDAP'}), 500
             
     except Exception as e:
         logger.error(f"Error adding user: {str(e)}")
         return jsonify({'error': 'Failed to add user'}), 500
-    finally:
-        if 'conn' in locals():
-            conn.unbind()
 
 @app.route('/api/users/<username>', methods=['DELETE'])
 @role_required('super_admin')
 @limiter.limit("5 per minute")
+@ldap_cost(5)
+@ldap_guard
 def api_delete_user(username):
     try:
-        conn = get_ldap_connection()
-        if not conn:
-            return jsonify({'error': 'LDAP connection failed'}), 500
-        
-        user_dn = f"uid={username},{LDAP_CONFIG['users_ou']},{LDAP_CONFIG['base_dn']}"
-        
-        if conn.delete(user_dn):
-            log_action('delete_user', f'Deleted user: {username}')
-            return jsonify({'success': True, 'message': 'User deleted successfully'})
-        else:
-            return jsonify({'error': 'Failed to delete user'}), 500
+        with ldap_connection() as conn:
+            if not conn:
+                return jsonify({'error': 'LDAP connection failed'}), 500
+            
+            user_dn = f"uid={username},{LDAP_CONFIG['users_ou']},{LDAP_CONFIG['base_dn']}"
+            
+            if conn.delete(user_dn):
+                mark_ldap_write()
+                log_action('delete_user', f'Deleted user: {username}')
+                publish_directory_change(conn, 'user_deleted', {'users': -1}, username=username)
+                return jsonify({'success': True, 'message': 'User deleted successfully'})
+            else:
+                return jsonify({'error': 'Failed to delete user'}), 500
             
     except Exception as e:
         logger.error(f"Error deleting user: {str(e)}")
         return jsonify({'error': 'Failed to delete user'}), 500
-    finally:
-        if 'conn' in locals():
-            conn.unbind()
 
 @app.route('/api/groups', methods=['GET'])
 @login_required
 @limiter.limit("20 per minute")
+@ldap_cost(5, per_entry=0.1)
+@ldap_guard
 def api_get_groups():
     try:
-        conn = get_ldap_connection()
-        if not conn:
-            return jsonify({'error': 'LDAP connection failed'}), 500
-        
-        conn.search(
-            f"{LDAP_CONFIG['groups_ou']},{LDAP_CONFIG['base_dn']}",
-            '(objectClass=groupOfNames)',
-            SUBTREE,
-            attributes=['cn', 'description', 'member']
-        )
-        
-        groups = []
-        for entry in conn.entries:
-            group_data = {
-                'name': str(entry.cn) if entry.cn else '',
-                'description': str(entry.description) if entry.description else '',
-                'member_count': len(entry.member) if entry.member else 0
-            }
-            groups.append(group_data)
-        
-        conn.unbind()
+        snapshot = cached_directory()
+        if snapshot:
+            with ldap_tracer.span('materialize', entries=len(snapshot.group_names), cached=True):
+                groups = snapshot.groups()
+        else:
+            search_base = f"{LDAP_CONFIG['groups_ou']},{LDAP_CONFIG['base_dn']}"
+            hedge_servers = hedged_read_servers()
+            if hedge_servers:
+                entries, _ = ldap_hedger.search(hedge_servers, search_base, '(objectClass=groupOfNames)', SUBTREE, GROUP_LISTING_ATTRIBUTES)
+            else:
+                with ldap_connection(readonly=True) as conn:
+                    if not conn:
+                        return jsonify({'error': 'LDAP connection failed'}), 500
+
+                    conn.search(search_base, '(objectClass=groupOfNames)', SUBTREE, attributes=GROUP_LISTING_ATTRIBUTES)
+                    entries = [item for item in conn.response or [] if item.get('type') == 'searchResEntry']
+
+            with ldap_tracer.span('materialize', entries=len(entries)):
+                groups = group_records(entries)
+        g.ldap_result_size = len(groups)
         log_action('list_groups', f'Retrieved {len(groups)} groups')
         return jsonify(groups)
         
@@ -418,50 +1047,147 @@ def api_get_groups():
 
 @app.route('/api/test-connection', methods=['GET'])
 @login_required
+@ldap_cost(1)
+@ldap_guard
 def api_test_connection():
     try:
-        conn = get_ldap_connection()
-        if conn:
-            conn.unbind()
+        with ldap_connection() as conn:
+            connected = bool(conn)
+        if connected:
             log_action('test_connection', 'Connection successful')
-            return jsonify({'success': True, 'message': 'LDAP connection successful'})
+            return jsonify({'success': True, 'message': 'LDAP connection successful', 'breaker': ldap_breaker.snapshot(), 'servers': ldap_topology.snapshot()})
         else:
-            return jsonify({'success': False, 'message': 'LDAP connection failed'})
+            return jsonify({'success': False, 'message': 'LDAP connection failed', 'breaker': ldap_breaker.snapshot(), 'servers': ldap_topology.snapshot()})
     except Exception as e:
         logger.error(f"Connection test failed: {str(e)}")
         return jsonify({'success': False, 'message': f'Connection failed: {str(e)}'})
 
 @app.route('/api/stats', methods=['GET'])
 @login_required
+@ldap_cost(10, per_entry=0.01)
+@ldap_guard
 def api_get_stats():
     try:
-        conn = get_ldap_connection()
         stats = {'users': 0, 'groups': 0, 'status': 'disconnected'}
-        
-        if conn:
-            # Count users
-            conn.search(
-                f"{LDAP_CONFIG['users_ou']},{LDAP_CONFIG['base_dn']}",
-                '(objectClass=inetOrgPerson)',
-                SUBTREE
-            )
-            stats['users'] = len(conn.entries)
-            
-            # Count groups
-            conn.search(
-                f"{LDAP_CONFIG['groups_ou']},{LDAP_CONFIG['base_dn']}",
-                '(objectClass=groupOfNames)',
-                SUBTREE
-            )
-            stats['groups'] = len(conn.entries)
-            stats['status'] = 'connected'
-            conn.unbind()
+        with ldap_connection(readonly=True, asynchronous=True) as conn:
+            if conn:
+                stats['users'], stats['groups'] = directory_counts(conn)
+                stats['status'] = 'connected'
+                g.ldap_result_size = stats['users'] + stats['groups']
         
         return jsonify(stats)
     except Exception as e:
         logger.error(f"Stats error: {str(e)}")
         return jsonify({'users': 0, 'groups': 0, 'status': 'error'})
 
+# Each open stream holds a request thread, so a worker serves at most
+# SSE_MAX_STREAMS of them and refuses the rest; see gunicorn.conf.py
+sse_streams = threading.BoundedSemaphore(int(os.environ.get('SSE_MAX_STREAMS', 8)))
+
+@app.route('/api/events', methods=['GET'])
+@login_required
+@limiter.limit("30 per minute")
+def api_events():
+    """Server-Sent Events stream of 'stats' and 'directory' events"""
+    if not sse_streams.acquire(blocking=False):
+        REJECTED_REQUESTS.labels('sse_streams', request.endpoint).inc()
+        response = jsonify({'error': 'Too many open event streams', 'retry_after': 60})
+        response.status_code = 503
+        response.headers['Retry-After'] = '60'
+        return response
+    subscription = get_resource('event_bus').subscribe()
+    keepalive = float(os.environ.get('SSE_KEEPALIVE_SECONDS', 15))
+    # Streams end after SSE_MAX_SECONDS and the browser reconnects, so a
+    # stream never pins a worker indefinitely
+    deadline = time.monotonic() + float(os.environ.get('SSE_MAX_SECONDS', 300))
+
+    def stream():
+        yield 'retry: 5000\n\n'
+        while time.monotonic() < deadline:
+            item = subscription.get(timeout=keepalive)
+            if item is None:
+                yield ': keepalive\n\n'
+                continue
+            event_type, data = item
+            yield f"event: {event_type}\ndata: {json.dumps(data)}\n\n"
+
+    def close():
+        subscription.close()
+        sse_streams.release()
+
+    response = Response(stream(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+    # Runs when the server closes the response, even if the stream never started
+    response.call_on_close(close)
+    return response
+
+@app.route('/api/audit', methods=['GET'])
+@login_required
+@limiter.limit("60 per minute")
+def api_get_audit():
+    try:
+        user = request.args.get('user') or None
+        if current_user.role == 'viewer':
+            # Viewers only see their own trail
+            user = current_user.username
+        events, next_cursor = get_resource('audit_store').query(
+            user=user,
+            action=request.args.get('action') or None,
+            since=parse_since(request.args.get('since')),
+            cursor=request.args.get('cursor') or None,
+            limit=max(1, min(int(request.args.get('limit', 50)), 500))
+        )
+        return jsonify({'events': events, 'next_cursor': next_cursor})
+    except ValueError:
+        return jsonify({'error': 'Invalid query parameters'}), 400
+    except Exception as e:
+        logger.error(f"Error querying audit log: {str(e)}")
+        return jsonify({'error': 'Failed to query audit log'}), 500
+
+@app.route('/api/profile/stacks', methods=['GET'])
+@role_required('super_admin')
+def api_profile_stacks():
+    """Hottest request stacks seen by the rolling sampler in this worker"""
+    seconds = request.args.get('seconds', type=float)
+    limit = min(request.args.get('limit', 100, type=int), 1000)
+    stacks = rolling_sampler.top(seconds, limit)
+    fmt = request.args.get('format', 'collapsed')
+    if fmt == 'json':
+        return jsonify({
+            'pid': os.getpid(),
+            'sampler': rolling_sampler.snapshot(),
+            'stacks': [{'stack': stack.split(';'), 'samples': count} for stack, count in stacks.most_common()]
+        })
+    if fmt == 'html':
+        return Response(render_html(stacks, f"Request stacks, worker {os.getpid()}"), mimetype='text/html')
+    return Response(render_collapsed(stacks), mimetype='text/plain')
+
+@app.route('/api/profile/resources', methods=['GET'])
+@role_required('super_admin')
+def api_profile_resources():
+    """Memory, descriptor, socket and allocation counts of this worker"""
+    top = min(request.args.get('top', resource_monitor.top, type=int), 100)
+    if request.args.get('trace') == '1':
+        resource_monitor.start_tracing()
+    return jsonify(resource_monitor.snapshot(top, collect=request.args.get('collect') == '1'))
+
+@app.route('/metrics', methods=['GET'])
+@limiter.exempt
+def metrics():
+    """Prometheus exposition, aggregated across gunicorn workers"""
+    # Metrics name endpoints, servers and load, so they are never served
+    # anonymously by accident: without a token they need an explicit opt-in
+    token = os.environ.get('METRICS_TOKEN')
+    if not token and os.environ.get('METRICS_PUBLIC', 'false').lower() != 'true':
+        return jsonify({'error': 'Metrics disabled: set METRICS_TOKEN or METRICS_PUBLIC=true'}), 403
+    if token and not secrets.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return jsonify({'error': 'Unauthorized'}), 401
+    refresh_component_metrics()
+    body, content_type = render_metrics()
+    return Response(body, content_type=content_type)
+
 # Error handlers
 @app.errorhandler(404)
 def not_found_error(error):
@@ -473,11 +1199,9 @@ def internal_error(error):
 
 @app.errorhandler(429)
 def ratelimit_handler(e):
+    REJECTED_REQUESTS.labels('request', request.endpoint or 'unmatched').inc()
     return render_template('error.html', error_code=429, error_message="Rate limit exceeded"), 429
 
-if __name__ == '__main__':
-    app.run(debug=False, host='0.0.0.0', port=5000)
-
 @app.route('/users/<username>/certificate', methods=['GET', 'POST'])
 @login_required
 def user_certificate(username):
@@ -486,13 +1210,13 @@ def user_certificate(username):
         
         if action == 'generate_enrollment':
             # Generate enrollment package
-            package_path = tak_server_api.generate_enrollment_package(username)
+            package_path = get_resource('tak_server_api').generate_enrollment_package(username)
             flash(f"Enrollment package generated for {username}", "success")
             return redirect(url_for('user_certificate', username=username))
         
         elif action == 'create_certificate':
             # Create client certificate
-            cert_path = tak_server_api.create_client_certificate(username)
+            cert_path = get_resource('tak_server_api').create_client_certificate(username)
             flash(f"Certificate created for {username}", "success")
             return redirect(url_for('user_certificate', username=username))
     
@@ -546,7 +1270,7 @@ def email_enrollment(username):
     enrollment_package = f"static/enrollment_packages/{username}.zip"
     if not os.path.exists(enrollment_package):
         # Generate enrollment package if it doesn't exist
-        tak_server_api.generate_enrollment_package(username)
+        get_resource('tak_server_api').generate_enrollment_package(username)
     
     # Send email - this requires Flask-Mail to be configured
     try:
@@ -588,3 +1312,21 @@ TAK Server Admin Team
         flash(f"Failed to send email: {str(e)}", "error")
     
     return redirect(url_for('user_certificate', username=username))
+
+_logging_configured = False
+
+def create_app():
+    """Return the application, finishing process-level setup.
+
+    Only cheap, local work happens here; Redis, LDAP, the TAK Server API and
+    the admin password hashes are initialized on first use. Use as
+    `gunicorn --preload 'app:create_app()'`.
+    """
+    global _logging_configured
+    if not _logging_configured:
+        configure_logging()
+        _logging_configured = True
+    return app
+
+if __name__ == '__main__':
+    create_app().run(debug=False, host='0.0.0.0', port=5000)
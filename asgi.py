@@ -0,0 +1,81 @@
+"""ASGI entry point for the admin interface.
+
+Run with:
+    gunicorn -k uvicorn.workers.UvicornWorker -w 2 asgi:application
+or  uvicorn asgi:application --workers 2
+
+The event loop owns the client sockets (keep-alive, slow uploads, idle
+connections) and every request runs on a wide thread pool, so one process
+holds many operators' requests in flight while they wait on slapd, the TAK
+Server API or a subprocess. LDAP admission is still governed by the
+adaptive per-process concurrency limiter in app.py.
+"""
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from asgiref.wsgi import WsgiToAsgi, WsgiToAsgiInstance
+
+from app import create_app, ldap_pool, ldap_async_pool
+
+ASGI_THREADS = int(os.environ.get('ASGI_THREADS', 128))
+
+class _ThreadedInstance(WsgiToAsgiInstance):
+    """Runs the WSGI app on a shared executor instead of asgiref's single sync thread.
+
+    WsgiToAsgiInstance.__call__ reads the request body and awaits
+    self.run_wsgi_app(body); this class supplies that coroutine itself, built
+    on the public build_environ() and start_response(), so nothing depends
+    on how asgiref wraps its own version.
+    """
+
+    def __init__(self, wsgi_application, executor):
+        super().__init__(wsgi_application)
+        self.run_wsgi_app = sync_to_async(self._run, thread_sensitive=False, executor=executor)
+
+    def _run(self, body):
+        environ = self.build_environ(self.scope, body)
+        sent = 0
+        for output in self.wsgi_application(environ, self.start_response):
+            if not self.response_started:
+                self.response_started = True
+                self.sync_send(self.response_start)
+            # Never send more than the Content-Length the app declared
+            if self.response_content_length is not None:
+                output = output[:self.response_content_length - sent]
+            self.sync_send({'type': 'http.response.body', 'body': output, 'more_body': True})
+            sent += len(output)
+            if sent == self.response_content_length:
+                break
+        if not self.response_started:
+            self.response_started = True
+            self.sync_send(self.response_start)
+        self.sync_send({'type': 'http.response.body'})
+
+class ThreadedWsgiToAsgi(WsgiToAsgi):
+    """WSGI-to-ASGI adapter that serves requests concurrently"""
+
+    def __init__(self, wsgi_application, max_threads=ASGI_THREADS):
+        super().__init__(wsgi_application)
+        self.executor = ThreadPoolExecutor(max_workers=max_threads, thread_name_prefix='asgi')
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+            return
+        await _ThreadedInstance(self.wsgi_application, self.executor)(scope, receive, send)
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                for pool in (ldap_pool, ldap_async_pool):
+                    if pool:
+                        pool.close_all()
+                self.executor.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+application = ThreadedWsgiToAsgi(create_app())
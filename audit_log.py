@@ -0,0 +1,235 @@
+import atexit
+import glob
+import gzip
+import json
+import logging
+import os
+import queue
+import shutil
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows: rotation is only safe with a single process
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+class FileSink:
+    """Append JSON lines to a file, rotating by size and age and gzipping old files.
+
+    Every gunicorn worker has its own sink on the same path. Each batch is
+    written under an flock on the open file, and a sink whose file was
+    rotated away by another process reopens the path before writing, so no
+    worker keeps appending to a renamed or deleted file.
+    """
+
+    def __init__(self, path, max_bytes=50 * 1024 * 1024, max_age=86400, backup_count=14, compress=True):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.backup_count = backup_count
+        self.compress = compress
+        self.rotations = 0
+        self._file = None
+        self._opened_at = None
+
+    def write(self, events):
+        data = ''.join(json.dumps(event, separators=(',', ':')) + '\n' for event in events)
+        self._acquire()
+        try:
+            self._file.write(data)
+            self._file.flush()
+            if os.fstat(self._file.fileno()).st_size >= self.max_bytes or \
+                    (self.max_age and time.time() - self._opened_at >= self.max_age):
+                self._rotate()
+        finally:
+            self._release()
+
+    def rotate(self):
+        """Move the current file aside as path.YYYYmmdd-HHMMSS[.gz]"""
+        if self._file is None:
+            return
+        self._acquire()
+        try:
+            self._rotate()
+        finally:
+            self._release()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _open(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(self.path, 'a', encoding='utf-8')
+        self._opened_at = time.time()
+
+    def _acquire(self):
+        """Lock the open file, reopening the path while it names a different file"""
+        while True:
+            if self._file is None:
+                self._open()
+            if fcntl:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_EX)
+            try:
+                current = os.stat(self.path).st_ino
+            except FileNotFoundError:
+                current = None
+            if current == os.fstat(self._file.fileno()).st_ino:
+                return
+            self.close()
+
+    def _release(self):
+        if self._file is not None and fcntl:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+
+    def _rotate(self):
+        # Rename while still holding the lock; closing the file releases it
+        rotated = f"{self.path}.{time.strftime('%Y%m%d-%H%M%S')}"
+        suffix = 0
+        while os.path.exists(rotated) or os.path.exists(rotated + '.gz'):
+            suffix += 1
+            rotated = f"{self.path}.{time.strftime('%Y%m%d-%H%M%S')}-{suffix}"
+        os.replace(self.path, rotated)
+        self.close()
+        if self.compress:
+            with open(rotated, 'rb') as src, gzip.open(rotated + '.gz', 'wb') as dst:
+                shutil.copyfileobj(src, dst)
+            os.remove(rotated)
+        self.rotations += 1
+        for old in sorted(glob.glob(f"{glob.escape(self.path)}.*"), key=os.path.getmtime)[:-self.backup_count or None]:
+            os.remove(old)
+
+class RedisStreamSink:
+    """XADD each event to a capped Redis stream, one pipeline per batch"""
+
+    def __init__(self, get_client, stream='ldap-admin:audit', maxlen=100000):
+        self.get_client = get_client
+        self.stream = stream
+        self.maxlen = maxlen
+
+    def write(self, events):
+        client = self.get_client()
+        if client is None:
+            return
+        pipe = client.pipeline(transaction=False)
+        for event in events:
+            pipe.xadd(self.stream, {'event': json.dumps(event)}, maxlen=self.maxlen, approximate=True)
+        pipe.execute()
+
+    def close(self):
+        pass
+
+class AuditWriter:
+    """Bounded queue of audit events drained in batches by a background thread.
+
+    Request threads only enqueue. When the queue is full, overflow='drop'
+    discards the event and counts it; overflow='block' waits up to
+    block_timeout for space before dropping.
+    """
+
+    def __init__(self, sinks, max_queue=10000, batch_size=500, flush_interval=0.5,
+                 overflow='drop', block_timeout=0.05):
+        self.sinks = list(sinks)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.overflow = overflow
+        self.block_timeout = block_timeout
+        self.queued = 0
+        self.written = 0
+        self.dropped = 0
+        self.batches = 0
+        self.sink_errors = 0
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self._closed = False
+        atexit.register(self.close)
+
+    def emit(self, event):
+        """Queue one event; never raises"""
+        self._ensure_thread()
+        try:
+            if self.overflow == 'block':
+                self._queue.put(event, timeout=self.block_timeout)
+            else:
+                self._queue.put_nowait(event)
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            return False
+        with self._lock:
+            self.queued += 1
+        return True
+
+    def flush(self, timeout=5.0):
+        """Wait until every queued event has been handed to the sinks"""
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.01)
+        return not self._queue.unfinished_tasks
+
+    def close(self):
+        if self._closed:
+            return
+        self.flush()
+        self._closed = True
+        for sink in self.sinks:
+            try:
+                sink.close()
+            except Exception:
+                pass
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'queued': self.queued,
+                'written': self.written,
+                'dropped': self.dropped,
+                'batches': self.batches,
+                'sink_errors': self.sink_errors,
+                'backlog': self._queue.qsize()
+            }
+
+    def _ensure_thread(self):
+        # Started on first use, and again in each forked worker
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name='audit-writer', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            try:
+                batch = [self._queue.get(timeout=self.flush_interval)]
+            except queue.Empty:
+                continue
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            self._write(batch)
+            for _ in batch:
+                self._queue.task_done()
+
+    def _write(self, batch):
+        for sink in self.sinks:
+            try:
+                sink.write(batch)
+            except Exception as e:
+                with self._lock:
+                    self.sink_errors += 1
+                logger.warning(f"Audit sink {type(sink).__name__} failed: {str(e)}")
+        with self._lock:
+            self.written += len(batch)
+            self.batches += 1
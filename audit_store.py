@@ -0,0 +1,153 @@
+import glob
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    user TEXT NOT NULL,
+    action TEXT NOT NULL,
+    ip TEXT,
+    details TEXT
+);
+CREATE INDEX IF NOT EXISTS events_ts ON events (ts);
+CREATE INDEX IF NOT EXISTS events_user_ts ON events (user, ts);
+CREATE INDEX IF NOT EXISTS events_action_ts ON events (action, ts);
+"""
+
+def parse_since(value):
+    """Accept epoch seconds or an ISO 8601 timestamp; return epoch seconds"""
+    if value in (None, ''):
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(value).timestamp()
+
+class AuditStore:
+    """Append-only audit event store partitioned into one SQLite file per day.
+
+    Each partition is indexed on timestamp, (user, timestamp) and
+    (action, timestamp). Queries walk partitions newest first and page with
+    an opaque cursor, so a page costs one index range scan no matter how
+    many events are stored. Partitions older than retention_days are
+    deleted. Doubles as an AuditWriter sink.
+    """
+
+    def __init__(self, directory, retention_days=365):
+        self.directory = directory
+        self.retention_days = retention_days
+        self._writers = {}
+        self._lock = threading.Lock()
+
+    def write(self, events):
+        by_day = {}
+        for event in events:
+            ts = parse_since(event.get('timestamp')) or time.time()
+            by_day.setdefault(self._day(ts), []).append((
+                ts, event.get('user', ''), event.get('action', ''), event.get('ip'), event.get('details')
+            ))
+        cutoff = self._day(time.time() - self.retention_days * 86400)
+        with self._lock:
+            for day, rows in by_day.items():
+                if day < cutoff:
+                    continue
+                conn = self._writer(day)
+                with conn:
+                    conn.executemany('INSERT INTO events (ts, user, action, ip, details) VALUES (?, ?, ?, ?, ?)', rows)
+
+    def query(self, user=None, action=None, since=None, cursor=None, limit=50):
+        """Return (events, next_cursor), newest first"""
+        before = None
+        if cursor:
+            day, ts, event_id = cursor.split(':')
+            before = (day, float(ts), int(event_id))
+        since_day = self._day(since) if since is not None else None
+
+        events = []
+        for day in self.partitions():
+            if since_day and day < since_day:
+                break
+            if before and day > before[0]:
+                continue
+            clauses, params = [], []
+            if user:
+                clauses.append('user = ?')
+                params.append(user)
+            if action:
+                clauses.append('action = ?')
+                params.append(action)
+            if since is not None:
+                clauses.append('ts >= ?')
+                params.append(since)
+            if before and day == before[0]:
+                clauses.append('(ts, id) < (?, ?)')
+                params.extend(before[1:])
+            sql = 'SELECT id, ts, user, action, ip, details FROM events'
+            if clauses:
+                sql += ' WHERE ' + ' AND '.join(clauses)
+            sql += ' ORDER BY ts DESC, id DESC LIMIT ?'
+            conn = self._reader(day)
+            try:
+                rows = conn.execute(sql, params + [limit - len(events)]).fetchall()
+            finally:
+                conn.close()
+            events.extend(dict(
+                id=f"{day}:{row[0]}", timestamp=row[1], user=row[2], action=row[3], ip=row[4], details=row[5]
+            ) for row in rows)
+            if len(events) >= limit:
+                break
+
+        next_cursor = None
+        if len(events) >= limit:
+            last = events[-1]
+            next_cursor = f"{last['id'].split(':')[0]}:{last['timestamp']!r}:{last['id'].split(':')[1]}"
+        return events, next_cursor
+
+    def partitions(self):
+        """Partition days present on disk, newest first"""
+        paths = glob.glob(os.path.join(glob.escape(self.directory), 'audit-*.db'))
+        return sorted((os.path.basename(path)[6:-3] for path in paths), reverse=True)
+
+    def close(self):
+        with self._lock:
+            for conn in self._writers.values():
+                conn.close()
+            self._writers.clear()
+
+    def _writer(self, day):
+        conn = self._writers.get(day)
+        if conn is None:
+            os.makedirs(self.directory, exist_ok=True)
+            conn = sqlite3.connect(self._path(day), timeout=5, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.executescript(SCHEMA)
+            self._writers[day] = conn
+            self._expire(day)
+        return conn
+
+    def _reader(self, day):
+        return sqlite3.connect(f"file:{self._path(day)}?mode=ro", uri=True, timeout=5)
+
+    def _expire(self, opened):
+        # Called when a new partition opens; older partitions stop receiving writes
+        cutoff = self._day(time.time() - self.retention_days * 86400)
+        for day in list(self._writers):
+            if day < opened:
+                self._writers.pop(day).close()
+        for day in self.partitions():
+            if day < cutoff:
+                for path in glob.glob(glob.escape(self._path(day)) + '*'):
+                    os.remove(path)
+
+    def _path(self, day):
+        return os.path.join(self.directory, f"audit-{day}.db")
+
+    @staticmethod
+    def _day(ts):
+        return time.strftime('%Y%m%d', time.gmtime(ts))
@@ -0,0 +1,356 @@
+#!/usr/bin/env python3
+"""
+Benchmark the API endpoints against a seeded in-memory LDAP directory.
+
+Each directory size runs in a fresh interpreter: an ldap3 MOCK_SYNC /
+MOCK_ASYNC server is seeded with synthetic users and groups, the app's
+connection factory is pointed at it, and every endpoint is driven through
+the Flask test client for --duration seconds (at least --min-requests
+times). Latency percentiles, a latency sample, throughput and the peak RSS
+seen while each endpoint ran are written as JSON, keyed by commit, and
+appended to the history that history.py and generate_benchmark_report.py
+compare commits with.
+
+The mock server evaluates filters in Python, so at 100k users LDAP time
+dominates; compare runs of the same size against each other.
+
+Usage:
+    python benchmarks/bench_api.py [--sizes 1000x100,10000x1000,100000x1000]
+        [--duration 3] [--min-requests 5] [--concurrency 1] [--output FILE] [--json] [--no-history]
+"""
+import argparse
+import itertools
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+
+import history
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(ROOT, 'benchmarks', 'results')
+
+DEFAULT_SIZES = '1000x100,10000x1000'
+
+# Latencies kept per endpoint for significance tests against other commits
+SAMPLE_SIZE = 200
+
+# (name, method, path); POST and DELETE of /api/users alternate on the same
+# throwaway user so the directory size stays constant
+ENDPOINTS = [
+    ('GET /api/users', 'GET', '/api/users'),
+    ('GET /api/groups', 'GET', '/api/groups'),
+    ('GET /api/stats', 'GET', '/api/stats'),
+    ('GET /', 'GET', '/'),
+    ('GET /login', 'GET', '/login'),
+    ('POST /login', 'POST', '/login'),
+    ('POST /api/users', 'POST', '/api/users'),
+    ('DELETE /api/users/<username>', 'DELETE', '/api/users/{username}'),
+]
+
+
+def parse_sizes(value):
+    """'1000x100,10000x1000' -> [(1000, 100), (10000, 1000)]"""
+    sizes = []
+    for item in value.split(','):
+        users, groups = item.lower().split('x')
+        sizes.append((int(users), int(groups)))
+    return sizes
+
+
+def seed_directory(server, users, groups, base_dn, admin_dn, admin_password, strategy):
+    """Fill the mock server's DIT with users and groups of equal-ish size."""
+    from ldap3 import Connection
+    conn = Connection(server, user=admin_dn, password=admin_password, client_strategy=strategy)
+    add = conn.strategy.add_entry
+    add(base_dn, {'objectClass': ['top', 'domain']})
+    add(admin_dn, {'objectClass': ['person'], 'sn': 'admin', 'userPassword': admin_password})
+    add(f'ou=users,{base_dn}', {'objectClass': ['organizationalUnit'], 'ou': 'users'})
+    add(f'ou=groups,{base_dn}', {'objectClass': ['organizationalUnit'], 'ou': 'groups'})
+    user_dns = []
+    for n in range(users):
+        uid = f'user{n:06d}'
+        dn = f'uid={uid},ou=users,{base_dn}'
+        add(dn, {
+            'objectClass': ['inetOrgPerson', 'posixAccount'],
+            'uid': uid,
+            'cn': f'Bench User {n}',
+            'sn': 'User',
+            'givenName': f'Bench{n}',
+            'mail': f'{uid}@bench.local',
+            'uidNumber': str(1000 + n),
+            'gidNumber': '1000',
+            'homeDirectory': f'/home/{uid}'
+        })
+        user_dns.append(dn)
+    for n in range(groups):
+        add(f'cn=group{n:04d},ou=groups,{base_dn}', {
+            'objectClass': ['groupOfNames'],
+            'cn': f'group{n:04d}',
+            'description': f'Bench group {n}',
+            'member': user_dns[n::groups] or [admin_dn]
+        })
+
+
+def install_mock_directory(app_module, users, groups):
+    """Seed a mock server and make the app open its connections to it."""
+    from ldap3 import Server, Connection, ASYNC, MOCK_ASYNC, MOCK_SYNC
+    config = app_module.LDAP_CONFIG
+    server = Server('bench')
+    seed_directory(server, users, groups, config['base_dn'], config['admin_dn'], config['admin_password'], MOCK_SYNC)
+
+    def open_mock_connection(url, **options):
+        strategy = MOCK_ASYNC if options.get('client_strategy') == ASYNC else MOCK_SYNC
+        conn = Connection(server, user=config['admin_dn'], password=config['admin_password'], client_strategy=strategy)
+        conn.bind()
+        return app_module.ldap_tracer.instrument(conn)
+
+    app_module._open_ldap_connection = open_mock_connection
+
+
+def current_rss_mb():
+    """Resident set size now, from /proc where available, else the peak so far."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2**20
+    except (OSError, ValueError):
+        return peak_rss_mb()
+
+
+def peak_rss_mb():
+    """Peak RSS of this process (ru_maxrss is KiB on Linux, bytes on macOS)."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2**20 if sys.platform == 'darwin' else peak / 1024
+
+
+class RSSMonitor:
+    """Track the highest RSS seen while a block runs."""
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.peak = 0.0
+        self._stop = threading.Event()
+
+    def __enter__(self):
+        self.peak = current_rss_mb()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, current_rss_mb())
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, current_rss_mb())
+
+
+def make_client(flask_app, username=None):
+    """Test client, logged in as username when given."""
+    client = flask_app.test_client()
+    if username:
+        with client.session_transaction() as sess:
+            sess['_user_id'] = username
+            sess['_fresh'] = True
+    return client
+
+
+def issue(flask_app, client, method, path, worker, n):
+    """Send one request; return True when it succeeded."""
+    username = f'bench{worker}x{n}'
+    if method == 'POST' and path == '/login':
+        # A fresh anonymous client each time, otherwise the login redirects
+        response = make_client(flask_app).post(path, data={'username': 'admin', 'password': 'admin123'})
+        return response.status_code == 302
+    if method == 'POST':
+        response = client.post(path, json={
+            'username': username, 'first_name': 'Bench', 'last_name': 'User',
+            'email': f'{username}@bench.local', 'password': 'BenchPass123!'
+        })
+    elif method == 'DELETE':
+        response = client.delete(path.format(username=username))
+    else:
+        response = client.get(path)
+    return response.status_code < 400
+
+
+def run_endpoint(flask_app, method, path, duration, min_requests, concurrency):
+    """Drive one endpoint from concurrency threads; return latencies (s), errors and wall time."""
+    latencies, errors = [], [0]
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def worker(index):
+        # The login page is only rendered for anonymous users
+        client = make_client(flask_app, None if path == '/login' else 'admin')
+        for n in itertools.count():
+            if time.perf_counter() >= deadline and n >= min_requests:
+                break
+            if method == 'DELETE':
+                # Create the user the DELETE will remove, outside the timing
+                issue(flask_app, client, 'POST', '/api/users', index, n)
+            start = time.perf_counter()
+            ok = issue(flask_app, client, method, path, index, n)
+            elapsed = time.perf_counter() - start
+            if method == 'POST' and path == '/api/users':
+                issue(flask_app, client, 'DELETE', '/api/users/{username}', index, n)
+            with lock:
+                latencies.append(elapsed)
+                errors[0] += 0 if ok else 1
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, errors[0], time.perf_counter() - started
+
+
+def summarize(latencies, errors, wall):
+    """Latency percentiles in milliseconds, throughput and a latency sample.
+
+    The sample is up to SAMPLE_SIZE evenly spaced order statistics, which
+    keeps the shape of the distribution at a fixed size per endpoint.
+    """
+    ordered = sorted(latencies)
+    step = max(1, len(ordered) / SAMPLE_SIZE)
+
+    def percentile(p):
+        return round(ordered[min(len(ordered) - 1, int(len(ordered) * p))] * 1000, 2)
+
+    return {
+        'requests': len(ordered),
+        'errors': errors,
+        'mean_ms': round(statistics.mean(ordered) * 1000, 2),
+        'p50_ms': percentile(0.50),
+        'p90_ms': percentile(0.90),
+        'p99_ms': percentile(0.99),
+        'max_ms': round(ordered[-1] * 1000, 2),
+        'throughput_rps': round(len(ordered) / wall, 1),
+        'samples_ms': [round(ordered[int(i * step)] * 1000, 3) for i in range(min(len(ordered), SAMPLE_SIZE))],
+    }
+
+
+def run_scenario(users, groups, duration, min_requests, concurrency):
+    """Benchmark every endpoint against one directory size, in this process."""
+    scratch = tempfile.mkdtemp(prefix='ldap-admin-bench-')
+    os.environ.setdefault('RATELIMIT_STORAGE_URI', 'memory://')
+    os.environ.setdefault('LOG_FILE', os.path.join(scratch, 'app.log'))
+    os.environ.setdefault('AUDIT_LOG_FILE', os.path.join(scratch, 'audit.log'))
+    os.environ.setdefault('AUDIT_DB_DIR', os.path.join(scratch, 'audit'))
+    sys.path.insert(0, ROOT)
+    import app as app_module
+
+    flask_app = app_module.create_app()
+    flask_app.config.update(WTF_CSRF_ENABLED=False, RATELIMIT_ENABLED=False)
+    app_module.limiter.enabled = False
+
+    start = time.perf_counter()
+    install_mock_directory(app_module, users, groups)
+    scenario = {
+        'users': users,
+        'groups': groups,
+        'seed_seconds': round(time.perf_counter() - start, 2),
+        'rss_after_seed_mb': round(current_rss_mb(), 1),
+        'endpoints': {}
+    }
+    # Warm up templates, lazy resources and password hashes
+    for name, method, path in ENDPOINTS:
+        run_endpoint(flask_app, method, path, 0, 1, 1)
+
+    for name, method, path in ENDPOINTS:
+        with RSSMonitor() as rss:
+            latencies, errors, wall = run_endpoint(flask_app, method, path, duration, min_requests, concurrency)
+        result = summarize(latencies, errors, wall)
+        result['peak_rss_mb'] = round(rss.peak, 1)
+        scenario['endpoints'][name] = result
+    scenario['peak_rss_mb'] = round(peak_rss_mb(), 1)
+    return scenario
+
+
+def run_scenario_subprocess(users, groups, args):
+    """Run one directory size in a fresh interpreter so RSS figures are its own."""
+    command = [
+        sys.executable, os.path.abspath(__file__), '--scenario', f'{users}x{groups}',
+        '--duration', str(args.duration), '--min-requests', str(args.min_requests),
+        '--concurrency', str(args.concurrency)
+    ]
+    result = subprocess.run(command, cwd=ROOT, capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def git_commit():
+    """Current commit hash, with a -dirty suffix for uncommitted changes."""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=ROOT, capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=ROOT,
+                               capture_output=True, text=True).stdout.strip()
+        return commit + ('-dirty' if dirty else '')
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default=DEFAULT_SIZES, help='Comma-separated USERSxGROUPS directory sizes')
+    parser.add_argument('--duration', type=float, default=3.0, help='Seconds to drive each endpoint')
+    parser.add_argument('--min-requests', type=int, default=5, help='Requests per endpoint even when slow')
+    parser.add_argument('--concurrency', type=int, default=1, help='Client threads per endpoint')
+    parser.add_argument('--output', help='Results file (default benchmarks/results/api-<commit>-<time>.json)')
+    parser.add_argument('--json', action='store_true', help='Print results as JSON')
+    parser.add_argument('--no-history', action='store_true', help='Do not append the run to the history file')
+    parser.add_argument('--scenario', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.scenario:
+        users, groups = parse_sizes(args.scenario)[0]
+        print(json.dumps(run_scenario(users, groups, args.duration, args.min_requests, args.concurrency)))
+        return
+
+    commit = git_commit()
+    results = {
+        'benchmark': 'api',
+        'commit': commit,
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'concurrency': args.concurrency,
+        'scenarios': [run_scenario_subprocess(users, groups, args) for users, groups in parse_sizes(args.sizes)]
+    }
+
+    output = args.output
+    if not output:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        stamp = datetime.now(timezone.utc).strftime('%Y%m%d-%H%M%S')
+        output = os.path.join(RESULTS_DIR, f"api-{commit[:12]}-{stamp}.json")
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=2)
+    if not args.no_history:
+        history.append(results)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    for scenario in results['scenarios']:
+        print(f"\n{scenario['users']} users / {scenario['groups']} groups "
+              f"(seeded in {scenario['seed_seconds']} s, peak RSS {scenario['peak_rss_mb']} MB)")
+        print(f"{'Endpoint':<30} {'reqs':>6} {'err':>4} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} {'req/s':>8} {'RSS MB':>8}")
+        for name, stats in scenario['endpoints'].items():
+            print(f"{name:<30} {stats['requests']:>6} {stats['errors']:>4} {stats['p50_ms']:>9} {stats['p90_ms']:>9} "
+                  f"{stats['p99_ms']:>9} {stats['throughput_rps']:>8} {stats['peak_rss_mb']:>8}")
+    print(f"\nSaved {output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Compare the memory a worker would hold for a cached copy of the directory.
+
+Three representations of the same users and groups, built from search
+responses shaped like the ones ldap3 returns:
+
+    dicts     {dn: {attribute: value}} per entry, member DNs as strings
+    slots     __slots__ records, interned names, array('I') member ids
+    columnar  directory_cache.DirectorySnapshot, which the app uses
+
+Responses are streamed from the demo directory generator, so only the
+representation being measured stays in memory. Retained and peak bytes are
+counted with tracemalloc; build time is from the same (traced, so slower)
+run.
+
+Usage:
+    python benchmarks/bench_cache_memory.py [--sizes 10000,100000,1000000] [--groups-per-user 0.01] [--json]
+"""
+import argparse
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+from array import array
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from demo_directory import generate_entries
+from directory_cache import DirectorySnapshot
+
+BASE_DN = 'dc=tak,dc=local'
+ADMIN_DN = 'cn=admin,dc=tak,dc=local'
+USERS_BASE = f'ou=users,{BASE_DN}'
+GROUPS_BASE = f'ou=groups,{BASE_DN}'
+USER_ATTRIBUTES = ('uid', 'givenName', 'sn', 'mail')
+GROUP_ATTRIBUTES = ('cn', 'description', 'member')
+
+
+class Responses:
+    """Search response entries for a generated directory: users streamed, then groups.
+
+    Groups are generated after every user, so they are collected while the
+    users are streamed; consume users() to the end before reading groups.
+    """
+
+    def __init__(self, users, groups, seed=0):
+        self.count = users
+        self._entries = generate_entries(users, groups, seed, BASE_DN, 'ou=users', 'ou=groups', ADMIN_DN, 'bench')
+        self.groups = []
+
+    def users(self):
+        for dn, raw in self._entries:
+            if dn.endswith(GROUPS_BASE) and dn != GROUPS_BASE:
+                self.groups.append(response_entry(dn, raw, GROUP_ATTRIBUTES))
+            elif dn.endswith(USERS_BASE) and dn != USERS_BASE:
+                yield response_entry(dn, raw, USER_ATTRIBUTES)
+
+
+def response_entry(dn, raw, names):
+    """A searchResEntry dict with freshly decoded values, as off the wire."""
+    return {
+        'type': 'searchResEntry',
+        'dn': dn,
+        'attributes': {name: [value.decode() for value in raw[name]] for name in names if name in raw}
+    }
+
+
+def first(attributes, name):
+    values = attributes.get(name)
+    return values[0] if values else ''
+
+
+def build_dicts(responses):
+    """A dict per entry keyed by DN, membership as DN strings both ways."""
+    users = {}
+    for entry in responses.users():
+        attributes = entry['attributes']
+        users[entry['dn'].lower()] = {name: first(attributes, name) for name in USER_ATTRIBUTES}
+        users[entry['dn'].lower()]['memberOf'] = []
+    groups = {}
+    for entry in responses.groups:
+        attributes = entry['attributes']
+        dn = entry['dn']
+        groups[dn.lower()] = {'cn': first(attributes, 'cn'), 'description': first(attributes, 'description'),
+                              'member': list(attributes.get('member') or [])}
+        for member in groups[dn.lower()]['member']:
+            user = users.get(member.lower())
+            if user is not None:
+                user['memberOf'].append(dn)
+    return users, groups
+
+
+class UserRecord:
+    __slots__ = ('uid', 'first_name', 'last_name', 'email', 'groups')
+
+    def __init__(self, uid, first_name, last_name, email):
+        self.uid = uid
+        self.first_name = first_name
+        self.last_name = last_name
+        self.email = email
+        self.groups = array('I')
+
+
+class GroupRecord:
+    __slots__ = ('dn', 'name', 'description', 'members', 'member_count')
+
+    def __init__(self, dn, name, description, members, member_count):
+        self.dn = dn
+        self.name = name
+        self.description = description
+        self.members = members
+        self.member_count = member_count
+
+
+def build_slots(responses):
+    """__slots__ records with interned repeated strings and array('I') member ids."""
+    intern = sys.intern
+    users, ids = [], {}
+    for entry in responses.users():
+        attributes = entry['attributes']
+        ids[entry['dn'].lower()] = len(users)
+        users.append(UserRecord(first(attributes, 'uid'), intern(first(attributes, 'givenName')),
+                                intern(first(attributes, 'sn')), first(attributes, 'mail')))
+    groups = []
+    for entry in responses.groups:
+        attributes = entry['attributes']
+        members = attributes.get('member') or []
+        member_ids = array('I', [ids[member.lower()] for member in members if member.lower() in ids])
+        for user in member_ids:
+            users[user].groups.append(len(groups))
+        groups.append(GroupRecord(intern(entry['dn']), intern(first(attributes, 'cn')),
+                                  intern(first(attributes, 'description')), member_ids, len(members)))
+    return users, groups
+
+
+def build_columnar(responses):
+    return DirectorySnapshot(responses.users(), responses.groups)
+
+
+REPRESENTATIONS = {'dicts': build_dicts, 'slots': build_slots, 'columnar': build_columnar}
+
+
+def measure(build, users, groups):
+    """(retained bytes, peak bytes, build seconds) for one representation."""
+    gc.collect()
+    tracemalloc.start()
+    responses = Responses(users, groups)
+    start = time.perf_counter()
+    built = build(responses)
+    seconds = time.perf_counter() - start
+    del responses
+    gc.collect()
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del built
+    return retained, peak, seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default='10000,100000,1000000', help='Comma-separated user counts')
+    parser.add_argument('--groups-per-user', type=float, default=0.01, help='Groups per user (at least 10)')
+    parser.add_argument('--only', help='Comma-separated representations to measure')
+    parser.add_argument('--json', action='store_true', help='Print results as JSON')
+    args = parser.parse_args()
+
+    names = args.only.split(',') if args.only else list(REPRESENTATIONS)
+    results = []
+    for users in (int(size) for size in args.sizes.split(',')):
+        groups = max(10, int(users * args.groups_per_user))
+        for name in names:
+            retained, peak, seconds = measure(REPRESENTATIONS[name], users, groups)
+            results.append({
+                'users': users,
+                'groups': groups,
+                'representation': name,
+                'retained_mb': round(retained / 1024 / 1024, 1),
+                'bytes_per_user': round(retained / users),
+                'peak_mb': round(peak / 1024 / 1024, 1),
+                'build_s': round(seconds, 2)
+            })
+            if not args.json:
+                row = results[-1]
+                print(f"{users:>9} users {groups:>6} groups  {name:<9} {row['retained_mb']:>9} MB retained "
+                      f"{row['bytes_per_user']:>6} B/user {row['peak_mb']:>9} MB peak {row['build_s']:>7} s",
+                      flush=True)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
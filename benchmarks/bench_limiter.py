@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Measure the per-request overhead added by Flask-Limiter storage backends.
+
+Each backend is exercised through the Flask test client on a trivial route so
+the numbers are the limiter cost alone, not LDAP or template rendering.
+
+Usage:
+    python benchmarks/bench_limiter.py [--requests 5000] [--redis redis://localhost:6379/15]
+"""
+import argparse
+import json
+import statistics
+import time
+
+from flask import Flask
+from flask_limiter import Limiter
+from flask_limiter.util import get_remote_address
+
+
+def build_app(storage_uri):
+    """Build a minimal app limited the same way app.py is."""
+    bench_app = Flask(__name__)
+    limiter = Limiter(
+        app=bench_app,
+        key_func=get_remote_address,
+        storage_uri=storage_uri or 'memory://',
+        storage_options={'socket_connect_timeout': 0.25, 'socket_timeout': 0.25},
+        strategy='moving-window',
+        key_prefix='ldap-admin-bench',
+        in_memory_fallback_enabled=True,
+        enabled=storage_uri is not None
+    )
+
+    @bench_app.route('/ping')
+    @limiter.limit("1000000 per minute")
+    def ping():
+        return 'ok'
+
+    return bench_app, limiter
+
+
+def time_requests(storage_uri, count):
+    """Return per-request latencies in microseconds."""
+    bench_app, limiter = build_app(storage_uri)
+    client = bench_app.test_client()
+
+    # Warm up the client, the Lua script cache and the connection pool
+    for _ in range(50):
+        client.get('/ping')
+
+    samples = []
+    for _ in range(count):
+        start = time.perf_counter()
+        client.get('/ping')
+        samples.append((time.perf_counter() - start) * 1e6)
+
+    if storage_uri:
+        limiter.reset()
+    return samples
+
+
+def summarize(samples):
+    """Summarize latency samples."""
+    ordered = sorted(samples)
+    return {
+        'mean_us': round(statistics.mean(ordered), 1),
+        'p50_us': round(ordered[len(ordered) // 2], 1),
+        'p99_us': round(ordered[int(len(ordered) * 0.99) - 1], 1),
+    }
+
+
+def redis_available(uri):
+    """Check whether the Redis server behind uri answers."""
+    try:
+        import redis
+        redis.Redis.from_url(uri, socket_connect_timeout=0.25).ping()
+        return True
+    except Exception:
+        return False
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=5000)
+    parser.add_argument('--redis', default='redis://localhost:6379/15')
+    parser.add_argument('--json', action='store_true', help='Print results as JSON')
+    args = parser.parse_args()
+
+    backends = [('disabled', None), ('memory', 'memory://')]
+    if redis_available(args.redis):
+        backends.append(('redis', args.redis))
+    else:
+        print(f"Redis not reachable at {args.redis}, skipping redis backend")
+
+    results = {}
+    for name, uri in backends:
+        results[name] = summarize(time_requests(uri, args.requests))
+
+    baseline = results['disabled']['mean_us']
+    for name in results:
+        results[name]['overhead_us'] = round(results[name]['mean_us'] - baseline, 1)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{'Backend':<10} {'mean (us)':>10} {'p50 (us)':>10} {'p99 (us)':>10} {'overhead (us)':>14}")
+    for name, stats in results.items():
+        print(f"{name:<10} {stats['mean_us']:>10} {stats['p50_us']:>10} {stats['p99_us']:>10} {stats['overhead_us']:>14}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Measure what turning search results into listing records costs per entry.
+
+The directory is a generated demo directory searched in-process, so only
+the step after the search is timed: building records from ldap3 Entry
+objects (conn.entries and str() per attribute, as the listings used to)
+against building them from the raw response dicts, as app.user_records()
+and app.group_records() do now. Allocations are counted with tracemalloc
+in a separate pass, since tracing slows everything down.
+
+Usage:
+    python benchmarks/bench_listing.py [--users 5000] [--groups 100] [--repeat 5] [--json]
+"""
+import argparse
+import gc
+import json
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+BASE_DN = 'dc=tak,dc=local'
+ADMIN_DN = 'cn=admin,dc=tak,dc=local'
+GROUP_ATTRIBUTES = ['cn', 'description', 'member']
+
+
+def users_from_entries(conn, membership):
+    """The old users listing: Entry objects and str() per attribute."""
+    return [{
+        'username': str(entry.uid) if entry.uid else '',
+        'first_name': str(entry.givenName) if entry.givenName else '',
+        'last_name': str(entry.sn) if entry.sn else '',
+        'email': str(entry.mail) if entry.mail else '',
+        'groups': membership.get(entry.entry_dn.lower(), [])
+    } for entry in conn.entries]
+
+
+def groups_from_entries(conn):
+    """The old groups listing."""
+    return [{
+        'name': str(entry.cn) if entry.cn else '',
+        'description': str(entry.description) if entry.description else '',
+        'member_count': len(entry.member) if entry.member else 0
+    } for entry in conn.entries]
+
+
+def listings(app_module, directory):
+    """{name: (search, build from Entry objects, build from raw responses)} for both listings."""
+    from ldap3 import SUBTREE
+    users_base = f"{directory.users_ou},{BASE_DN}"
+    groups_base = f"{directory.groups_ou},{BASE_DN}"
+    conn = directory.connect()
+    conn.search(groups_base, '(objectClass=groupOfNames)', SUBTREE, attributes=['cn', 'member'])
+    membership = app_module.group_membership(conn.response)
+
+    def search_users():
+        conn.search(users_base, '(objectClass=inetOrgPerson)', SUBTREE, attributes=app_module.USER_LISTING_ATTRIBUTES)
+
+    def search_groups():
+        conn.search(groups_base, '(objectClass=groupOfNames)', SUBTREE, attributes=GROUP_ATTRIBUTES)
+
+    return {
+        'users': (search_users, lambda: users_from_entries(conn, membership),
+                  lambda: app_module.user_records(conn.response, membership)),
+        'groups': (search_groups, lambda: groups_from_entries(conn),
+                   lambda: app_module.group_records(conn.response))
+    }
+
+
+def measure(search, build, repeat):
+    """(median seconds, peak traced bytes, blocks still held) for one build after a fresh search."""
+    times = []
+    for _ in range(repeat):
+        search()
+        gc.collect()
+        start = time.perf_counter()
+        records = build()
+        times.append(time.perf_counter() - start)
+        del records
+    search()
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    tracemalloc.reset_peak()
+    base, _ = tracemalloc.get_traced_memory()
+    records = build()
+    _, peak = tracemalloc.get_traced_memory()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    blocks = sum(stat.count_diff for stat in after.compare_to(before, 'filename'))
+    del records
+    return statistics.median(times), peak - base, blocks
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=5000)
+    parser.add_argument('--groups', type=int, default=100)
+    parser.add_argument('--repeat', type=int, default=5, help='Timed builds per variant (median reported)')
+    parser.add_argument('--json', action='store_true', help='Print results as JSON')
+    args = parser.parse_args()
+
+    os.environ.setdefault('RATELIMIT_STORAGE_URI', 'memory://')
+    import app as app_module
+    from demo_directory import DemoDirectory
+
+    directory = DemoDirectory(BASE_DN, ADMIN_DN, 'bench')
+    directory.populate(users=args.users, groups=args.groups)
+    counts = {'users': args.users, 'groups': args.groups}
+
+    results = {}
+    for name, (search, from_entries, from_raw) in listings(app_module, directory).items():
+        for variant, build in (('entries', from_entries), ('raw', from_raw)):
+            seconds, peak, blocks = measure(search, build, args.repeat)
+            results[f"{name}/{variant}"] = {
+                'entries': counts[name],
+                'us_per_entry': round(seconds / counts[name] * 1e6, 2),
+                'peak_bytes_per_entry': round(peak / counts[name]),
+                'blocks_per_entry': round(blocks / counts[name], 1)
+            }
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{'Listing':<16} {'entries':>8} {'us/entry':>10} {'peak B/entry':>13} {'blocks/entry':>13}")
+    for name, stats in results.items():
+        print(f"{name:<16} {stats['entries']:>8} {stats['us_per_entry']:>10} "
+              f"{stats['peak_bytes_per_entry']:>13} {stats['blocks_per_entry']:>13}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Measure cold start: `import app` and the first served request, in fresh
+interpreters, with a `python -X importtime` breakdown by top-level package.
+
+The app is imported as deployed, with the default Redis rate limit storage
+unless RATELIMIT_STORAGE_URI is set; Redis does not have to be running.
+
+Exits non-zero when the median time from the start of `import app` to the
+first response exceeds --budget-ms, or when a module that should be imported
+lazily shows up during startup, so it can gate CI.
+
+Usage:
+    python benchmarks/bench_startup.py [--runs 5] [--budget-ms 600] [--top 10] [--json]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Only needed by specific code paths; importing any of them at startup is a regression.
+# redis is not listed: the default Redis rate limit storage imports it at startup.
+LAZY_MODULES = ['requests', 'bcrypt', 'tak_server', 'ldap_tls']
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import app
+imported = time.perf_counter()
+response = app.app.test_client().get('/login')
+served = time.perf_counter()
+print(json.dumps({
+    'import_ms': (imported - start) * 1000,
+    'first_request_ms': (served - imported) * 1000,
+    'total_ms': (served - start) * 1000,
+    'status': response.status_code,
+    'modules': sorted(sys.modules),
+}))
+"""
+
+
+def run_probe():
+    """Start a fresh interpreter, import the app and serve one request."""
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', PROBE],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True
+    )
+    timings = json.loads(result.stdout.strip().splitlines()[-1])
+    return timings, parse_importtime(result.stderr)
+
+
+def parse_importtime(output):
+    """Sum -X importtime self times (us) per top-level package."""
+    totals = {}
+    for line in output.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        fields = line[len('import time:'):].split('|')
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue
+        package = fields[2].strip().split('.')[0]
+        totals[package] = totals.get(package, 0) + int(fields[0])
+    return totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--budget-ms', type=float, default=float(os.environ.get('STARTUP_BUDGET_MS', 600)))
+    parser.add_argument('--top', type=int, default=10, help='Packages to show in the import breakdown')
+    parser.add_argument('--json', action='store_true', help='Print results as JSON')
+    args = parser.parse_args()
+
+    runs = [run_probe() for _ in range(args.runs)]
+    timings = [timing for timing, _ in runs]
+    packages = {}
+    for _, breakdown in runs:
+        for package, self_us in breakdown.items():
+            packages.setdefault(package, []).append(self_us)
+
+    results = {
+        'import_ms': round(statistics.median(t['import_ms'] for t in timings), 1),
+        'first_request_ms': round(statistics.median(t['first_request_ms'] for t in timings), 1),
+        'total_ms': round(statistics.median(t['total_ms'] for t in timings), 1),
+        'budget_ms': args.budget_ms,
+        'eager_lazy_modules': sorted(set(LAZY_MODULES) & set(timings[0]['modules'])),
+        'packages_ms': {
+            package: round(statistics.median(samples) / 1000, 1)
+            for package, samples in sorted(packages.items(), key=lambda item: -statistics.median(item[1]))[:args.top]
+        },
+    }
+    failures = []
+    if results['total_ms'] > args.budget_ms:
+        failures.append(f"startup {results['total_ms']} ms exceeds budget {args.budget_ms} ms")
+    if results['eager_lazy_modules']:
+        failures.append(f"imported at startup: {', '.join(results['eager_lazy_modules'])}")
+    results['ok'] = not failures
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"import app:     {results['import_ms']:>8} ms")
+        print(f"first request:  {results['first_request_ms']:>8} ms")
+        print(f"total:          {results['total_ms']:>8} ms (budget {args.budget_ms} ms)")
+        print(f"\n{'Package':<24} {'self (ms)':>10}")
+        for package, ms in results['packages_ms'].items():
+            print(f"{package:<24} {ms:>10}")
+        for failure in failures:
+            print(f"\nFAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
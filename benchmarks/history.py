@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+Append-only history of benchmark results, keyed by commit, and regression checks.
+
+bench_api.py appends every run to benchmarks/results/history.jsonl as one
+JSON line (the same document it writes to its results file). Lines are
+only ever appended; several runs of one commit are pooled when comparing.
+
+A latency regression is a one-sided Mann-Whitney U test on the per-request
+latency samples of the current commit against the baseline commit
+(p < --alpha) with the median at least --min-change slower. A memory
+regression compares an endpoint's peak RSS with the runs of the preceding
+--window commits: more than three standard deviations and --min-change
+above their mean, or, with fewer than three baseline runs, twice
+--min-change above it.
+
+Usage:
+    python benchmarks/history.py add benchmarks/results/api-*.json
+    python benchmarks/history.py list
+    python benchmarks/history.py check [--baseline COMMIT] [--commit COMMIT]
+"""
+import argparse
+import json
+import math
+import os
+import statistics
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HISTORY_FILE = os.path.join(ROOT, 'benchmarks', 'results', 'history.jsonl')
+
+ALPHA = 0.01
+MIN_CHANGE = 0.05
+MIN_SAMPLES = 10
+WINDOW = 5
+
+
+def load(path=HISTORY_FILE):
+    """Every run in the history file, oldest first; a torn last line is skipped."""
+    runs = []
+    if not os.path.exists(path):
+        return runs
+    with open(path) as f:
+        for line in f:
+            try:
+                runs.append(json.loads(line))
+            except ValueError:
+                continue
+    return runs
+
+
+def append(results, path=HISTORY_FILE):
+    """Append one run; a run already recorded (same commit and timestamp) is skipped."""
+    key = (results.get('commit'), results.get('timestamp'))
+    if any((run.get('commit'), run.get('timestamp')) == key for run in load(path)):
+        return False
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    line = json.dumps(results, separators=(',', ':'))
+    # One write of a whole line, so concurrent appenders cannot interleave
+    # within a record
+    with open(path, 'a') as f:
+        f.write(line + '\n')
+    return True
+
+
+def commits(runs, benchmark='api'):
+    """Commits with runs of benchmark, in the order they first appear."""
+    seen = []
+    for run in runs:
+        if run.get('benchmark') == benchmark and run.get('commit') not in seen:
+            seen.append(run.get('commit'))
+    return seen
+
+
+def series(runs, benchmark='api'):
+    """{scenario: {endpoint: {commit: pooled stats}}} for one benchmark.
+
+    Pooled stats hold every run's samples_ms, p50_ms, p99_ms,
+    throughput_rps and peak_rss_mb as lists.
+    """
+    table = {}
+    for run in runs:
+        if run.get('benchmark') != benchmark:
+            continue
+        for scenario in run.get('scenarios', []):
+            key = f"{scenario['users']}x{scenario['groups']}"
+            for endpoint, stats in scenario.get('endpoints', {}).items():
+                pooled = table.setdefault(key, {}).setdefault(endpoint, {}).setdefault(run['commit'], {
+                    'samples_ms': [], 'p50_ms': [], 'p99_ms': [], 'throughput_rps': [], 'peak_rss_mb': []
+                })
+                pooled['samples_ms'].extend(stats.get('samples_ms', []))
+                for field in ('p50_ms', 'p99_ms', 'throughput_rps', 'peak_rss_mb'):
+                    if field in stats:
+                        pooled[field].append(stats[field])
+    return table
+
+
+def mann_whitney_greater(current, baseline):
+    """One-sided p-value that current tends to be larger than baseline.
+
+    Normal approximation with tie and continuity corrections; needs about
+    ten values on each side to be meaningful.
+    """
+    n1, n2 = len(current), len(baseline)
+    values = sorted([(value, 0) for value in current] + [(value, 1) for value in baseline])
+    rank_sum = 0.0
+    tie_term = 0
+    i = 0
+    while i < len(values):
+        j = i
+        while j < len(values) and values[j][0] == values[i][0]:
+            j += 1
+        # Tied values share the mean of the ranks they span (1-based)
+        rank = (i + j + 1) / 2
+        rank_sum += rank * sum(1 for _, group in values[i:j] if group == 0)
+        tie_term += (j - i) ** 3 - (j - i)
+        i = j
+    n = n1 + n2
+    u = rank_sum - n1 * (n1 + 1) / 2
+    variance = n1 * n2 / 12 * ((n + 1) - tie_term / (n * (n - 1)))
+    if variance <= 0:
+        return 1.0
+    z = (u - n1 * n2 / 2 - 0.5) / math.sqrt(variance)
+    return 0.5 * math.erfc(z / math.sqrt(2))
+
+
+def latency_regression(current, baseline, alpha=ALPHA, min_change=MIN_CHANGE):
+    """Compare pooled latency samples; returns a finding dict or None."""
+    if len(current) < MIN_SAMPLES or len(baseline) < MIN_SAMPLES:
+        return None
+    before, after = statistics.median(baseline), statistics.median(current)
+    if before <= 0 or after < before * (1 + min_change):
+        return None
+    p_value = mann_whitney_greater(current, baseline)
+    if p_value >= alpha:
+        return None
+    return {'metric': 'latency p50 (ms)', 'baseline': before, 'current': after,
+            'change_pct': 100 * (after / before - 1), 'evidence': f"Mann-Whitney p={p_value:.2g}"}
+
+
+def memory_regression(current, history, min_change=MIN_CHANGE):
+    """Compare peak RSS values with those of earlier commits; returns a finding dict or None."""
+    if not current or not history:
+        return None
+    mean, value = statistics.mean(history), statistics.mean(current)
+    if mean <= 0:
+        return None
+    if len(history) >= 3:
+        spread = statistics.stdev(history)
+        if value <= mean + 3 * spread or value < mean * (1 + min_change):
+            return None
+        evidence = f"{(value - mean) / spread:.1f} sd over {len(history)} runs" if spread else f"constant over {len(history)} runs"
+    elif value < mean * (1 + 2 * min_change):
+        return None
+    else:
+        evidence = f"+{100 * (value / mean - 1):.0f}% (only {len(history)} baseline run{'s' if len(history) > 1 else ''})"
+    return {'metric': 'peak RSS (MB)', 'baseline': mean, 'current': value,
+            'change_pct': 100 * (value / mean - 1), 'evidence': evidence}
+
+
+def find_regressions(runs, commit=None, baseline=None, benchmark='api',
+                     alpha=ALPHA, min_change=MIN_CHANGE, window=WINDOW):
+    """Regressions of commit (default the latest) against baseline (default the one before it).
+
+    Returns (commit, baseline, findings); each finding names its scenario
+    and endpoint.
+    """
+    order = commits(runs, benchmark)
+    if commit is None and order:
+        commit = order[-1]
+    if commit not in order:
+        return commit, baseline, []
+    earlier = order[:order.index(commit)]
+    if baseline is None and earlier:
+        baseline = earlier[-1]
+    if baseline not in earlier:
+        return commit, baseline, []
+    memory_window = earlier[max(0, len(earlier) - window):]
+
+    findings = []
+    for scenario, endpoints in series(runs, benchmark).items():
+        for endpoint, by_commit in endpoints.items():
+            now = by_commit.get(commit)
+            if not now:
+                continue
+            found = []
+            if baseline in by_commit:
+                found.append(latency_regression(now['samples_ms'], by_commit[baseline]['samples_ms'], alpha, min_change))
+            history = [value for past in memory_window for value in by_commit.get(past, {}).get('peak_rss_mb', [])]
+            found.append(memory_regression(now['peak_rss_mb'], history, min_change))
+            findings.extend(dict(finding, scenario=scenario, endpoint=endpoint) for finding in found if finding)
+    return commit, baseline, findings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('command', choices=['add', 'list', 'check'])
+    parser.add_argument('files', nargs='*', help='Result files to add')
+    parser.add_argument('--history', default=HISTORY_FILE, help='History file')
+    parser.add_argument('--commit', help='Commit to check (default the latest)')
+    parser.add_argument('--baseline', help='Commit to compare against (default the one before)')
+    parser.add_argument('--alpha', type=float, default=ALPHA, help='Significance level for latency')
+    parser.add_argument('--min-change', type=float, default=MIN_CHANGE, help='Smallest relative change to report')
+    parser.add_argument('--window', type=int, default=WINDOW, help='Earlier commits forming the memory baseline')
+    args = parser.parse_args()
+
+    if args.command == 'add':
+        for path in args.files:
+            with open(path) as f:
+                added = append(json.load(f), args.history)
+            print(f"{'Added' if added else 'Already recorded'}: {path}")
+        return
+
+    runs = load(args.history)
+    if args.command == 'list':
+        for commit in commits(runs):
+            count = sum(1 for run in runs if run.get('commit') == commit)
+            print(f"{commit[:12]}  {count} run{'s' if count > 1 else ''}")
+        return
+
+    commit, baseline, findings = find_regressions(
+        runs, args.commit, args.baseline, alpha=args.alpha, min_change=args.min_change, window=args.window
+    )
+    if not baseline:
+        print(f"No baseline to compare {commit} against")
+        return
+    print(f"{commit[:12]} against {baseline[:12]}: {len(findings)} regression{'s' if len(findings) != 1 else ''}")
+    for finding in findings:
+        print(f"  {finding['scenario']:<12} {finding['endpoint']:<30} {finding['metric']:<18} "
+              f"{finding['baseline']:.2f} -> {finding['current']:.2f} ({finding['change_pct']:+.1f}%, {finding['evidence']})")
+    sys.exit(1 if findings else 0)
+
+
+if __name__ == '__main__':
+    main()
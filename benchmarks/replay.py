@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+"""
+Replay recorded traffic against a running instance.
+
+Reads the JSONL traces written with TRAFFIC_RECORD_FILE set and sends each
+request at its recorded offset from the first one, divided by --speed
+(--speed 0 sends as fast as the workers allow). --workers threads each keep
+one keep-alive connection. Requests are sent as the role that made them:
+the driver logs in once per role with the --login credentials and shares
+that session across workers; traces of roles without credentials are
+skipped. Redacted values (passwords) are replaced with a fresh random
+string, and CSRF tokens come from the driver's own sessions. Usernames and
+other identifying values were recorded as pseudonyms and are sent as they
+are, so a user created by the replay is the one it later deletes.
+
+Reports throughput, error rate (connection failures and 5xx), latency
+percentiles overall and per route, responses whose status differs from
+the recording, and how far behind schedule requests were sent. The driver
+runs from one address, so per-address rate limits (the login page allows 5
+a minute) show up as 429 status mismatches; disable them on the target
+for pure load tests.
+
+Usage:
+    python benchmarks/replay.py traffic.jsonl [--url http://localhost:5000]
+        [--speed 1] [--workers 8] [--login super_admin=admin:admin123]
+        [--limit N] [--json]
+"""
+import argparse
+import http.client
+import json
+import queue
+import re
+import secrets
+import sys
+import threading
+import time
+from http.cookies import SimpleCookie
+from urllib.parse import urlencode, urlsplit
+
+REDACTED = '<redacted>'
+# The login form's hidden field, as rendered by form.hidden_tag()
+CSRF_FIELD = re.compile(r'name="csrf_token" type="hidden" value="([^"]+)"')
+
+
+def load_traces(path, limit=None):
+    """Traces from a recording, oldest first."""
+    traces = []
+    with open(path) as f:
+        for line in f:
+            try:
+                traces.append(json.loads(line))
+            except ValueError:
+                continue
+    traces.sort(key=lambda trace: trace['ts'])
+    return traces[:limit] if limit else traces
+
+
+def fill_redacted(value):
+    """Replace redacted values with random strings that satisfy the forms' length checks."""
+    if value == REDACTED:
+        return secrets.token_urlsafe(12)
+    if isinstance(value, dict):
+        return {key: fill_redacted(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [fill_redacted(item) for item in value]
+    return value
+
+
+class Client:
+    """One keep-alive HTTP connection sending a fixed set of cookies."""
+
+    def __init__(self, url, timeout=30):
+        parts = urlsplit(url)
+        self.host = parts.netloc
+        self.https = parts.scheme == 'https'
+        self.timeout = timeout
+        self.cookies = {}
+        self._conn = None
+
+    def request(self, method, path, body=None, headers=None):
+        """(status, headers, body); reconnects once if the kept-alive connection was closed."""
+        headers = dict(headers or {})
+        if self.cookies:
+            headers['Cookie'] = '; '.join(f"{name}={value}" for name, value in self.cookies.items())
+        for attempt in (0, 1):
+            if self._conn is None:
+                connection_class = http.client.HTTPSConnection if self.https else http.client.HTTPConnection
+                self._conn = connection_class(self.host, timeout=self.timeout)
+            try:
+                self._conn.request(method, path, body=body, headers=headers)
+                response = self._conn.getresponse()
+                return response.status, response.headers, response.read()
+            except (http.client.RemoteDisconnected, BrokenPipeError, ConnectionResetError):
+                self.close()
+                if attempt:
+                    raise
+
+    def remember_cookies(self, headers):
+        for header in headers.get_all('Set-Cookie') or []:
+            cookie = SimpleCookie()
+            cookie.load(header)
+            for name, morsel in cookie.items():
+                self.cookies[name] = morsel.value
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+def anonymous_session(url):
+    """(client, csrf token) for a new session, from the login page."""
+    client = Client(url)
+    status, headers, body = client.request('GET', '/login')
+    if status != 200:
+        raise RuntimeError(f"GET /login returned HTTP {status}")
+    client.remember_cookies(headers)
+    match = CSRF_FIELD.search(body.decode('utf-8', 'replace'))
+    return client, match.group(1) if match else ''
+
+
+def login(url, username, password):
+    """Log in through the form; returns (cookies, csrf token) for the session."""
+    client, token = anonymous_session(url)
+    form = urlencode({'username': username, 'password': password, 'csrf_token': token})
+    status, headers, _ = client.request('POST', '/login', form, {'Content-Type': 'application/x-www-form-urlencoded'})
+    client.remember_cookies(headers)
+    client.close()
+    if status != 302:
+        raise RuntimeError(f"Login as {username} failed with HTTP {status}")
+    return client.cookies, token
+
+
+def build_request(trace, token):
+    """(method, path, body, headers) to replay one trace."""
+    path = trace['path']
+    query = trace.get('query') or {}
+    if query:
+        path += '?' + urlencode(fill_redacted(query), doseq=True)
+    headers = {'X-CSRFToken': token} if token else {}
+    body = None
+    if 'json' in trace:
+        body = json.dumps(fill_redacted(trace['json']))
+        headers['Content-Type'] = 'application/json'
+    elif 'form' in trace:
+        form = {key: value if isinstance(value, list) else [value] for key, value in fill_redacted(trace['form']).items()}
+        if token:
+            form['csrf_token'] = [token]
+        body = urlencode(form, doseq=True)
+        headers['Content-Type'] = 'application/x-www-form-urlencoded'
+    return trace['method'], path, body, headers
+
+
+def percentiles(values):
+    ordered = sorted(values)
+    if not ordered:
+        return {}
+
+    def at(p):
+        return round(ordered[min(len(ordered) - 1, int(len(ordered) * p))] * 1000, 2)
+
+    return {'p50_ms': at(0.50), 'p90_ms': at(0.90), 'p99_ms': at(0.99), 'max_ms': round(ordered[-1] * 1000, 2)}
+
+
+def replay(traces, url, sessions, speed=1.0, workers=8, timeout=30):
+    """Send traces on schedule from worker threads; returns the results report."""
+    pending = queue.Queue(maxsize=workers * 4)
+    results = []
+    lock = threading.Lock()
+
+    def work():
+        client = Client(url, timeout)
+        while True:
+            item = pending.get()
+            if item is None:
+                break
+            trace, due = item
+            cookies, token = sessions[trace.get('role')]
+            client.cookies = cookies
+            method, path, body, headers = build_request(trace, token)
+            started = time.perf_counter()
+            try:
+                status, _, _ = client.request(method, path, body, headers)
+                error = status >= 500
+            except (OSError, http.client.HTTPException):
+                client.close()
+                status, error = None, True
+            finished = time.perf_counter()
+            with lock:
+                results.append({
+                    'route': f"{trace['method']} {trace.get('route') or trace['path']}",
+                    'status': status,
+                    'recorded_status': trace.get('status'),
+                    'error': error,
+                    'latency': finished - started,
+                    'lag': max(0.0, started - due)
+                })
+        client.close()
+
+    threads = [threading.Thread(target=work, daemon=True) for _ in range(workers)]
+    for thread in threads:
+        thread.start()
+
+    skipped = 0
+    start = time.perf_counter()
+    first = traces[0]['ts'] if traces else 0
+    for trace in traces:
+        if trace.get('role') not in sessions:
+            skipped += 1
+            continue
+        due = start + ((trace['ts'] - first) / speed if speed else 0)
+        delay = due - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        pending.put((trace, due))
+    for _ in threads:
+        pending.put(None)
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - start
+    return summarize(results, skipped, wall)
+
+
+def summarize(results, skipped, wall):
+    """Throughput, error rate and latency percentiles, overall and per route."""
+    routes = {}
+    for result in results:
+        routes.setdefault(result['route'], []).append(result)
+    errors = sum(1 for result in results if result['error'])
+    return {
+        'requests': len(results),
+        'skipped': skipped,
+        'wall_seconds': round(wall, 2),
+        'throughput_rps': round(len(results) / wall, 1) if wall else 0.0,
+        'errors': errors,
+        'error_rate': round(errors / len(results), 4) if results else 0.0,
+        'status_mismatches': sum(1 for result in results if result['status'] != result['recorded_status']),
+        'latency': percentiles([result['latency'] for result in results]),
+        'schedule_lag': percentiles([result['lag'] for result in results]),
+        'routes': {
+            route: dict(
+                requests=len(items),
+                errors=sum(1 for item in items if item['error']),
+                statuses={str(status): sum(1 for item in items if item['status'] == status)
+                          for status in sorted({item['status'] for item in items}, key=str)},
+                **percentiles([item['latency'] for item in items])
+            )
+            for route, items in sorted(routes.items())
+        }
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('traces', help='JSONL file written with TRAFFIC_RECORD_FILE')
+    parser.add_argument('--url', default='http://localhost:5000', help='Instance to replay against')
+    parser.add_argument('--speed', type=float, default=1.0, help='Speed-up over the recording; 0 for no pacing')
+    parser.add_argument('--workers', type=int, default=8, help='Concurrent connections')
+    parser.add_argument('--login', action='append', default=[], metavar='ROLE=USER:PASSWORD',
+                        help='Credentials to replay a role with (repeatable)')
+    parser.add_argument('--limit', type=int, help='Replay only the first N traces')
+    parser.add_argument('--timeout', type=float, default=30, help='Per-request timeout in seconds')
+    parser.add_argument('--json', action='store_true', help='Print the report as JSON')
+    args = parser.parse_args()
+
+    traces = load_traces(args.traces, args.limit)
+    if not traces:
+        sys.exit(f"No traces in {args.traces}")
+    # Anonymous traces (the login page, failed logins) get a session too, for its CSRF token
+    client, token = anonymous_session(args.url)
+    client.close()
+    sessions = {'anonymous': (client.cookies, token)}
+    for item in args.login:
+        role, credentials = item.split('=', 1)
+        username, password = credentials.split(':', 1)
+        sessions[role] = login(args.url, username, password)
+
+    report = replay(traces, args.url, sessions, args.speed, args.workers, args.timeout)
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f"{report['requests']} requests in {report['wall_seconds']} s ({report['throughput_rps']} req/s), "
+          f"{report['errors']} errors ({report['error_rate']:.2%}), {report['skipped']} skipped, "
+          f"{report['status_mismatches']} status mismatches")
+    latency, lag = report['latency'], report['schedule_lag']
+    if latency:
+        print(f"latency p50 {latency['p50_ms']} ms, p90 {latency['p90_ms']} ms, p99 {latency['p99_ms']} ms; "
+              f"schedule lag p99 {lag['p99_ms']} ms")
+    print(f"\n{'Route':<40} {'reqs':>6} {'err':>4} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9}  statuses")
+    for route, stats in report['routes'].items():
+        statuses = ' '.join(f"{status}:{count}" for status, count in stats['statuses'].items())
+        print(f"{route:<40} {stats['requests']:>6} {stats['errors']:>4} {stats['p50_ms']:>9} {stats['p90_ms']:>9} "
+              f"{stats['p99_ms']:>9}  {statuses}")
+
+
+if __name__ == '__main__':
+    main()
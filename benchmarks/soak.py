@@ -0,0 +1,407 @@
+#!/usr/bin/env python3
+"""
+Soak the app with mixed traffic for hours and report anything that grows.
+
+By default this process serves a generated demo directory over LDAP and
+starts the app under gunicorn against it with rate limits off, so a run
+needs neither slapd nor Redis. --fault
+puts ldap_proxy.py between the two (same spec as its --fault) to keep the
+error and timeout paths busy too. --url soaks an instance that is already
+running instead; --login must then be a super_admin.
+
+--rate requests per second are spread over a weighted mix of page views,
+listings, stats and writes, including the early-return paths (adding a
+user that exists, deleting one that does not). Every --interval seconds
+each worker's /api/profile/resources is read after a gc.collect(): RSS,
+open descriptors, TCP sockets to the directory (and how many the
+directory closed but the worker did not), threads, GC objects and the
+memory allocated since the first sample, which turns tracemalloc on,
+plus the directory's own count of open sessions.
+
+At the end each series after --warmup is tested for a monotonic upward
+trend (one-sided Mann-Kendall, p < --alpha) whose Theil-Sen growth over
+the run also exceeds a per-metric floor, and each worker's fastest
+growing allocation sites are listed. Exits 1 when anything grew.
+
+Usage:
+    python benchmarks/soak.py [--duration 3600] [--interval 60] [--rate 20]
+        [--workers 2] [--users 2000] [--groups 100] [--warmup 120]
+        [--fault search:error_rate=0.05] [--url URL --login admin:admin123]
+        [--output FILE] [--json]
+"""
+import argparse
+import itertools
+import json
+import math
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from urllib.parse import urlsplit
+
+from replay import Client, login
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+BASE_DN = 'dc=tak,dc=local'
+ADMIN_DN = 'cn=admin,dc=tak,dc=local'
+ADMIN_PASSWORD = 'soak-directory'
+ALPHA = 0.01
+MIN_SAMPLES = 6
+# Growth over the whole run below these is noise, however steady
+MIN_GROWTH = {
+    'rss_mb': 5.0,
+    'traced_mb': 2.0,
+    'fds': 3,
+    'ldap_sockets': 3,
+    'close_wait': 2,
+    'threads': 2,
+    'gc_objects': 5000,
+    'open_sessions': 3
+}
+# (weight, operation); see request_for()
+MIX = [
+    (4, 'list_users'),
+    (4, 'list_groups'),
+    (3, 'stats'),
+    (2, 'dashboard'),
+    (1, 'test_connection'),
+    (1, 'add_user'),
+    (1, 'add_existing_user'),
+    (1, 'delete_user'),
+    (1, 'delete_missing_user')
+]
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_directory(users, groups, faults):
+    """(url for the app, directory server, proxy or None) for a demo directory served over LDAP."""
+    from demo_directory import DemoLDAPServer, open_demo_directory
+    directory = open_demo_directory(BASE_DN, ADMIN_DN, ADMIN_PASSWORD, users=users, groups=groups)
+    server = DemoLDAPServer(directory).start()
+    if not faults:
+        return server.url, server, None
+    from ldap_proxy import FaultProfile, LDAPFaultProxy
+    proxy = LDAPFaultProxy(server.url, dict(FaultProfile.parse(spec) for spec in faults)).start()
+    return proxy.url, server, proxy
+
+
+def start_app(ldap_url, workers, workdir):
+    """Start gunicorn against ldap_url; returns (process, base url) once it answers."""
+    port = free_port()
+    env = dict(
+        os.environ,
+        LDAP_SERVER=ldap_url,
+        LDAP_BASE_DN=BASE_DN,
+        LDAP_ADMIN_DN=ADMIN_DN,
+        LDAP_ADMIN_PASSWORD=ADMIN_PASSWORD,
+        GUNICORN_BIND=f'127.0.0.1:{port}',
+        GUNICORN_WORKERS=str(workers),
+        RATELIMIT_ENABLED='false',
+        RATELIMIT_STORAGE_URI='memory://',
+        PROMETHEUS_MULTIPROC_DIR=os.path.join(workdir, 'metrics'),
+        LOG_FILE=os.path.join(workdir, 'app.log'),
+        LDAP_SLOW_LOG=os.path.join(workdir, 'slow.log'),
+        AUDIT_LOG_FILE=os.path.join(workdir, 'audit.log'),
+        AUDIT_DB_DIR=os.path.join(workdir, 'audit')
+    )
+    log = open(os.path.join(workdir, 'gunicorn.log'), 'w')
+    process = subprocess.Popen([sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py'],
+                               cwd=ROOT, env=env, stdout=log, stderr=subprocess.STDOUT)
+    url = f'http://127.0.0.1:{port}'
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"gunicorn exited with {process.returncode}; see {log.name}")
+        try:
+            client = Client(url, timeout=2)
+            status = client.request('GET', '/login')[0]
+            client.close()
+            if status == 200:
+                return process, url
+        except OSError:
+            pass
+        time.sleep(0.5)
+    process.terminate()
+    raise RuntimeError(f"gunicorn did not answer within 60 s; see {log.name}")
+
+
+class Traffic:
+    """Worker threads sending the MIX at a fixed overall rate."""
+
+    def __init__(self, url, session, rate, threads, seed=0):
+        self.url = url
+        self.cookies, self.token = session
+        self.interval = threads / rate
+        self.threads = threads
+        self.rng = random.Random(seed)
+        self.statuses = {}
+        self.created = []
+        self.counter = itertools.count()
+        self.lock = threading.Lock()
+        self.stopping = threading.Event()
+        self._workers = []
+
+    def request_for(self, operation):
+        """(method, path, JSON body) for one operation of the mix."""
+        n = next(self.counter)
+        if operation == 'list_users':
+            return 'GET', '/api/users', None
+        if operation == 'list_groups':
+            return 'GET', '/api/groups', None
+        if operation == 'stats':
+            return 'GET', '/api/stats', None
+        if operation == 'dashboard':
+            return 'GET', '/', None
+        if operation == 'test_connection':
+            return 'GET', '/api/test-connection', None
+        if operation in ('add_user', 'add_existing_user'):
+            with self.lock:
+                existing = self.created[-1] if self.created and operation == 'add_existing_user' else None
+            username = existing or f'soak{os.getpid()}x{n}'
+            return 'POST', '/api/users', {'username': username, 'first_name': 'Soak', 'last_name': f'User {n}',
+                                          'email': f'{username}@tak.local', 'password': f'pw-{n}-{n}'}
+        if operation == 'delete_user':
+            with self.lock:
+                username = self.created.pop(0) if self.created else f'soak-gone{n}'
+            return 'DELETE', f'/api/users/{username}', None
+        return 'DELETE', f'/api/users/soak-missing{n}', None
+
+    def start(self):
+        operations = [operation for weight, operation in MIX for _ in range(weight)]
+        for index in range(self.threads):
+            thread = threading.Thread(target=self._run, args=(operations, random.Random(self.rng.random())), daemon=True)
+            thread.start()
+            self._workers.append(thread)
+
+    def stop(self):
+        self.stopping.set()
+        for thread in self._workers:
+            thread.join()
+
+    def _run(self, operations, rng):
+        client = Client(self.url, timeout=60)
+        client.cookies = self.cookies
+        headers = {'X-CSRFToken': self.token, 'Content-Type': 'application/json'}
+        due = time.monotonic() + rng.random() * self.interval
+        while not self.stopping.is_set():
+            delay = due - time.monotonic()
+            if delay > 0 and self.stopping.wait(delay):
+                break
+            due = max(due + self.interval, time.monotonic() - self.interval)
+            operation = rng.choice(operations)
+            method, path, body = self.request_for(operation)
+            try:
+                status = client.request(method, path, json.dumps(body) if body else None, headers)[0]
+            except OSError:
+                client.close()
+                status = None
+            if operation in ('add_user', 'add_existing_user') and status == 200:
+                with self.lock:
+                    self.created.append(body['username'])
+            with self.lock:
+                counts = self.statuses.setdefault(operation, {})
+                counts[str(status)] = counts.get(str(status), 0) + 1
+        client.close()
+
+
+def sample_workers(url, cookies, workers, attempts=None):
+    """{pid: resource snapshot} for as many workers as answer within the attempts."""
+    seen = {}
+    for _ in range(attempts or workers * 8):
+        # A fresh connection each time, so gunicorn hands it to any worker
+        client = Client(url, timeout=30)
+        client.cookies = cookies
+        try:
+            status, _, body = client.request('GET', '/api/profile/resources?collect=1&trace=1&top=5')
+        except OSError:
+            continue
+        finally:
+            client.close()
+        if status == 200:
+            snapshot = json.loads(body)
+            seen[snapshot['pid']] = snapshot
+        if workers and len(seen) >= workers:
+            break
+    return seen
+
+
+def flatten(snapshot, ldap_port):
+    """The numeric series tracked for one worker snapshot."""
+    sockets = snapshot.get('sockets') or {}
+    ldap = sockets.get(str(ldap_port), {}) if ldap_port else {}
+    point = {
+        'rss_mb': snapshot['rss_mb'],
+        'fds': snapshot['fds'],
+        'ldap_sockets': sum(ldap.values()) if ldap_port else None,
+        'close_wait': sum(states.get('close_wait', 0) for states in sockets.values()),
+        'threads': snapshot['threads'],
+        'gc_objects': snapshot['gc_objects']
+    }
+    if 'tracemalloc' in snapshot:
+        point['traced_mb'] = snapshot['tracemalloc']['traced_mb']
+    return {name: value for name, value in point.items() if value is not None}
+
+
+def mann_kendall(values):
+    """One-sided p-value that values trend upwards (normal approximation, tie-corrected)."""
+    n = len(values)
+    s = sum((values[j] > values[i]) - (values[j] < values[i]) for i in range(n) for j in range(i + 1, n))
+    ties = {}
+    for value in values:
+        ties[value] = ties.get(value, 0) + 1
+    variance = (n * (n - 1) * (2 * n + 5) - sum(t * (t - 1) * (2 * t + 5) for t in ties.values())) / 18
+    if variance <= 0 or s <= 0:
+        return 1.0
+    z = (s - 1) / math.sqrt(variance)
+    return 0.5 * math.erfc(z / math.sqrt(2))
+
+
+def theil_sen(times, values):
+    """Median of pairwise slopes: a trend estimate that shrugs off outliers."""
+    slopes = sorted((values[j] - values[i]) / (times[j] - times[i])
+                    for i in range(len(times)) for j in range(i + 1, len(times)) if times[j] != times[i])
+    if not slopes:
+        return 0.0
+    middle = len(slopes) // 2
+    return slopes[middle] if len(slopes) % 2 else (slopes[middle - 1] + slopes[middle]) / 2
+
+
+def find_growth(series, warmup=0.0, alpha=ALPHA, min_samples=MIN_SAMPLES):
+    """Steadily growing metrics in {source: [{'t': seconds, metric: value}]}."""
+    findings = []
+    for source, points in sorted(series.items(), key=lambda item: str(item[0])):
+        points = [point for point in points if point['t'] >= warmup]
+        metrics = sorted({name for point in points for name in point if name != 't'})
+        for metric in metrics:
+            samples = [(point['t'], point[metric]) for point in points if metric in point]
+            if len(samples) < min_samples:
+                continue
+            times, values = zip(*samples)
+            p = mann_kendall(values)
+            slope = theil_sen(times, values)
+            growth = slope * (times[-1] - times[0])
+            if p < alpha and growth >= MIN_GROWTH.get(metric, 0):
+                findings.append({
+                    'source': source,
+                    'metric': metric,
+                    'first': values[0],
+                    'last': values[-1],
+                    'growth': round(growth, 2),
+                    'per_hour': round(slope * 3600, 2),
+                    'p_value': round(p, 5)
+                })
+    return findings
+
+
+def soak(url, cookies, traffic, duration, interval, workers, ldap_port=None, directory=None):
+    """Run traffic for duration seconds, sampling every interval; returns (series, last snapshots)."""
+    series = {}
+    last = {}
+    start = time.monotonic()
+    traffic.start()
+    try:
+        while True:
+            elapsed = time.monotonic() - start
+            for pid, snapshot in sample_workers(url, cookies, workers).items():
+                series.setdefault(f'worker {pid}', []).append(dict(flatten(snapshot, ldap_port), t=elapsed))
+                last[f'worker {pid}'] = snapshot
+            if directory is not None:
+                series.setdefault('directory', []).append({'t': elapsed, 'open_sessions': directory.open_sessions()})
+            print(f"[{elapsed:7.0f}s] {sum(sum(c.values()) for c in traffic.statuses.values())} requests, "
+                  f"{len(last)} workers sampled", file=sys.stderr)
+            if elapsed >= duration:
+                break
+            time.sleep(min(interval, max(0.0, duration - (time.monotonic() - start))))
+    finally:
+        traffic.stop()
+    return series, last
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--duration', type=float, default=3600, help='Seconds of traffic')
+    parser.add_argument('--interval', type=float, default=60, help='Seconds between resource samples')
+    parser.add_argument('--warmup', type=float, help='Seconds excluded from trend tests (default 2 intervals)')
+    parser.add_argument('--rate', type=float, default=20, help='Requests per second overall')
+    parser.add_argument('--threads', type=int, default=4, help='Client threads sending the traffic')
+    parser.add_argument('--workers', type=int, default=2, help='gunicorn workers to start (or expected at --url)')
+    parser.add_argument('--users', type=int, default=2000, help='Demo directory users')
+    parser.add_argument('--groups', type=int, default=100, help='Demo directory groups')
+    parser.add_argument('--fault', action='append', default=[], help='ldap_proxy fault spec (repeatable)')
+    parser.add_argument('--url', help='Soak a running instance instead of starting one')
+    parser.add_argument('--login', default='admin:admin123', metavar='USER:PASSWORD', help='super_admin credentials')
+    parser.add_argument('--alpha', type=float, default=ALPHA, help='Significance level of the trend test')
+    parser.add_argument('--output', help='Also write the report and raw series as JSON to this file')
+    parser.add_argument('--json', action='store_true', help='Print the report as JSON')
+    args = parser.parse_args()
+    warmup = args.warmup if args.warmup is not None else 2 * args.interval
+
+    process = server = proxy = None
+    workdir = tempfile.mkdtemp(prefix='ldap-admin-soak-')
+    try:
+        url, ldap_port = args.url, None
+        if not url:
+            ldap_url, server, proxy = start_directory(args.users, args.groups, args.fault)
+            ldap_port = urlsplit(ldap_url).port
+            process, url = start_app(ldap_url, args.workers, workdir)
+        username, password = args.login.split(':', 1)
+        session = login(url, username, password)
+        traffic = Traffic(url, session, args.rate, args.threads)
+        series, last = soak(url, session[0], traffic, args.duration, args.interval, args.workers, ldap_port, server)
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait(timeout=30)
+        if proxy is not None:
+            proxy.stop()
+        if server is not None:
+            server.stop()
+
+    findings = find_growth(series, warmup, args.alpha)
+    report = {
+        'duration_s': args.duration,
+        'interval_s': args.interval,
+        'warmup_s': warmup,
+        'faults': args.fault,
+        'requests': traffic.statuses,
+        'findings': findings,
+        'top_growth': {source: snapshot.get('tracemalloc', {}).get('top_growth', []) for source, snapshot in last.items()},
+        'proxy': proxy.snapshot() if proxy else None
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(dict(report, series=series), f, indent=2)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(f"\n{'Operation':<22} statuses")
+        for operation, statuses in sorted(traffic.statuses.items()):
+            print(f"{operation:<22} {' '.join(f'{status}:{count}' for status, count in sorted(statuses.items()))}")
+        print()
+        if not findings:
+            print(f"No steady growth in {sum(len(points) for points in series.values())} samples "
+                  f"from {len(series)} sources.")
+        for finding in findings:
+            print(f"GROWTH {finding['source']}: {finding['metric']} {finding['first']} -> {finding['last']} "
+                  f"({finding['per_hour']:+}/h, p={finding['p_value']})")
+        for source, sites in report['top_growth'].items():
+            if sites:
+                print(f"\nTop allocation growth, {source}:")
+                for site in sites:
+                    print(f"  {site['size_diff_kb']:>+10.1f} KiB {site['count_diff']:>+8} blocks  {site['where']}")
+    sys.exit(1 if findings else 0)
+
+
+if __name__ == '__main__':
+    main()
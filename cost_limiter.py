@@ -0,0 +1,95 @@
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Refill, then take `cost` tokens if available (or unconditionally when
+# forced, for charges that are only known after the LDAP search returned).
+# The balance may go negative down to -capacity so an oversized result puts
+# the caller in debt rather than being free; a refund (negative cost) never
+# lifts it above capacity.
+TOKEN_BUCKET_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local cost = tonumber(ARGV[4])
+local force = tonumber(ARGV[5])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local allowed = 0
+if force == 1 or tokens >= cost then
+    tokens = math.min(capacity, math.max(-capacity, tokens - cost))
+    allowed = 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(2 * capacity / rate) + 1)
+return {allowed, tostring(tokens)}
+"""
+
+class CostLimiter:
+    """Token bucket limiter where each call spends a caller-declared cost"""
+
+    def __init__(self, capacity, refill_rate, redis_client=None, key_prefix='ldap-admin:budget'):
+        self.capacity = float(capacity)
+        self.refill_rate = float(refill_rate)
+        self.redis_client = redis_client
+        self.key_prefix = key_prefix
+        self._script = redis_client.register_script(TOKEN_BUCKET_SCRIPT) if redis_client else None
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def consume(self, key, cost):
+        """Spend cost tokens if the bucket holds them; return (allowed, retry_after)"""
+        allowed, tokens = self._take(key, cost, force=False)
+        if allowed:
+            return True, 0
+        return False, self.retry_after(tokens, cost)
+
+    def charge(self, key, cost):
+        """Spend cost tokens unconditionally, allowing the bucket to go into debt.
+
+        One charge spends at most capacity, so a single oversized result
+        costs the caller one full bucket rather than a lockout.
+        """
+        if cost > 0:
+            self._take(key, min(cost, self.capacity), force=True)
+
+    def refund(self, key, cost):
+        """Give back cost tokens spent on a call that never reached LDAP"""
+        if cost > 0:
+            self._take(key, -cost, force=True)
+
+    def retry_after(self, tokens, cost):
+        """Seconds until the bucket holds cost tokens again"""
+        return max(1, int((min(cost, self.capacity) - tokens) / self.refill_rate + 0.999))
+
+    def reset(self):
+        """Forget all in-process buckets"""
+        with self._lock:
+            self._buckets.clear()
+
+    def _take(self, key, cost, force):
+        now = time.time()
+        if self._script is not None:
+            try:
+                allowed, tokens = self._script(
+                    keys=[f"{self.key_prefix}:{key}"],
+                    args=[self.capacity, self.refill_rate, now, cost, int(force)]
+                )
+                return bool(int(allowed)), float(tokens)
+            except Exception as e:
+                logger.warning(f"Cost limiter falling back to memory: {str(e)}")
+        return self._take_local(key, cost, force, now)
+
+    def _take_local(self, key, cost, force, now):
+        with self._lock:
+            tokens, ts = self._buckets.get(key, (self.capacity, now))
+            tokens = min(self.capacity, tokens + max(0.0, now - ts) * self.refill_rate)
+            allowed = force or tokens >= cost
+            if allowed:
+                tokens = min(self.capacity, max(-self.capacity, tokens - cost))
+            self._buckets[key] = (tokens, now)
+            return allowed, tokens
@@ -0,0 +1,421 @@
+import bisect
+import gc
+import itertools
+import logging
+import marshal
+import os
+import random
+import socket
+import socketserver
+import threading
+import time
+from contextlib import contextmanager
+
+from ldap3 import (Server, Connection, MOCK_ASYNC, MOCK_SYNC, ALL_ATTRIBUTES, BASE, LEVEL, SUBTREE,
+                   MODIFY_ADD, MODIFY_DELETE, MODIFY_REPLACE, MODIFY_INCREMENT)
+from ldap3.core.exceptions import LDAPException
+from ldap3.utils.ciDict import CaseInsensitiveDict
+
+import ldap_ber
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_FORMAT = 'ldap-admin-demo/1'
+
+FIRST_NAMES = [
+    'James', 'Maria', 'Robert', 'Aisha', 'Michael', 'Chen', 'David', 'Fatima', 'William', 'Olga',
+    'Richard', 'Priya', 'Joseph', 'Yuki', 'Thomas', 'Amara', 'Daniel', 'Sofia', 'Matthew', 'Ingrid',
+    'Anthony', 'Leila', 'Mark', 'Elena', 'Steven', 'Grace', 'Andrew', 'Nadia', 'Kevin', 'Zara',
+    'Brian', 'Hana', 'Jason', 'Camila', 'Ryan', 'Freya', 'Jacob', 'Mei', 'Tyler', 'Lucia'
+]
+LAST_NAMES = [
+    'Smith', 'Garcia', 'Johnson', 'Nguyen', 'Williams', 'Patel', 'Brown', 'Kim', 'Jones', 'Okafor',
+    'Miller', 'Hernandez', 'Davis', 'Kowalski', 'Wilson', 'Tanaka', 'Moore', 'Ivanova', 'Taylor', 'Haddad',
+    'Anderson', 'Rossi', 'Thomas', 'Silva', 'Jackson', 'Moreau', 'White', 'Cohen', 'Harris', 'Larsen',
+    'Martin', 'Novak', 'Thompson', 'Dubois', 'Clark', 'Singh', 'Lewis', 'Costa', 'Walker', 'Berg'
+]
+CALLSIGN_WORDS = [
+    'VIPER', 'RAVEN', 'GHOST', 'HAMMER', 'NOMAD', 'SABER', 'TALON', 'REAPER', 'ATLAS', 'COBRA',
+    'DAGGER', 'FALCON', 'HUNTER', 'JACKAL', 'KODIAK', 'LANCER', 'MAVERICK', 'ONYX', 'PHANTOM', 'ROGUE'
+]
+ROLES = ['Team Member', 'Team Member', 'Team Member', 'Team Lead', 'RTO', 'Medic', 'Sniper', 'Forward Observer', 'HQ']
+TEAM_COLORS = ['Cyan', 'Blue', 'Green', 'Yellow', 'Orange', 'Red', 'Purple', 'White', 'Magenta', 'Maroon']
+UNIT_LEVELS = ('Battalion', 'Company', 'Platoon')
+SEARCH_SCOPES = {0: BASE, 1: LEVEL, 2: SUBTREE}
+MODIFY_OPERATIONS = {0: MODIFY_ADD, 1: MODIFY_DELETE, 2: MODIFY_REPLACE, 3: MODIFY_INCREMENT}
+UNWILLING_TO_PERFORM = 53
+OTHER = 80
+
+class DemoDirectory:
+    """In-process LDAP stand-in filled with synthetic TAK users and groups.
+
+    Connections are ldap3 MOCK_SYNC / MOCK_ASYNC connections on one shared
+    Server, so the app talks to it through the normal ldap3 API. Entries are
+    written straight into the mock server's DIT instead of through
+    add_entry(), whose per-entry validation would take minutes for 1M
+    entries. Writes made through the app stay in this process.
+
+    The mock server evaluates every search by scanning the DIT in Python;
+    directories beyond about 100k users are for load generation and
+    snapshots rather than interactive use.
+    """
+
+    def __init__(self, base_dn, admin_dn, admin_password, users_ou='ou=users', groups_ou='ou=groups'):
+        self.base_dn = base_dn
+        self.admin_dn = admin_dn
+        self.admin_password = admin_password
+        self.users_ou = users_ou
+        self.groups_ou = groups_ou
+        self.server = Server('demo')
+        self._lock = threading.Lock()
+        # Creating the first connection gives the server its DIT
+        Connection(self.server, client_strategy=MOCK_SYNC)
+
+    def connect(self, asynchronous=False):
+        """A bound connection to the demo directory"""
+        conn = Connection(self.server, user=self.admin_dn, password=self.admin_password,
+                          client_strategy=MOCK_ASYNC if asynchronous else MOCK_SYNC)
+        conn.bind()
+        return conn
+
+    def populate(self, users=1000, groups=100, seed=0):
+        """Replace the DIT with a generated directory; returns the entry count"""
+        entries = generate_entries(
+            users, groups, seed, self.base_dn, self.users_ou, self.groups_ou, self.admin_dn, self.admin_password
+        )
+        return self._load(entries)
+
+    def save(self, path):
+        """Write the DIT to a snapshot file (marshal: fast, and loading it cannot run code)"""
+        with self._lock, _gc_paused():
+            entries = [(dn, entry._store) for dn, entry in self.server.dit.items()]
+            tmp = f"{path}.tmp"
+            with open(tmp, 'wb') as f:
+                f.write(marshal.dumps((SNAPSHOT_FORMAT, entries)))
+        os.replace(tmp, path)
+
+    def load(self, path):
+        """Replace the DIT with a snapshot written by save(); returns the entry count"""
+        # marshal.load() on a file is many times slower than loads() on its bytes
+        with open(path, 'rb') as f, _gc_paused():
+            try:
+                snapshot = marshal.loads(f.read())
+            except (EOFError, TypeError, ValueError):
+                snapshot = None
+        if not isinstance(snapshot, tuple) or len(snapshot) != 2 or snapshot[0] != SNAPSHOT_FORMAT:
+            raise ValueError(f"{path} is not a demo directory snapshot")
+        return self._load(snapshot[1])
+
+    def _load(self, entries):
+        dit = CaseInsensitiveDict()
+        store, keymap = dit._store, dit._case_insensitive_keymap
+        keymaps = {}
+        new_entry = DemoEntry.__new__
+        with self._lock, self.server.dit_lock, _gc_paused():
+            self.server.dit = dit
+            for dn, attributes in entries:
+                names = tuple(attributes)
+                shared = keymaps.get(names)
+                if shared is None:
+                    shared = keymaps[names] = {name.lower(): name for name in names}
+                entry = new_entry(DemoEntry)
+                entry._store = attributes
+                entry._case_insensitive_keymap = shared
+                store[dn] = entry
+                keymap[dn.lower()] = dn
+        return len(store)
+
+class DemoLDAPServer:
+    """Serves a DemoDirectory to real LDAP clients on a TCP port.
+
+    Each client connection gets its own mock connection to the directory;
+    requests are decoded with ldap_ber and run through the ldap3 API, so
+    searches, binds and writes behave exactly as they do in-process.
+    Extended operations (StartTLS, Who am I) are refused. Gives the fault
+    proxy and soak tests a directory without a slapd install.
+    """
+
+    def __init__(self, directory, host='127.0.0.1', port=0):
+        self.directory = directory
+        self.sessions = 0
+        self.requests = 0
+        self._clients = set()
+        self._lock = threading.Lock()
+        outer = self
+
+        class Handler(socketserver.BaseRequestHandler):
+            def handle(self):
+                outer._serve(self.request)
+
+        self._server = socketserver.ThreadingTCPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"ldap://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name='demo-ldap', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        with self._lock:
+            clients = list(self._clients)
+        for sock in clients:
+            _close_socket(sock)
+
+    def open_sessions(self):
+        with self._lock:
+            return len(self._clients)
+
+    def snapshot(self):
+        return {'url': self.url, 'sessions': self.sessions, 'open_sessions': self.open_sessions(),
+                'requests': self.requests}
+
+    def _serve(self, sock):
+        with self._lock:
+            self._clients.add(sock)
+            self.sessions += 1
+        conn = Connection(self.directory.server, client_strategy=MOCK_SYNC)
+        conn.open()
+        reader = sock.makefile('rb')
+        try:
+            while True:
+                message = ldap_ber.read_message(reader.read)
+                if message is None:
+                    break
+                message_id, operation, fields = ldap_ber.decode_request(message)
+                self.requests += 1
+                if operation == 'unbind':
+                    break
+                if operation == 'abandon':
+                    continue
+                if operation == 'bind':
+                    conn.unbind()
+                    conn = Connection(self.directory.server, user=fields['dn'] or None,
+                                      password=fields['password'], client_strategy=MOCK_SYNC)
+                    conn.bind()
+                sock.sendall(self._respond(conn, message_id, operation, fields))
+        except (OSError, ValueError) as e:
+            logger.debug(f"Demo LDAP session ended: {str(e)}")
+        finally:
+            conn.unbind()
+            reader.close()
+            with self._lock:
+                self._clients.discard(sock)
+
+    def _respond(self, conn, message_id, operation, fields):
+        tag = ldap_ber.FINAL_RESPONSE.get(operation)
+        if tag is None or operation == 'extended':
+            return ldap_ber.encode_result(message_id, tag or ldap_ber.FINAL_RESPONSE['extended'],
+                                          UNWILLING_TO_PERFORM, diagnostic=f"{operation} is not supported")
+        try:
+            entries = self._execute(conn, message_id, operation, fields)
+        except LDAPException as e:
+            return ldap_ber.encode_result(message_id, tag, OTHER, diagnostic=str(e))
+        result = conn.result or {}
+        return entries + ldap_ber.encode_result(message_id, tag, result.get('result', 0),
+                                                result.get('dn') or '', result.get('message') or '')
+
+    @staticmethod
+    def _present_attributes(raw_attributes, types_only):
+        # The mock lists requested attributes an entry lacks with no values;
+        # a server leaves them out, and sends names alone when only types
+        # were asked for
+        if types_only:
+            return [(name, []) for name in raw_attributes]
+        return [(name, values) for name, values in raw_attributes.items() if values]
+
+    def _execute(self, conn, message_id, operation, fields):
+        if operation == 'search' and not fields['base'] and fields['scope'] == 0:
+            conn.result = {'result': 0}
+            return ldap_ber.encode_search_entry(message_id, '', self._root_dse(fields['attributes']))
+        entries = b''
+        if operation == 'search':
+            conn.search(fields['base'], fields['filter'], search_scope=SEARCH_SCOPES[fields['scope']],
+                        attributes=fields['attributes'] or ALL_ATTRIBUTES,
+                        size_limit=fields['size_limit'], types_only=fields['types_only'])
+            entries = b''.join(
+                ldap_ber.encode_search_entry(message_id, item['dn'],
+                                             self._present_attributes(item['raw_attributes'], fields['types_only']))
+                for item in conn.response if item['type'] == 'searchResEntry'
+            )
+        elif operation == 'add':
+            conn.add(fields['dn'], attributes=fields['attributes'])
+        elif operation == 'delete':
+            conn.delete(fields['dn'])
+        elif operation == 'modify':
+            changes = {}
+            for kind, name, values in fields['changes']:
+                changes.setdefault(name, []).append((MODIFY_OPERATIONS[kind], values))
+            conn.modify(fields['dn'], changes)
+        elif operation == 'modify_dn':
+            conn.modify_dn(fields['dn'], fields['new_rdn'], delete_old_dn=fields['delete_old_rdn'],
+                           new_superior=fields['new_superior'])
+        elif operation == 'compare':
+            conn.compare(fields['dn'], fields['attribute'], fields['value'])
+        return entries
+
+    def _root_dse(self, requested):
+        # Enough of a root DSE for clients that read server info on bind;
+        # there is no subschemaSubentry, so they skip loading a schema
+        attributes = {
+            'objectClass': [b'top'],
+            'namingContexts': [self.directory.base_dn.encode()],
+            'supportedLDAPVersion': [b'3'],
+            'vendorName': [b'ldap-admin demo directory']
+        }
+        wanted = {name.lower() for name in requested}
+        if not wanted or wanted & {'*', '+'}:
+            return attributes.items()
+        return [(name, values) for name, values in attributes.items() if name.lower() in wanted]
+
+def _close_socket(sock):
+    try:
+        sock.shutdown(socket.SHUT_RDWR)
+    except OSError:
+        pass
+    sock.close()
+
+class DemoEntry(CaseInsensitiveDict):
+    """Mock DIT entry sharing its attribute-name map with entries of the same shape.
+
+    The map is copied on the first write that could change it, so adding or
+    removing an attribute on one entry never affects the others.
+    """
+
+    _keymap_shared = True
+
+    def __setitem__(self, key, item):
+        self._own_keymap()
+        super().__setitem__(key, item)
+
+    def __delitem__(self, key):
+        self._own_keymap()
+        super().__delitem__(key)
+
+    def _own_keymap(self):
+        if self._keymap_shared:
+            self._case_insensitive_keymap = dict(self._case_insensitive_keymap)
+            self._keymap_shared = False
+
+def generate_entries(users, groups, seed, base_dn, users_ou, groups_ou, admin_dn, admin_password):
+    """Yield (dn, raw attributes) for a synthetic TAK directory.
+
+    Users get names, callsigns, roles and unit assignments. Groups form a
+    battalion > company > platoon hierarchy of nested groupOfNames plus
+    colour team channels; platoon sizes follow a Zipf-like skew, so a few
+    groups are very large and most are small.
+    """
+    rng = random.Random(seed)
+    users_base = f"{users_ou},{base_dn}"
+    groups_base = f"{groups_ou},{base_dn}"
+
+    yield base_dn, _raw({'objectClass': ['top', 'domain'], 'dc': base_dn.split(',')[0].split('=')[1]}, base_dn)
+    yield admin_dn, _raw({'objectClass': ['person'], 'sn': 'admin', 'userPassword': admin_password}, admin_dn)
+    for ou in (users_base, groups_base):
+        yield ou, _raw({'objectClass': ['organizationalUnit'], 'ou': ou.split(',')[0].split('=')[1]}, ou)
+
+    # Group names: the unit hierarchy first, the rest as colour team channels
+    platoons = max(1, groups * 7 // 10)
+    companies = max(1, platoons // 4)
+    battalions = max(1, companies // 4)
+    hierarchy = [(f"{UNIT_LEVELS[0]}-{b + 1}", None) for b in range(battalions)]
+    hierarchy += [(f"{UNIT_LEVELS[1]}-{chr(65 + c % 26)}{c // 26 or ''}", c % battalions) for c in range(companies)]
+    hierarchy += [(f"{UNIT_LEVELS[2]}-{p + 1}", battalions + p % companies) for p in range(platoons)]
+    teams = [f"{TEAM_COLORS[t % len(TEAM_COLORS)]}-Team{'-' + str(t // len(TEAM_COLORS)) if t >= len(TEAM_COLORS) else ''}"
+             for t in range(max(0, groups - len(hierarchy)))]
+    first_platoon = battalions + companies
+
+    # Zipf-like weights: platoon k gets 1/(k+1) of the users, roughly
+    weights = list(itertools.accumulate(1.0 / (k + 1) for k in range(platoons)))
+    platoon_members = [[] for _ in range(platoons)]
+    team_members = [[] for _ in teams]
+
+    # Every value that repeats across users is encoded once up front
+    people = [(first.encode(), last.encode(), f"{first} {last}".encode(), f"{first[0]}{last}".lower())
+              for first in FIRST_NAMES for last in LAST_NAMES]
+    callsigns = [f"{word}-{k:02d}".encode() for word in CALLSIGN_WORDS for k in range(1, 100)]
+    roles = [role.encode() for role in ROLES]
+    units = [name.encode() for name, _ in hierarchy[first_platoon:]]
+    object_classes = (b'top', b'person', b'organizationalPerson', b'inetOrgPerson')
+    rand = rng.random
+    for n in range(users):
+        first, last, cn, handle = people[int(rand() * len(people))]
+        uid = f"{handle}{n}"
+        dn = f"uid={uid},{users_base}"
+        raw_dn = dn.encode()
+        platoon = bisect.bisect_left(weights, rand() * weights[-1])
+        platoon_members[platoon].append(raw_dn)
+        if teams and rand() < 0.3:
+            team_members[int(rand() * len(teams))].append(raw_dn)
+        yield dn, {
+            'objectClass': list(object_classes),
+            'uid': [uid.encode()],
+            'cn': [cn],
+            'sn': [last],
+            'givenName': [first],
+            'displayName': [callsigns[int(rand() * len(callsigns))]],
+            'mail': [f"{uid}@tak.local".encode()],
+            'title': [roles[int(rand() * len(roles))]],
+            'ou': [units[platoon]],
+            'employeeNumber': [str(10000 + n).encode()],
+            'entryDN': [raw_dn]
+        }
+
+    children = [[] for _ in hierarchy]
+    for index, (name, parent) in enumerate(hierarchy):
+        if parent is not None:
+            children[parent].append(f"cn={name},{groups_base}".encode())
+    for index, (name, parent) in enumerate(hierarchy):
+        members = children[index] + (platoon_members[index - first_platoon] if index >= first_platoon else [])
+        yield _group(name, f"{name.split('-')[0]} {name.split('-', 1)[1]}", members or [admin_dn.encode()], groups_base)
+    for name, members in zip(teams, team_members):
+        yield _group(name, f"{name.replace('-', ' ')} channel", members or [admin_dn.encode()], groups_base)
+
+@contextmanager
+def _gc_paused():
+    # Millions of small containers: cyclic GC passes while building or
+    # unpickling the DIT would cost more than the work itself
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+def _group(name, description, members, groups_base):
+    dn = f"cn={name},{groups_base}"
+    return dn, {
+        'objectClass': [b'top', b'groupOfNames'],
+        'cn': [name.encode()],
+        'description': [description.encode()],
+        'member': members,
+        'entryDN': [dn.encode()]
+    }
+
+def _raw(attributes, dn):
+    raw = {name: [value.encode() for value in (values if isinstance(values, list) else [values])]
+           for name, values in attributes.items()}
+    raw['entryDN'] = [dn.encode()]
+    return raw
+
+def open_demo_directory(base_dn, admin_dn, admin_password, users=1000, groups=100, seed=0, snapshot=None):
+    """Build a DemoDirectory, from snapshot when it exists; a new build is saved to snapshot"""
+    directory = DemoDirectory(base_dn, admin_dn, admin_password)
+    start = time.monotonic()
+    if snapshot and os.path.exists(snapshot):
+        count = directory.load(snapshot)
+        logger.info(f"Loaded demo directory snapshot {snapshot}: {count} entries in {time.monotonic() - start:.1f}s")
+        return directory
+    count = directory.populate(users, groups, seed)
+    logger.info(f"Generated demo directory: {count} entries in {time.monotonic() - start:.1f}s")
+    if snapshot:
+        directory.save(snapshot)
+    return directory
@@ -0,0 +1,167 @@
+import sys
+import threading
+import time
+from array import array
+
+from ldap_fanout import attribute_value
+
+def _offsets(counts):
+    """CSR row offsets: row i spans offsets[i]:offsets[i + 1]"""
+    offsets = array('I', [0]) * (len(counts) + 1)
+    total = 0
+    for index, count in enumerate(counts):
+        total += count
+        offsets[index + 1] = total
+    return offsets
+
+class DirectorySnapshot:
+    """Every user and group from one pair of listing searches, stored by column.
+
+    A dict per entry costs hundreds of bytes before any value is stored, and
+    member DNs repeat each user's DN once per group. Here each attribute is
+    one list of strings (names and descriptions interned, since few distinct
+    values are shared by many entries), users and groups are numbered by
+    position, and membership is kept as integer ids in two CSR pairs of
+    array('I'): members of each group and groups of each user. DNs are only
+    needed to resolve members while building and are not kept. Members that
+    are not listed users (nested groups, the admin entry) count towards a
+    group's member_count without an id.
+
+    Built from the raw response dicts search_many() returns; users() and
+    groups() give the same records as app.user_records() and
+    app.group_records().
+    """
+
+    def __init__(self, user_entries, group_entries, loaded_at=None):
+        self.loaded_at = time.monotonic() if loaded_at is None else loaded_at
+        intern = sys.intern
+        self.uids, self.first_names, self.last_names, self.emails = [], [], [], []
+        ids = {}
+        for entry in user_entries:
+            attributes = entry['attributes']
+            ids[entry['dn'].lower()] = len(self.uids)
+            self.uids.append(attribute_value(attributes, 'uid'))
+            self.first_names.append(intern(attribute_value(attributes, 'givenName')))
+            self.last_names.append(intern(attribute_value(attributes, 'sn')))
+            self.emails.append(attribute_value(attributes, 'mail'))
+
+        self.group_names, self.group_descriptions = [], []
+        self.member_counts = array('I')
+        self.member_ids = array('I')
+        member_totals = []
+        user_totals = array('I', [0]) * len(self.uids)
+        for entry in group_entries:
+            attributes = entry['attributes']
+            self.group_names.append(intern(attribute_value(attributes, 'cn')))
+            self.group_descriptions.append(intern(attribute_value(attributes, 'description')))
+            members = attributes.get('member') or []
+            self.member_counts.append(len(members))
+            start = len(self.member_ids)
+            for member in members:
+                user = ids.get(str(member).lower())
+                if user is not None:
+                    self.member_ids.append(user)
+                    user_totals[user] += 1
+            member_totals.append(len(self.member_ids) - start)
+        self.member_offsets = _offsets(member_totals)
+
+        # Invert members into groups per user, in group order: a counting
+        # sort over the offsets, with no per-user list along the way
+        self.group_offsets = _offsets(user_totals)
+        self.group_ids = array('I', [0]) * len(self.member_ids)
+        fill = array('I', self.group_offsets[:-1])
+        for group in range(len(self.group_names)):
+            for user in self.member_ids[self.member_offsets[group]:self.member_offsets[group + 1]]:
+                self.group_ids[fill[user]] = group
+                fill[user] += 1
+
+    def users(self):
+        """User listing records"""
+        names, offsets, group_ids = self.group_names, self.group_offsets, self.group_ids
+        return [{
+            'username': self.uids[index],
+            'first_name': self.first_names[index],
+            'last_name': self.last_names[index],
+            'email': self.emails[index],
+            'groups': [names[group] for group in group_ids[offsets[index]:offsets[index + 1]]]
+        } for index in range(len(self.uids))]
+
+    def groups(self):
+        """Group listing records"""
+        return [{
+            'name': name,
+            'description': description,
+            'member_count': count
+        } for name, description, count in zip(self.group_names, self.group_descriptions, self.member_counts)]
+
+    def members(self, group):
+        """User ids listed in group (by position)"""
+        return self.member_ids[self.member_offsets[group]:self.member_offsets[group + 1]]
+
+class DirectoryCache:
+    """The last DirectorySnapshot of this process, reloaded after ttl seconds.
+
+    load() returns (user entries, group entries). Concurrent callers of an
+    expired cache wait for one reload rather than each searching the whole
+    directory; invalidate() drops the snapshot after a write.
+    """
+
+    def __init__(self, load, ttl):
+        self.load = load
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.loads = 0
+        self.discarded = 0
+        self.invalidations = 0
+        self._snapshot = None
+        self._generation = 0
+        self._lock = threading.Lock()
+        # Counters have their own lock so hits never wait behind a reload
+        self._stats_lock = threading.Lock()
+
+    def get(self):
+        snapshot = self._snapshot
+        if snapshot is not None and time.monotonic() - snapshot.loaded_at < self.ttl:
+            self._count('hits')
+            return snapshot
+        with self._lock:
+            snapshot = self._snapshot
+            if snapshot is not None and time.monotonic() - snapshot.loaded_at < self.ttl:
+                # Loaded by the caller this one waited for
+                self._count('hits')
+                return snapshot
+            self._count('misses')
+            generation, started = self._generation, time.monotonic()
+            snapshot = DirectorySnapshot(*self.load(), loaded_at=started)
+            self._count('loads')
+            # A write during the load may be missing from it; serve it to
+            # this caller but do not keep it
+            if generation == self._generation:
+                self._snapshot = snapshot
+            else:
+                self._count('discarded')
+            return snapshot
+
+    def invalidate(self):
+        self._generation += 1
+        self._count('invalidations')
+        self._snapshot = None
+
+    def snapshot(self):
+        current = self._snapshot
+        with self._stats_lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'loads': self.loads,
+                'discarded': self.discarded,
+                'invalidations': self.invalidations,
+                'users': len(current.uids) if current else 0,
+                'groups': len(current.group_names) if current else 0,
+                'age_seconds': round(time.monotonic() - current.loaded_at, 3) if current else 0
+            }
+
+    def _count(self, name):
+        with self._stats_lock:
+            setattr(self, name, getattr(self, name) + 1)
@@ -0,0 +1,123 @@
+import json
+import logging
+import os
+import queue
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+class Subscription:
+    """One listener's bounded inbox; the oldest event is dropped when full"""
+
+    def __init__(self, bus, max_events=100):
+        self.bus = bus
+        self._queue = queue.Queue(maxsize=max_events)
+
+    def get(self, timeout=None):
+        """Next (event_type, data), or None after timeout"""
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        self.bus.unsubscribe(self)
+
+    def _deliver(self, item):
+        while True:
+            try:
+                self._queue.put_nowait(item)
+                return True
+            except queue.Full:
+                try:
+                    self._queue.get_nowait()
+                except queue.Empty:
+                    pass
+                with self.bus._lock:
+                    self.bus.dropped += 1
+
+class EventBus:
+    """Publish/subscribe for UI push events, shared across workers via Redis.
+
+    Each process holds one Redis pub/sub connection, read by a background
+    thread that fans messages out to local subscribers, so open browser tabs
+    cost no Redis connections of their own. Without Redis, events only reach
+    subscribers in the publishing process.
+    """
+
+    def __init__(self, get_redis, channel='ldap-admin:events'):
+        self.get_redis = get_redis
+        self.channel = channel
+        self.published = 0
+        self.delivered = 0
+        self.dropped = 0
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._listener_pid = None
+
+    def publish(self, event_type, data):
+        message = json.dumps({'type': event_type, 'data': data})
+        with self._lock:
+            self.published += 1
+        client = self.get_redis()
+        if client is not None:
+            try:
+                client.publish(self.channel, message)
+                return
+            except Exception as e:
+                logger.warning(f"Event publish failed, delivering locally: {str(e)}")
+        self._fan_out(message)
+
+    def subscribe(self, max_events=100):
+        self._ensure_listener()
+        subscription = Subscription(self, max_events)
+        with self._lock:
+            self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'subscribers': len(self._subscribers),
+                'published': self.published,
+                'delivered': self.delivered,
+                'dropped': self.dropped
+            }
+
+    def _fan_out(self, message):
+        try:
+            event = json.loads(message)
+        except ValueError:
+            return
+        with self._lock:
+            subscribers = list(self._subscribers)
+            self.delivered += len(subscribers)
+        for subscription in subscribers:
+            subscription._deliver((event['type'], event['data']))
+
+    def _ensure_listener(self):
+        if self._listener_pid == os.getpid():
+            return
+        with self._lock:
+            if self._listener_pid == os.getpid():
+                return
+            self._listener_pid = os.getpid()
+        if self.get_redis() is not None:
+            threading.Thread(target=self._listen, name='event-bus', daemon=True).start()
+
+    def _listen(self):
+        while True:
+            try:
+                pubsub = self.get_redis().pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(self.channel)
+                for message in pubsub.listen():
+                    if message.get('type') == 'message':
+                        self._fan_out(message['data'])
+            except Exception as e:
+                logger.warning(f"Event bus listener reconnecting: {str(e)}")
+                time.sleep(1)
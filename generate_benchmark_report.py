@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+import os
+import sys
+import html
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmarks'))
+import history
+
+CHART_COLORS = ['#1f77b4', '#ff7f0e', '#2ca02c', '#d62728', '#9467bd', '#8c564b', '#e377c2', '#7f7f7f', '#bcbd22', '#17becf']
+
+def median(values):
+    """Median of a run's values, or None when the commit has no runs."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    middle = len(ordered) // 2
+    return ordered[middle] if len(ordered) % 2 else (ordered[middle - 1] + ordered[middle]) / 2
+
+def svg_chart(title, labels, lines, unit, width=720, height=260):
+    """Inline SVG line chart; lines maps a name to one value (or None) per label."""
+    values = [value for points in lines.values() for value in points if value is not None]
+    if not values:
+        return ''
+    top = max(values) * 1.1 or 1
+    left, right, upper, lower = 60, 180, 30, 40
+    plot_w, plot_h = width - left - right, height - upper - lower
+    step = plot_w / max(1, len(labels) - 1)
+
+    def x(i):
+        return left + i * step
+
+    def y(value):
+        return upper + plot_h * (1 - value / top)
+
+    parts = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" font-family="sans-serif" font-size="11">',
+        f'<text x="{left}" y="18" font-size="13">{html.escape(title)}</text>',
+        f'<line x1="{left}" y1="{upper + plot_h}" x2="{left + plot_w}" y2="{upper + plot_h}" stroke="#999"/>',
+        f'<line x1="{left}" y1="{upper}" x2="{left}" y2="{upper + plot_h}" stroke="#999"/>'
+    ]
+    for fraction in (0, 0.5, 1):
+        parts.append(f'<text x="{left - 6}" y="{y(top * fraction) + 4:.1f}" text-anchor="end">{top * fraction:.3g} {unit}</text>')
+    for i, label in enumerate(labels):
+        parts.append(f'<text x="{x(i):.1f}" y="{height - lower + 16}" text-anchor="middle">{html.escape(label)}</text>')
+    for n, (name, points) in enumerate(lines.items()):
+        color = CHART_COLORS[n % len(CHART_COLORS)]
+        coords = [f"{x(i):.1f},{y(value):.1f}" for i, value in enumerate(points) if value is not None]
+        if len(coords) > 1:
+            parts.append(f'<polyline fill="none" stroke="{color}" stroke-width="1.5" points="{" ".join(coords)}"/>')
+        for coord in coords:
+            cx, cy = coord.split(',')
+            parts.append(f'<circle cx="{cx}" cy="{cy}" r="2.5" fill="{color}"/>')
+        parts.append(f'<text x="{left + plot_w + 10}" y="{upper + 12 + n * 14}" fill="{color}">{html.escape(name)}</text>')
+    parts.append('</svg>')
+    return ''.join(parts)
+
+def trend_table(report, endpoints, shown, field, fmt):
+    """Markdown table of one field per endpoint (rows) and commit (columns)."""
+    report.append("| Endpoint | " + " | ".join(commit[:8] for commit in shown) + " |")
+    report.append("|----------|" + "|".join("-------:" for _ in shown) + "|")
+    for endpoint, by_commit in endpoints.items():
+        cells = []
+        for commit in shown:
+            value = median(by_commit.get(commit, {}).get(field, []))
+            cells.append(fmt.format(value) if value is not None else "-")
+        report.append(f"| {html.escape(endpoint)} | " + " | ".join(cells) + " |")
+    report.append("")
+
+def generate_report(history_file=history.HISTORY_FILE, last=10, baseline=None):
+    """Generate a benchmark trend and regression report from the history file."""
+    report = []
+    report.append("# Benchmark Report")
+    report.append(f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    report.append("")
+
+    runs = history.load(history_file)
+    order = history.commits(runs)
+    if not order:
+        report.append("No benchmark history found in: " + history_file)
+        return '\n'.join(report)
+
+    shown = order[-last:]
+    commit, baseline, findings = history.find_regressions(runs, baseline=baseline)
+
+    report.append("## Latest Run")
+    report.append(f"- **Commit**: {commit}")
+    report.append(f"- **Baseline**: {baseline or 'none'}")
+    report.append(f"- **Commits in history**: {len(order)}")
+    report.append(f"- **Runs in history**: {len(runs)}")
+    report.append("")
+
+    report.append("## Regressions")
+    if not baseline:
+        report.append("No earlier commit to compare against.")
+    elif not findings:
+        report.append(f"No significant latency or memory regressions against {baseline[:12]}.")
+    else:
+        report.append("| Directory | Endpoint | Metric | Baseline | Current | Change | Evidence |")
+        report.append("|-----------|----------|--------|---------:|--------:|-------:|----------|")
+        for finding in findings:
+            report.append(f"| {finding['scenario']} | {html.escape(finding['endpoint'])} | {finding['metric']} | "
+                          f"{finding['baseline']:.2f} | {finding['current']:.2f} | "
+                          f"**{finding['change_pct']:+.1f}%** | {finding['evidence']} |")
+    report.append("")
+
+    labels = [commit[:8] for commit in shown]
+    for scenario, endpoints in history.series(runs).items():
+        users, groups = scenario.split('x')
+        report.append(f"## {users} Users / {groups} Groups")
+        report.append("")
+        report.append("### Median Latency (p50 ms)")
+        trend_table(report, endpoints, shown, 'p50_ms', "{:.2f}")
+        report.append(svg_chart(f"p50 latency, {scenario}", labels, {
+            endpoint: [median(by_commit.get(commit, {}).get('p50_ms', [])) for commit in shown]
+            for endpoint, by_commit in endpoints.items()
+        }, 'ms'))
+        report.append("")
+        report.append("### Tail Latency (p99 ms)")
+        trend_table(report, endpoints, shown, 'p99_ms', "{:.2f}")
+        report.append("### Peak RSS (MB)")
+        trend_table(report, endpoints, shown, 'peak_rss_mb', "{:.1f}")
+        report.append(svg_chart(f"Peak RSS, {scenario}", labels, {
+            endpoint: [median(by_commit.get(commit, {}).get('peak_rss_mb', [])) for commit in shown]
+            for endpoint, by_commit in endpoints.items()
+        }, 'MB'))
+        report.append("")
+
+    report.append("## Method")
+    report.append(f"- Latency: one-sided Mann-Whitney U test of each endpoint's latency samples against the baseline commit; "
+                  f"flagged at p < {history.ALPHA} with the median at least {history.MIN_CHANGE:.0%} slower.")
+    report.append(f"- Memory: peak RSS against the runs of the previous {history.WINDOW} commits; "
+                  f"flagged above mean + 3 sd and at least {history.MIN_CHANGE:.0%} higher.")
+    report.append("- Several runs of one commit are pooled; tables show the median over runs.")
+    return '\n'.join(report)
+
+if __name__ == "__main__":
+    # Check if a history file was provided
+    history_file = history.HISTORY_FILE
+    if len(sys.argv) > 1:
+        history_file = sys.argv[1]
+
+    report = generate_report(history_file)
+    print(report)
+
+    # Save report to file
+    with open('benchmark_report.md', 'w') as f:
+        f.write(report)
+
+    print(f"\nReport saved to benchmark_report.md")
+    print("Convert it with: python my-markdown-2-html.py benchmark_report.md benchmark_report.html")
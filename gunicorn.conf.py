@@ -0,0 +1,40 @@
+"""Gunicorn settings: gunicorn -c gunicorn.conf.py"""
+import gc
+import glob
+import os
+
+wsgi_app = 'app:create_app()'
+bind = os.environ.get('GUNICORN_BIND', '127.0.0.1:5000')
+workers = int(os.environ.get('GUNICORN_WORKERS', 4))
+
+# Threaded workers: an open /api/events stream holds one thread for up to
+# SSE_MAX_SECONDS, so sync workers would be used up by a few browser tabs.
+# Each worker takes at most SSE_MAX_STREAMS (default 8) streams and answers
+# further ones with 503, leaving threads - SSE_MAX_STREAMS for requests; raise
+# both together, keeping streams to about a quarter of the threads.
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', 32))
+
+# Import the app once in the master and fork workers from it. Nothing in
+# create_app() opens sockets, so workers share the imported code pages.
+preload_app = True
+
+# Workers write their metrics to files here and /metrics merges them. It has
+# to be set before the app (and prometheus_client) is imported.
+metrics_dir = os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', '/tmp/ldap-admin-metrics')
+
+def on_starting(server):
+    # Drop the previous run's files, whose pids may be reused
+    os.makedirs(metrics_dir, exist_ok=True)
+    for path in glob.glob(os.path.join(metrics_dir, '*.db')):
+        os.remove(path)
+
+def when_ready(server):
+    # Move everything the master allocated into the permanent generation so
+    # the workers' collectors never touch (and copy) those pages
+    gc.collect()
+    gc.freeze()
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,195 @@
+# Just enough LDAP wire format (BER) to frame, classify and answer messages
+
+# protocolOp application tags (RFC 4511)
+REQUESTS = {
+    0: 'bind', 2: 'unbind', 3: 'search', 6: 'modify', 8: 'add', 10: 'delete',
+    12: 'modify_dn', 14: 'compare', 16: 'abandon', 23: 'extended'
+}
+RESPONSES = {
+    1: 'bind', 4: 'search', 5: 'search', 7: 'modify', 9: 'add', 11: 'delete',
+    13: 'modify_dn', 15: 'compare', 19: 'search', 24: 'extended'
+}
+# Tag of the response that completes each operation; unbind and abandon have none
+FINAL_RESPONSE = {'bind': 1, 'search': 5, 'modify': 7, 'add': 9, 'delete': 11,
+                  'modify_dn': 13, 'compare': 15, 'extended': 24}
+SEARCH_ENTRY = 4
+
+def read_message(read):
+    """One complete LDAPMessage from read(n), or None at end of stream"""
+    header = _read_exactly(read, 2)
+    if header is None:
+        return None
+    if header[0] != 0x30:
+        raise ValueError(f"not an LDAPMessage (tag {header[0]:#x})")
+    length = header[1]
+    extra = b''
+    if length & 0x80:
+        extra = _read_exactly(read, length & 0x7f)
+        if extra is None:
+            return None
+        length = int.from_bytes(extra, 'big')
+    body = _read_exactly(read, length)
+    if body is None:
+        return None
+    return header + extra + body
+
+def message_info(message):
+    """(message id, protocolOp application tag) of an LDAPMessage"""
+    offset = _content_offset(message, 0)
+    if message[offset] != 0x02:
+        raise ValueError("LDAPMessage without a messageID")
+    id_length = message[offset + 1]
+    message_id = int.from_bytes(message[offset + 2:offset + 2 + id_length], 'big', signed=True)
+    return message_id, message[offset + 2 + id_length] & 0x1f
+
+def parse(data):
+    """The consecutive (tag, content) elements in data"""
+    elements = []
+    offset = 0
+    while offset < len(data):
+        tag, length = data[offset], data[offset + 1]
+        start = offset + 2
+        if length & 0x80:
+            size = length & 0x7f
+            length = int.from_bytes(data[start:start + size], 'big')
+            start += size
+        elements.append((tag, data[start:start + length]))
+        offset = start + length
+    return elements
+
+def decode_request(message):
+    """(message id, operation, fields) for the request operations a directory stand-in serves.
+
+    Fields are plain Python values; a search filter comes back as an
+    RFC 4515 string. Operations without a decoder here (extended, abandon)
+    have empty fields.
+    """
+    (_, content), = parse(message)
+    elements = parse(content)
+    message_id = int.from_bytes(elements[0][1], 'big', signed=True)
+    tag, body = elements[1]
+    operation = REQUESTS.get(tag & 0x1f, 'unknown')
+    if operation == 'delete':
+        return message_id, operation, {'dn': body.decode()}
+    if operation not in _REQUEST_DECODERS:
+        return message_id, operation, {}
+    return message_id, operation, _REQUEST_DECODERS[operation](parse(body))
+
+def filter_to_string(tag, content):
+    """RFC 4515 text of one encoded search filter"""
+    kind = tag & 0x1f
+    if kind in (0, 1):
+        return '(' + '&|'[kind] + ''.join(filter_to_string(*item) for item in parse(content)) + ')'
+    if kind == 2:
+        return '(!' + filter_to_string(*parse(content)[0]) + ')'
+    if kind == 7:
+        return f"({content.decode()}=*)"
+    if kind == 4:
+        (_, name), (_, parts) = parse(content)
+        initial, middle, final = '', [], ''
+        for part_tag, value in parse(parts):
+            if part_tag & 0x1f == 0:
+                initial = _escape(value)
+            elif part_tag & 0x1f == 1:
+                middle.append(_escape(value))
+            else:
+                final = _escape(value)
+        return f"({name.decode()}=" + '*'.join([initial] + middle + [final]) + ')'
+    if kind in (3, 5, 6, 8):
+        (_, name), (_, value) = parse(content)
+        return f"({name.decode()}{ {3: '=', 5: '>=', 6: '<=', 8: '~='}[kind] }{_escape(value)})"
+    raise ValueError(f"unsupported filter choice {kind}")
+
+def encode_result(message_id, tag, code, matched_dn='', diagnostic=''):
+    """An LDAPResult-shaped response (bind, search done, modify, add, ...)"""
+    result = (_tlv(0x0a, _integer(code)) + _tlv(0x04, matched_dn.encode())
+              + _tlv(0x04, diagnostic.encode()))
+    return _message(message_id, _tlv(0x60 | tag, result))
+
+def encode_search_entry(message_id, dn, attributes):
+    """SearchResultEntry; attributes is [(type, [raw values])]"""
+    partial = b''.join(
+        _tlv(0x30, _tlv(0x04, name.encode()) + _tlv(0x31, b''.join(_tlv(0x04, value) for value in values)))
+        for name, values in attributes
+    )
+    return _message(message_id, _tlv(0x60 | SEARCH_ENTRY, _tlv(0x04, dn.encode()) + _tlv(0x30, partial)))
+
+def _attribute_values(element):
+    name, values = parse(element)
+    return name[1].decode(), [value for _, value in parse(values[1])]
+
+def _decode_bind(elements):
+    return {'dn': elements[1][1].decode(), 'password': elements[2][1] if elements[2][0] == 0x80 else None}
+
+def _decode_search(elements):
+    return {
+        'base': elements[0][1].decode(),
+        'scope': int.from_bytes(elements[1][1], 'big'),
+        'size_limit': int.from_bytes(elements[3][1], 'big'),
+        'types_only': elements[5][1] != b'\x00',
+        'filter': filter_to_string(*elements[6]),
+        'attributes': [name.decode() for _, name in parse(elements[7][1])]
+    }
+
+def _decode_add(elements):
+    return {'dn': elements[0][1].decode(), 'attributes': dict(_attribute_values(item) for _, item in parse(elements[1][1]))}
+
+def _decode_modify(elements):
+    changes = []
+    for _, change in parse(elements[1][1]):
+        (_, operation), (_, modification) = parse(change)
+        name, values = _attribute_values(modification)
+        changes.append((int.from_bytes(operation, 'big'), name, values))
+    return {'dn': elements[0][1].decode(), 'changes': changes}
+
+def _decode_modify_dn(elements):
+    return {
+        'dn': elements[0][1].decode(),
+        'new_rdn': elements[1][1].decode(),
+        'delete_old_rdn': elements[2][1] != b'\x00',
+        'new_superior': elements[3][1].decode() if len(elements) > 3 else None
+    }
+
+def _decode_compare(elements):
+    (_, name), (_, value) = parse(elements[1][1])
+    return {'dn': elements[0][1].decode(), 'attribute': name.decode(), 'value': value}
+
+_REQUEST_DECODERS = {
+    'bind': _decode_bind,
+    'search': _decode_search,
+    'add': _decode_add,
+    'modify': _decode_modify,
+    'modify_dn': _decode_modify_dn,
+    'compare': _decode_compare
+}
+
+def _escape(value):
+    # RFC 4515 escapes, so values with *, ( or ) survive the round trip
+    return ''.join(f"\\{byte:02x}" if chr(byte) in '*()\\\0' or byte > 0x7e else chr(byte) for byte in value)
+
+def _message(message_id, operation):
+    return _tlv(0x30, _tlv(0x02, _integer(message_id)) + operation)
+
+def _integer(value):
+    return value.to_bytes(max(1, (value.bit_length() + 8) // 8), 'big', signed=True)
+
+def _tlv(tag, payload):
+    length = len(payload)
+    if length < 0x80:
+        return bytes((tag, length)) + payload
+    size = length.to_bytes((length.bit_length() + 7) // 8, 'big')
+    return bytes((tag, 0x80 | len(size))) + size + payload
+
+def _content_offset(data, offset):
+    length = data[offset + 1]
+    return offset + 2 + (length & 0x7f if length & 0x80 else 0)
+
+def _read_exactly(read, size):
+    chunks = []
+    while size:
+        chunk = read(size)
+        if not chunk:
+            return None
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b''.join(chunks)
@@ -0,0 +1,107 @@
+import random
+import threading
+import time
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+class CircuitOpenError(Exception):
+    """Raised when the breaker is open and calls are short-circuited"""
+
+class CircuitBreaker:
+    """Closed/open/half-open breaker around the LDAP connection factory.
+
+    After failure_threshold consecutive failures the breaker opens and every
+    call fails immediately. Once reset_timeout has passed a single trial call
+    is let through (half-open): success closes the breaker, failure re-opens it.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.short_circuited = 0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        """Raise CircuitOpenError unless a call may go through now"""
+        with self._lock:
+            if self.state == OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = HALF_OPEN
+                self._trial_in_flight = False
+            if self.state == CLOSED:
+                return
+            if self.state == HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return
+            self.short_circuited += 1
+            raise CircuitOpenError(f"LDAP circuit {self.state}, failing fast")
+
+    def is_open(self):
+        """True while calls would be short-circuited"""
+        with self._lock:
+            return self.state == OPEN and time.monotonic() - self.opened_at < self.reset_timeout
+
+    def record_success(self):
+        with self._lock:
+            self.state = CLOSED
+            self.failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_in_flight = False
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = OPEN
+                self.opened_at = time.monotonic()
+
+    def call(self, func, *args, **kwargs):
+        """Run func through the breaker"""
+        self.before_call()
+        try:
+            result = func(*args, **kwargs)
+        except Exception:
+            self.record_failure()
+            raise
+        self.record_success()
+        return result
+
+    def reset(self):
+        with self._lock:
+            self.state = CLOSED
+            self.failures = 0
+            self.short_circuited = 0
+            self._trial_in_flight = False
+
+    def snapshot(self):
+        """Breaker state for /api/test-connection"""
+        with self._lock:
+            retry_in = 0.0
+            if self.state == OPEN:
+                retry_in = max(0.0, self.reset_timeout - (time.monotonic() - self.opened_at))
+            return {
+                'state': self.state,
+                'failures': self.failures,
+                'short_circuited': self.short_circuited,
+                'retry_in': round(retry_in, 1)
+            }
+
+def retry_with_jitter(func, attempts=3, base_delay=0.1, max_delay=1.0, retry_on=(Exception,), giveup_on=(CircuitOpenError,)):
+    """Call func up to attempts times with full-jitter exponential backoff.
+
+    Only use this for idempotent operations such as reads and binds.
+    """
+    for attempt in range(attempts):
+        try:
+            return func()
+        except giveup_on:
+            raise
+        except retry_on:
+            if attempt == attempts - 1:
+                raise
+            time.sleep(random.uniform(0, min(max_delay, base_delay * 2 ** attempt)))
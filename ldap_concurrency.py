@@ -0,0 +1,83 @@
+import threading
+import time
+
+class LDAPOverloaded(Exception):
+    """Raised when no LDAP slot is free; carries a Retry-After hint in seconds"""
+
+    def __init__(self, retry_after):
+        super().__init__(f"LDAP concurrency limit reached, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+class AdaptiveConcurrencyLimiter:
+    """AIMD limit on in-flight LDAP operations for this worker process.
+
+    Every completed operation whose latency stays under the target grows the
+    limit by 1/limit (about one slot per round of operations). A slow or failed
+    operation shrinks it by backoff, at most once per target interval so a
+    burst of slow completions counts as one congestion signal.
+    """
+
+    def __init__(self, initial_limit=8, min_limit=1, max_limit=32, latency_target=0.5, backoff=0.75):
+        self.limit = float(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.latency_target = latency_target
+        self.backoff = backoff
+        self.in_flight = 0
+        self.rejected = 0
+        self.latency_ewma = 0.0
+        self._last_decrease = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Take a slot or raise LDAPOverloaded without waiting"""
+        with self._lock:
+            if self.in_flight >= int(self.limit):
+                self.rejected += 1
+                raise LDAPOverloaded(self.retry_after())
+            self.in_flight += 1
+
+    def release(self, latency, success=True):
+        """Return a slot and feed the observed latency into the limit"""
+        with self._lock:
+            self.in_flight = max(0, self.in_flight - 1)
+            self.latency_ewma = latency if not self.latency_ewma else 0.8 * self.latency_ewma + 0.2 * latency
+            now = time.monotonic()
+            if not success or latency > self.latency_target:
+                if now - self._last_decrease >= self.latency_target:
+                    self.limit = max(self.min_limit, self.limit * self.backoff)
+                    self._last_decrease = now
+            else:
+                self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+
+    def retry_after(self):
+        """Seconds a shed caller should wait, based on recent LDAP latency"""
+        return max(1, int(self.latency_ewma + 0.999))
+
+    def slot(self):
+        """Context manager that holds a slot and times the operation"""
+        return _Slot(self)
+
+    def snapshot(self):
+        """Current limiter state for diagnostics"""
+        with self._lock:
+            return {
+                'limit': int(self.limit),
+                'in_flight': self.in_flight,
+                'rejected': self.rejected,
+                'latency_ewma_ms': round(self.latency_ewma * 1000, 1)
+            }
+
+class _Slot:
+    def __init__(self, limiter):
+        self.limiter = limiter
+        self.success = True
+
+    def __enter__(self):
+        self.limiter.acquire()
+        self._start = time.monotonic()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.limiter.release(time.monotonic() - self._start, self.success and exc_type is None)
+        return False
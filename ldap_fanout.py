@@ -0,0 +1,42 @@
+from ldap3.core.exceptions import LDAPOperationResult
+
+def attribute_value(attributes, name):
+    """First value of a raw search response attribute as a string"""
+    value = attributes.get(name)
+    if isinstance(value, list):
+        value = value[0] if value else None
+    return str(value) if value else ''
+
+def send_searches(conn, searches):
+    """Send every search without waiting; returns message ids (ASYNC) or None (sync)"""
+    if conn.strategy.sync:
+        return None
+    return [conn.search(**search) for search in searches]
+
+def collect_entries(conn, message_id, timeout):
+    """Wait for one outstanding search and return its searchResEntry dicts"""
+    response, result = conn.get_response(message_id, timeout=timeout)
+    _check(result)
+    return [item for item in response if item.get('type') == 'searchResEntry']
+
+def search_many(conn, searches, timeout=10.0):
+    """Run several independent searches on one connection and return their entries.
+
+    On an ASYNC connection all requests go out before any reply is read, so
+    the server works on them concurrently and the replies are demultiplexed
+    by message id; the total wait is the slowest search rather than the sum.
+    A synchronous connection runs them one after another.
+    """
+    message_ids = send_searches(conn, searches)
+    if message_ids is None:
+        results = []
+        for search in searches:
+            conn.search(**search)
+            _check(conn.result)
+            results.append([item for item in conn.response or [] if item.get('type') == 'searchResEntry'])
+        return results
+    return [collect_entries(conn, message_id, timeout) for message_id in message_ids]
+
+def _check(result):
+    if isinstance(result, dict) and result.get('result') not in (0, None):
+        raise LDAPOperationResult(result=result['result'], description=result.get('description'))
@@ -0,0 +1,169 @@
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+from ldap3.core.exceptions import LDAPResponseTimeoutError
+
+from ldap_fanout import collect_entries
+
+logger = logging.getLogger(__name__)
+
+class LatencyWindow:
+    """Rolling window of recent search latencies"""
+
+    def __init__(self, size=200, min_samples=20, default_budget=0.1, min_budget=0.02):
+        self.samples = deque(maxlen=size)
+        self.min_samples = min_samples
+        self.default_budget = default_budget
+        self.min_budget = min_budget
+        self._lock = threading.Lock()
+
+    def add(self, seconds):
+        with self._lock:
+            self.samples.append(seconds)
+
+    def percentile(self, q):
+        with self._lock:
+            ordered = sorted(self.samples)
+        if not ordered:
+            return None
+        return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+    def budget(self):
+        """How long to wait for the first replica before hedging (p95)"""
+        if len(self.samples) < self.min_samples:
+            return self.default_budget
+        return max(self.min_budget, self.percentile(0.95))
+
+class HedgedSearcher:
+    """Issue a read-only search to one replica and hedge to a second one.
+
+    The search goes to servers[0] on an asynchronous ldap3 connection. If it
+    has not answered within the p95 latency budget the same search is sent to
+    servers[1]; whichever answers first wins and the other request is sent an
+    LDAP Abandon before its connection is unbound. A hedge that cannot be
+    started (open circuit, connect or bind failure) is counted in
+    hedge_failures and the primary is waited on alone.
+    """
+
+    def __init__(self, open_connection, timeout=10.0, window=None, max_waiters=16):
+        self.open_connection = open_connection
+        self.timeout = timeout
+        self.window = window or LatencyWindow()
+        self.searches = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        self.hedge_failures = 0
+        self._executor = ThreadPoolExecutor(max_workers=max_waiters, thread_name_prefix='ldap-hedge')
+        self._lock = threading.Lock()
+
+    def search(self, servers, search_base, search_filter, search_scope, attributes=None):
+        """Return (entries, server) where entries are raw searchResEntry dicts"""
+        search = dict(search_base=search_base, search_filter=search_filter, search_scope=search_scope, attributes=attributes)
+        results, server = self.search_many(servers, [search])
+        return results[0], server
+
+    def search_many(self, servers, searches):
+        """Hedge a batch of searches sent together on one connection per replica"""
+        start = time.monotonic()
+        deadline = start + self.timeout
+        budget = self.window.budget()
+        with self._lock:
+            self.searches += 1
+
+        primary, error = self._start(servers[0], searches), None
+        try:
+            results = self._collect(primary, budget if len(servers) > 1 else self.timeout)
+            self._finish(primary)
+            self.window.add(time.monotonic() - start)
+            return results, primary['server']
+        except LDAPResponseTimeoutError:
+            if len(servers) < 2:
+                self._abandon(primary)
+                raise
+        except Exception as e:
+            self._abandon(primary)
+            primary, error = None, e
+
+        with self._lock:
+            self.hedged += 1
+        attempts = [primary] if primary else []
+        try:
+            attempts.append(self._start(servers[1], searches))
+        except Exception as e:
+            logger.warning(f"Hedge to {servers[1]} not started: {str(e)}")
+            with self._lock:
+                self.hedge_failures += 1
+            if not attempts:
+                raise error or e
+        pending = {
+            self._executor.submit(self._collect, attempt, max(0.0, deadline - time.monotonic())): attempt
+            for attempt in attempts
+        }
+        winner, results = None, None
+        while pending and winner is None:
+            done, _ = wait(pending, timeout=max(0.0, deadline - time.monotonic()), return_when=FIRST_COMPLETED)
+            if not done:
+                break
+            for future in done:
+                attempt = pending.pop(future)
+                try:
+                    results = future.result()
+                    winner = attempt
+                    break
+                except Exception as e:
+                    error = e
+
+        for attempt in attempts:
+            if attempt is not winner:
+                self._abandon(attempt)
+        if winner is None:
+            raise error or LDAPResponseTimeoutError('no response from any replica')
+
+        self._finish(winner)
+        self.window.add(time.monotonic() - start)
+        if winner is not attempts[0] or primary is None:
+            with self._lock:
+                self.hedge_wins += 1
+        return results, winner['server']
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'searches': self.searches,
+                'hedged': self.hedged,
+                'hedge_wins': self.hedge_wins,
+                'hedge_failures': self.hedge_failures,
+                'budget_ms': round(self.window.budget() * 1000, 1)
+            }
+
+    def _start(self, server, searches):
+        conn = self.open_connection(server)
+        return {'server': server, 'conn': conn, 'message_ids': [conn.search(**search) for search in searches]}
+
+    def _collect(self, attempt, timeout):
+        deadline = time.monotonic() + timeout
+        return [
+            collect_entries(attempt['conn'], message_id, max(0.0, deadline - time.monotonic()))
+            for message_id in attempt['message_ids']
+        ]
+
+    def _finish(self, attempt):
+        try:
+            attempt['conn'].unbind()
+        except Exception:
+            pass
+
+    def _abandon(self, attempt):
+        for message_id in attempt['message_ids']:
+            try:
+                attempt['conn'].abandon(message_id)
+            except Exception:
+                pass
+        try:
+            # Pooled connections with abandoned requests are closed, not reused
+            getattr(attempt['conn'], 'discard', attempt['conn'].unbind)()
+        except Exception:
+            pass
@@ -0,0 +1,118 @@
+import threading
+import time
+
+class PooledConnection:
+    """Proxy for a pooled ldap3 Connection; unbind() hands it back to the pool"""
+
+    def __init__(self, pool, url, conn):
+        self._pool = pool
+        self._url = url
+        self._conn = conn
+        self._released = False
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def unbind(self):
+        if not self._released:
+            self._released = True
+            self._pool.release(self._url, self._conn)
+        return True
+
+    def discard(self):
+        """Close the underlying connection instead of returning it"""
+        if not self._released:
+            self._released = True
+            self._pool.discard(self._conn)
+
+class LDAPConnectionPool:
+    """Per-server LIFO pool of bound, long-lived LDAP connections.
+
+    Keeping connections open avoids a TCP connect, bind and (for ldaps/StartTLS)
+    TLS handshake per request. Connections idle longer than max_idle are
+    closed rather than reused so slapd's idletimeout never hands us a dead
+    socket.
+    """
+
+    def __init__(self, open_connection, max_size=4, max_idle=30.0, on_release=None):
+        self.open_connection = open_connection
+        self.max_size = max_size
+        self.max_idle = max_idle
+        self.on_release = on_release
+        self.hits = 0
+        self.misses = 0
+        self.in_use = 0
+        self._idle = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, url):
+        """Return a pooled connection to url, opening one if none is idle"""
+        stale = []
+        conn = None
+        with self._lock:
+            stack = self._idle.get(url, [])
+            now = time.monotonic()
+            while stack:
+                candidate, idle_since = stack.pop()
+                if candidate.closed or now - idle_since > self.max_idle:
+                    stale.append(candidate)
+                    continue
+                conn = candidate
+                self.hits += 1
+                break
+            if conn is None:
+                self.misses += 1
+        for candidate in stale:
+            self._close(candidate)
+        if conn is None:
+            conn = self.open_connection(url)
+        with self._lock:
+            self.in_use += 1
+        return PooledConnection(self, url, conn)
+
+    def release(self, url, conn):
+        with self._lock:
+            self.in_use = max(0, self.in_use - 1)
+        if conn.closed:
+            return
+        if getattr(conn.strategy, '_outstanding', None):
+            # Replies still pending (e.g. an abandoned hedge); never reuse
+            self._close(conn)
+            return
+        if self.on_release:
+            self.on_release(conn)
+        with self._lock:
+            stack = self._idle.setdefault(url, [])
+            if len(stack) < self.max_size:
+                stack.append((conn, time.monotonic()))
+                return
+        self._close(conn)
+
+    def discard(self, conn):
+        with self._lock:
+            self.in_use = max(0, self.in_use - 1)
+        self._close(conn)
+
+    def close_all(self):
+        """Close every idle connection, e.g. after a fork"""
+        with self._lock:
+            idle = [conn for stack in self._idle.values() for conn, _ in stack]
+            self._idle.clear()
+        for conn in idle:
+            self._close(conn)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'idle': sum(len(stack) for stack in self._idle.values()),
+                'in_use': self.in_use,
+                'max_size': self.max_size,
+                'hits': self.hits,
+                'misses': self.misses
+            }
+
+    def _close(self, conn):
+        try:
+            conn.unbind()
+        except Exception:
+            pass
@@ -0,0 +1,324 @@
+import argparse
+import logging
+import math
+import os
+import random
+import socket
+import socketserver
+import struct
+import threading
+import time
+from urllib.parse import urlsplit
+
+import ldap_ber
+
+logger = logging.getLogger(__name__)
+
+# Result codes worth injecting (RFC 4511)
+BUSY = 51
+UNAVAILABLE = 52
+UNWILLING_TO_PERFORM = 53
+# Profile applied when a client connects, before any request is read
+CONNECT = 'connect'
+# Profile for operations without one of their own
+DEFAULT = '*'
+
+def parse_latency(spec):
+    """Sampler for a latency spec in milliseconds; returns a function of an RNG giving seconds.
+
+    fixed:MS, uniform:LOW:HIGH, normal:MEAN:STDDEV, lognormal:MEDIAN:SIGMA
+    and exponential:MEAN. Negative samples are clamped to zero.
+    """
+    kind, _, params = spec.partition(':')
+    values = [float(value) for value in params.split(':')] if params else []
+    samplers = {
+        'fixed': (1, lambda rng, ms: ms),
+        'uniform': (2, lambda rng, low, high: rng.uniform(low, high)),
+        'normal': (2, lambda rng, mean, stddev: rng.gauss(mean, stddev)),
+        'lognormal': (2, lambda rng, median, sigma: rng.lognormvariate(math.log(median), sigma)),
+        'exponential': (1, lambda rng, mean: rng.expovariate(1.0 / mean))
+    }
+    if kind not in samplers or len(values) != samplers[kind][0]:
+        raise ValueError(f"Invalid latency spec {spec!r}")
+    sample = samplers[kind][1]
+    return lambda rng: max(0.0, sample(rng, *values)) / 1000
+
+class FaultProfile:
+    """Faults injected into one operation type.
+
+    Each request draws once: reset_rate drops the connection with a TCP RST,
+    hang_rate swallows the request so the client waits out its own timeout,
+    error_rate answers with error_code without asking the backend. Requests
+    that get through have their first response held back by latency (a spec
+    for parse_latency or a sampler) and responses are paced to bandwidth
+    bytes per second.
+    """
+
+    def __init__(self, latency=None, error_rate=0.0, error_code=BUSY, reset_rate=0.0, hang_rate=0.0, bandwidth=None):
+        self.latency = parse_latency(latency) if isinstance(latency, str) else latency
+        self.error_rate = error_rate
+        self.error_code = error_code
+        self.reset_rate = reset_rate
+        self.hang_rate = hang_rate
+        self.bandwidth = bandwidth
+
+    @classmethod
+    def parse(cls, spec):
+        """(operation, profile) from OP:key=value,... e.g. search:latency=normal:2000:300,error_rate=0.05"""
+        operation, _, settings = spec.partition(':')
+        options = {}
+        for item in filter(None, settings.split(',')):
+            key, _, value = item.partition('=')
+            if key == 'latency':
+                options[key] = value
+            elif key in ('error_code', 'bandwidth'):
+                options[key] = int(value)
+            elif key in ('error_rate', 'reset_rate', 'hang_rate'):
+                options[key] = float(value)
+            else:
+                raise ValueError(f"Unknown fault setting {key!r} in {spec!r}")
+        return operation, cls(**options)
+
+class LDAPFaultProxy:
+    """TCP proxy between an LDAP client and server that injects faults per operation.
+
+    profiles maps operation names (bind, search, add, modify, delete,
+    modify_dn, compare, extended, CONNECT, DEFAULT) to FaultProfiles.
+    Messages are framed with ldap_ber and otherwise forwarded untouched, so
+    any LDAP server works as the backend. Responses on one connection are
+    delivered in order: a delayed response also holds back the ones behind
+    it, as a busy single-threaded server would.
+    """
+
+    def __init__(self, backend, profiles=None, listen=('127.0.0.1', 0), seed=None, connect_timeout=5.0):
+        parts = urlsplit(backend)
+        self.backend = (parts.hostname, parts.port or 389)
+        self.profiles = dict(profiles or {})
+        self.connect_timeout = connect_timeout
+        self.stats = {}
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._sockets = set()
+        outer = self
+
+        class Handler(socketserver.BaseRequestHandler):
+            def handle(self):
+                outer._proxy(self.request)
+
+        self._server = socketserver.ThreadingTCPServer(listen, Handler)
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"ldap://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name='ldap-fault-proxy', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        with self._lock:
+            sockets = list(self._sockets)
+        for sock in sockets:
+            _close(sock)
+
+    def profile(self, operation):
+        return self.profiles.get(operation) or self.profiles.get(DEFAULT) or FaultProfile()
+
+    def snapshot(self):
+        """Per-operation request and fault counts"""
+        with self._lock:
+            return {operation: dict(counts) for operation, counts in self.stats.items()}
+
+    def _count(self, operation, outcome):
+        with self._lock:
+            counts = self.stats.setdefault(operation, {})
+            counts[outcome] = counts.get(outcome, 0) + 1
+
+    def _draw(self, profile):
+        with self._lock:
+            roll = self._rng.random()
+            delay = profile.latency(self._rng) if profile.latency else 0.0
+        for outcome, rate in (('reset', profile.reset_rate), ('hang', profile.hang_rate), ('error', profile.error_rate)):
+            if roll < rate:
+                return outcome, delay
+            roll -= rate
+        return 'forwarded', delay
+
+    def _track(self, sock):
+        with self._lock:
+            self._sockets.add(sock)
+
+    def _proxy(self, client):
+        self._track(client)
+        backend = None
+        try:
+            outcome, delay = self._draw(self.profiles.get(CONNECT) or FaultProfile())
+            self._count(CONNECT, outcome)
+            time.sleep(delay)
+            if outcome in ('reset', 'error'):
+                _reset(client)
+                return
+            if outcome == 'hang':
+                # Accept but never answer, until the client gives up
+                while client.recv(65536):
+                    pass
+                return
+            backend = socket.create_connection(self.backend, timeout=self.connect_timeout)
+            backend.settimeout(None)
+            self._track(backend)
+            session = _Session(self, client, backend)
+            downstream = threading.Thread(target=session.downstream, name='ldap-fault-proxy-down', daemon=True)
+            downstream.start()
+            session.upstream()
+            downstream.join()
+        except OSError as e:
+            logger.debug(f"Proxy connection ended: {str(e)}")
+        finally:
+            for sock in (client, backend):
+                if sock is not None:
+                    _close(sock)
+                    with self._lock:
+                        self._sockets.discard(sock)
+
+class _Session:
+    """One client connection and its backend connection"""
+
+    def __init__(self, proxy, client, backend):
+        self.proxy = proxy
+        self.client = client
+        self.backend = backend
+        # message id -> [operation, profile, due time, first response sent]
+        self.pending = {}
+        self.send_lock = threading.Lock()
+
+    def upstream(self):
+        reader = self.client.makefile('rb')
+        try:
+            while True:
+                message = ldap_ber.read_message(reader.read)
+                if message is None:
+                    break
+                message_id, tag = ldap_ber.message_info(message)
+                operation = ldap_ber.REQUESTS.get(tag, 'unknown')
+                profile = self.proxy.profile(operation)
+                outcome, delay = self.proxy._draw(profile)
+                if operation in ('unbind', 'abandon'):
+                    outcome = 'forwarded'
+                self.proxy._count(operation, outcome)
+                if outcome == 'reset':
+                    _reset(self.client)
+                    break
+                if outcome == 'hang':
+                    continue
+                if outcome == 'error':
+                    time.sleep(delay)
+                    tag = ldap_ber.FINAL_RESPONSE.get(operation, ldap_ber.FINAL_RESPONSE['extended'])
+                    self.send(ldap_ber.encode_result(message_id, tag, profile.error_code,
+                                                     diagnostic='injected by ldap_proxy'))
+                    continue
+                self.pending[message_id] = [operation, profile, time.monotonic() + delay, False]
+                self.backend.sendall(message)
+                if operation == 'unbind':
+                    break
+        except (OSError, ValueError) as e:
+            logger.debug(f"Proxy upstream ended: {str(e)}")
+        finally:
+            reader.close()
+            _shutdown(self.backend)
+
+    def downstream(self):
+        reader = self.backend.makefile('rb')
+        try:
+            while True:
+                message = ldap_ber.read_message(reader.read)
+                if message is None:
+                    break
+                message_id, tag = ldap_ber.message_info(message)
+                request = self.pending.get(message_id)
+                bandwidth = None
+                if request is not None:
+                    operation, profile, due, started = request
+                    if not started:
+                        request[3] = True
+                        time.sleep(max(0.0, due - time.monotonic()))
+                    bandwidth = profile.bandwidth
+                    if tag == ldap_ber.FINAL_RESPONSE.get(operation):
+                        del self.pending[message_id]
+                if bandwidth:
+                    time.sleep(len(message) / bandwidth)
+                self.send(message)
+        except (OSError, ValueError) as e:
+            logger.debug(f"Proxy downstream ended: {str(e)}")
+        finally:
+            reader.close()
+            _shutdown(self.client)
+
+    def send(self, data):
+        with self.send_lock:
+            self.client.sendall(data)
+
+def _reset(sock):
+    # Linger with a zero timeout: close() sends RST instead of FIN
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, struct.pack('ii', 1, 0))
+    sock.close()
+
+def _shutdown(sock):
+    try:
+        sock.shutdown(socket.SHUT_RDWR)
+    except OSError:
+        pass
+
+def _close(sock):
+    _shutdown(sock)
+    sock.close()
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='LDAP proxy injecting latency, errors, resets, hangs and bandwidth limits per operation',
+        epilog='Fault spec: OP:key=value,... with OP one of bind, search, add, modify, delete, modify_dn, '
+               'compare, extended, connect or * and keys latency (fixed:MS, uniform:LOW:HIGH, normal:MEAN:SD, '
+               'lognormal:MEDIAN:SIGMA, exponential:MEAN), error_rate, error_code, reset_rate, hang_rate, '
+               'bandwidth (bytes/s). Example: --fault search:latency=normal:2000:300,error_rate=0.05'
+    )
+    parser.add_argument('--backend', help='LDAP server to forward to, e.g. ldap://localhost:389')
+    parser.add_argument('--demo', action='store_true', help='Forward to an in-process demo directory instead')
+    parser.add_argument('--users', type=int, default=1000, help='Demo directory users')
+    parser.add_argument('--groups', type=int, default=100, help='Demo directory groups')
+    parser.add_argument('--listen', default='127.0.0.1:3389', help='HOST:PORT to accept clients on')
+    parser.add_argument('--fault', action='append', default=[], help='Fault spec (repeatable)')
+    parser.add_argument('--seed', type=int, help='Seed for reproducible fault draws')
+    args = parser.parse_args()
+    if not args.backend and not args.demo:
+        parser.error('one of --backend or --demo is required')
+    logging.basicConfig(level=logging.INFO)
+
+    backend = args.backend
+    if args.demo:
+        from demo_directory import DemoLDAPServer, open_demo_directory
+        directory = open_demo_directory(
+            os.environ.get('LDAP_BASE_DN', 'dc=tak,dc=local'),
+            os.environ.get('LDAP_ADMIN_DN', 'cn=admin,dc=tak,dc=local'),
+            os.environ.get('LDAP_ADMIN_PASSWORD', 'takserver123'),
+            users=args.users,
+            groups=args.groups
+        )
+        backend = DemoLDAPServer(directory).start().url
+    host, _, port = args.listen.rpartition(':')
+    proxy = LDAPFaultProxy(backend, dict(FaultProfile.parse(spec) for spec in args.fault),
+                           listen=(host, int(port)), seed=args.seed).start()
+    logger.info(f"Proxying {proxy.url} -> {backend}")
+    try:
+        while True:
+            time.sleep(10)
+            logger.info(f"Proxy stats: {proxy.snapshot()}")
+    except KeyboardInterrupt:
+        proxy.stop()
+
+if __name__ == '__main__':
+    main()
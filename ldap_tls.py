@@ -0,0 +1,87 @@
+import hashlib
+import ssl
+import threading
+
+from ldap3 import Tls
+from ldap3.core.exceptions import LDAPSSLConfigurationError
+from ldap3.core.tls import check_hostname
+
+class ResumableTls(Tls):
+    """ldap3 Tls that keeps one SSLContext and resumes TLS sessions.
+
+    Stock ldap3 builds a fresh SSLContext for every socket, so every
+    reconnect pays a full handshake. Here the context is built once and the
+    last session per server is offered on the next connect, turning
+    reconnects into abbreviated handshakes. With pin_sha256 set, the server
+    certificate must also match that SHA-256 fingerprint.
+    """
+
+    def __init__(self, pin_sha256=None, **kwargs):
+        super().__init__(**kwargs)
+        self.pin_sha256 = pin_sha256.replace(':', '').lower() if pin_sha256 else None
+        self.handshakes = 0
+        self.resumed = 0
+        self._context = None
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def ssl_context(self):
+        """The shared client context, built on first use"""
+        with self._lock:
+            if self._context is None:
+                context = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
+                context.check_hostname = False
+                context.verify_mode = self.validate
+                if self.ca_certs_file or self.ca_certs_path or self.ca_certs_data:
+                    # Only the configured CA is trusted, not the system store
+                    context.load_verify_locations(self.ca_certs_file, self.ca_certs_path, self.ca_certs_data)
+                elif self.validate != ssl.CERT_NONE:
+                    context.load_default_certs(ssl.Purpose.SERVER_AUTH)
+                if self.certificate_file:
+                    context.load_cert_chain(self.certificate_file, keyfile=self.private_key_file, password=self.private_key_password)
+                if self.ciphers:
+                    context.set_ciphers(self.ciphers)
+                self._context = context
+            return self._context
+
+    def wrap_socket(self, connection, do_handshake=False):
+        key = (connection.server.host, connection.server.port)
+        wrapped = self.ssl_context().wrap_socket(
+            connection.socket,
+            server_side=False,
+            do_handshake_on_connect=do_handshake,
+            server_hostname=self.sni or connection.server.host,
+            session=self._sessions.get(key)
+        )
+        if do_handshake:
+            if self.validate in (ssl.CERT_REQUIRED, ssl.CERT_OPTIONAL):
+                check_hostname(wrapped, connection.server.host, self.valid_names)
+            self._check_pin(wrapped)
+            with self._lock:
+                self.handshakes += 1
+                if wrapped.session_reused:
+                    self.resumed += 1
+            self._remember(key, wrapped)
+        connection.socket = wrapped
+
+    def remember_session(self, connection):
+        """Store the connection's current session; TLS 1.3 tickets arrive after the handshake"""
+        if isinstance(getattr(connection, 'socket', None), ssl.SSLSocket):
+            self._remember((connection.server.host, connection.server.port), connection.socket)
+
+    def snapshot(self):
+        with self._lock:
+            return {'handshakes': self.handshakes, 'resumed': self.resumed, 'cached_sessions': len(self._sessions)}
+
+    def _remember(self, key, wrapped):
+        session = wrapped.session
+        if session is not None:
+            with self._lock:
+                self._sessions[key] = session
+
+    def _check_pin(self, wrapped):
+        if not self.pin_sha256:
+            return
+        fingerprint = hashlib.sha256(wrapped.getpeercert(binary_form=True) or b'').hexdigest()
+        if fingerprint != self.pin_sha256:
+            raise LDAPSSLConfigurationError(f"server certificate fingerprint {fingerprint} does not match pin")
@@ -0,0 +1,77 @@
+import random
+import threading
+import time
+
+from ldap_breaker import CircuitBreaker
+
+class LDAPTopology:
+    """Provider/consumer layout: writes go to the provider, reads to replicas.
+
+    Reads pick between two random healthy replicas and take the one with the
+    lower smoothed latency (power of two choices), so load follows latency
+    without every worker piling onto the same "fastest" consumer. Servers
+    whose breaker is open are skipped; with no healthy replica left, reads
+    fall back to the provider.
+
+    A server's latency halves for every half_life seconds without a new
+    sample, so a replica that lost every comparison is eventually tried
+    again instead of being judged on one slow moment forever.
+    """
+
+    def __init__(self, provider, replicas=None, breaker_factory=CircuitBreaker, half_life=30.0):
+        self.provider = provider
+        self.replicas = [url for url in (replicas or []) if url and url != provider]
+        self.breakers = {url: breaker_factory() for url in [provider] + self.replicas}
+        self.latency = {url: 0.0 for url in self.breakers}
+        self.half_life = half_life
+        self._sampled = {url: time.monotonic() for url in self.breakers}
+        self._lock = threading.Lock()
+
+    def read_server(self, exclude=()):
+        """Pick a server for a read-only operation"""
+        candidates = [url for url in self.replicas if url not in exclude and not self.breakers[url].is_open()]
+        if not candidates:
+            return self.provider
+        if len(candidates) == 1:
+            return candidates[0]
+        first, second = random.sample(candidates, 2)
+        with self._lock:
+            return first if self._current_latency(first) <= self._current_latency(second) else second
+
+    def write_server(self):
+        """All writes go to the provider"""
+        return self.provider
+
+    def record_latency(self, url, seconds):
+        with self._lock:
+            if url not in self.latency:
+                return
+            previous = self._current_latency(url)
+            self.latency[url] = seconds if not previous else 0.7 * previous + 0.3 * seconds
+            self._sampled[url] = time.monotonic()
+
+    def _current_latency(self, url):
+        age = time.monotonic() - self._sampled[url]
+        return self.latency[url] * 0.5 ** (age / self.half_life)
+
+    def reset(self):
+        with self._lock:
+            for url in self.latency:
+                self.latency[url] = 0.0
+                self._sampled[url] = time.monotonic()
+        for breaker in self.breakers.values():
+            breaker.reset()
+
+    def snapshot(self):
+        """Per-server role, latency and breaker state"""
+        with self._lock:
+            latency = {url: self._current_latency(url) for url in self.latency}
+        return [
+            {
+                'server': url,
+                'role': 'provider' if url == self.provider else 'replica',
+                'latency_ms': round(latency[url] * 1000, 1),
+                'breaker': self.breakers[url].snapshot()['state']
+            }
+            for url in self.breakers
+        ]
@@ -0,0 +1,229 @@
+import json
+import logging
+import secrets
+import time
+from contextlib import contextmanager
+
+from flask import g, has_request_context, request
+from ldap3 import Connection
+
+# Positional parameters of each traced ldap3 operation, to read them by name
+OPERATIONS = {
+    'search': ('search_base', 'search_filter', 'search_scope', 'dereference_aliases', 'attributes'),
+    'add': ('dn',),
+    'delete': ('dn',),
+    'modify': ('dn',),
+    'modify_dn': ('dn',),
+    'compare': ('dn',)
+}
+
+# OTLP span kinds and status codes
+SPAN_KIND_SERVER = 2
+SPAN_KIND_CLIENT = 3
+STATUS_OK = 1
+STATUS_ERROR = 2
+
+slow_logger = logging.getLogger('ldap_admin.slow_ldap')
+
+class Span:
+    """One timed LDAP step (connect, bind, an operation, or entry materialization)"""
+
+    def __init__(self, name, attributes):
+        self.name = name
+        self.attributes = attributes
+        self.span_id = secrets.token_hex(8)
+        self.result = 'success'
+        self.start = time.time()
+        self.duration = 0.0
+        self._started = time.perf_counter()
+
+    def end(self):
+        self.duration = time.perf_counter() - self._started
+
+    @property
+    def failed(self):
+        return self.result not in ('success', 'compareTrue', 'compareFalse')
+
+class LDAPTracer:
+    """Records a span for every LDAP call on instrumented connections.
+
+    Spans are attached to the current Flask request (g.ldap_spans), passed
+    to each listener, and logged to the slow-query log when they take at
+    least slow_threshold seconds. export() writes a request's spans as an
+    OTLP/JSON document through exporter (anything with emit(document)).
+    Attribute values sent to the server are never recorded, only DNs,
+    filters and attribute names.
+    """
+
+    def __init__(self, slow_threshold=0.2, exporter=None, listeners=(), service_name='ldap-admin'):
+        self.slow_threshold = slow_threshold
+        self.exporter = exporter
+        self.listeners = list(listeners)
+        self.service_name = service_name
+
+    @contextmanager
+    def span(self, name, **attributes):
+        span = Span(name, attributes)
+        try:
+            yield span
+        except Exception as e:
+            span.result = 'exception'
+            span.attributes['error'] = type(e).__name__
+            raise
+        finally:
+            self.finish(span)
+
+    def finish(self, span):
+        span.end()
+        if has_request_context():
+            g.setdefault('ldap_spans', []).append(span)
+        for listener in self.listeners:
+            listener(span)
+        if span.duration >= self.slow_threshold:
+            context = {'endpoint': request.endpoint} if has_request_context() else {}
+            slow_logger.warning(
+                f"{span.duration * 1000:.1f}ms {span.name} {span.result} {json.dumps(dict(span.attributes, **context))}"
+            )
+
+    def instrument(self, conn, **attributes):
+        """Trace every operation on a real ldap3 Connection; other objects are returned untouched.
+
+        Synchronous operations are timed around the call. On ASYNC connections
+        the operation only sends the request, so the span runs from the send
+        until get_response() returns that message id. attributes (such as
+        the server) are added to every span of this connection.
+        """
+        if not isinstance(conn, Connection) or getattr(conn, '_traced', False):
+            return conn
+        conn._traced = True
+        if conn.strategy.sync:
+            for operation in OPERATIONS:
+                setattr(conn, operation, self._traced(conn, operation, getattr(conn, operation), attributes))
+            return conn
+
+        sent = {}
+        for operation in OPERATIONS:
+            setattr(conn, operation, self._sent(sent, operation, getattr(conn, operation), attributes))
+        get_response = conn.get_response
+
+        def traced_get_response(message_id, *args, **kwargs):
+            span = sent.pop(message_id, None)
+            try:
+                response, result = get_response(message_id, *args, **kwargs)
+            except Exception as e:
+                if span:
+                    span.result = 'exception'
+                    span.attributes['error'] = type(e).__name__
+                    self.finish(span)
+                raise
+            if span:
+                _describe_result(span, response if span.name == 'search' else None, result)
+                self.finish(span)
+            return response, result
+
+        conn.get_response = traced_get_response
+        return conn
+
+    def export(self, name, start, end, spans, traceparent=None, attributes=None):
+        """Queue the request and its LDAP spans as one OTLP/JSON document"""
+        if self.exporter is None or not spans:
+            return
+        trace_id, parent_id = parse_traceparent(traceparent)
+        root_id = secrets.token_hex(8)
+        otlp_spans = [_otlp_span(
+            trace_id, root_id, parent_id, name, SPAN_KIND_SERVER, start, end - start,
+            attributes or {}, failed=False
+        )]
+        otlp_spans.extend(_otlp_span(
+            trace_id, span.span_id, root_id, f"ldap.{span.name}", SPAN_KIND_CLIENT, span.start, span.duration,
+            dict(span.attributes, result=span.result), failed=span.failed
+        ) for span in spans)
+        self.exporter.emit({'resourceSpans': [{
+            'resource': {'attributes': _otlp_attributes({'service.name': self.service_name})},
+            'scopeSpans': [{'scope': {'name': 'ldap_trace'}, 'spans': otlp_spans}]
+        }]})
+
+    def _traced(self, conn, operation, method, attributes):
+        def traced(*args, **kwargs):
+            with self.span(operation, **attributes, **_operation_attributes(operation, args, kwargs)) as span:
+                value = method(*args, **kwargs)
+                _describe_result(span, conn.response if operation == 'search' else None, conn.result)
+            return value
+        return traced
+
+    def _sent(self, sent, operation, method, attributes):
+        def send(*args, **kwargs):
+            span = Span(operation, dict(attributes, **_operation_attributes(operation, args, kwargs)))
+            message_id = method(*args, **kwargs)
+            if message_id:
+                sent[message_id] = span
+            return message_id
+        return send
+
+def parse_traceparent(header):
+    """(trace_id, parent_span_id) from a W3C traceparent header, or a new trace"""
+    parts = (header or '').split('-')
+    if len(parts) == 4 and len(parts[1]) == 32 and len(parts[2]) == 16:
+        return parts[1], parts[2]
+    return secrets.token_hex(16), None
+
+def _operation_attributes(operation, args, kwargs):
+    params = dict(zip(OPERATIONS[operation], args))
+    params.update(kwargs)
+    if operation != 'search':
+        return {'dn': params.get('dn', '')}
+    attributes = params.get('attributes')
+    if isinstance(attributes, (list, tuple)):
+        attributes = ','.join(str(name) for name in attributes)
+    return {
+        'base': params.get('search_base', ''),
+        'filter': params.get('search_filter', ''),
+        'scope': str(params.get('search_scope', 'SUBTREE')),
+        'attributes': str(attributes or '')
+    }
+
+def _describe_result(span, response, result):
+    if isinstance(result, dict):
+        span.result = result.get('description') or str(result.get('result'))
+    if response is not None:
+        entries = [item for item in response if item.get('type') == 'searchResEntry']
+        span.attributes['entries'] = len(entries)
+        span.attributes['bytes'] = sum(_entry_size(entry) for entry in entries)
+
+def _entry_size(entry):
+    # Size of the DN and raw attribute values: the entry payload on the wire,
+    # less BER framing
+    size = len(entry.get('dn') or '')
+    for values in (entry.get('raw_attributes') or {}).values():
+        size += sum(len(value) for value in values)
+    return size
+
+def _otlp_span(trace_id, span_id, parent_id, name, kind, start, duration, attributes, failed):
+    start_ns = int(start * 1e9)
+    span = {
+        'traceId': trace_id,
+        'spanId': span_id,
+        'name': name,
+        'kind': kind,
+        'startTimeUnixNano': str(start_ns),
+        'endTimeUnixNano': str(start_ns + int(duration * 1e9)),
+        'attributes': _otlp_attributes(attributes),
+        'status': {'code': STATUS_ERROR if failed else STATUS_OK}
+    }
+    if parent_id:
+        span['parentSpanId'] = parent_id
+    return span
+
+def _otlp_attributes(attributes):
+    values = []
+    for key, value in attributes.items():
+        if isinstance(value, bool):
+            typed = {'boolValue': value}
+        elif isinstance(value, int):
+            typed = {'intValue': str(value)}
+        elif isinstance(value, float):
+            typed = {'doubleValue': value}
+        else:
+            typed = {'stringValue': str(value)}
+        values.append({'key': key, 'value': typed})
+    return values
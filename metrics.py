@@ -0,0 +1,56 @@
+import os
+
+from prometheus_client import (CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram,
+                               generate_latest, multiprocess)
+
+# Latency buckets from a cached LDAP lookup up to a slow certificate build
+LATENCY_BUCKETS = (.001, .0025, .005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10, 30)
+
+REQUEST_SECONDS = Histogram(
+    'ldap_admin_request_duration_seconds', 'Time to produce a response, by Flask endpoint',
+    ['endpoint', 'method', 'status'], buckets=LATENCY_BUCKETS
+)
+LDAP_OPERATION_SECONDS = Histogram(
+    'ldap_admin_ldap_operation_duration_seconds', 'LDAP step latency (connect, bind, operations), by result',
+    ['operation', 'result'], buckets=LATENCY_BUCKETS
+)
+TAK_COMMAND_SECONDS = Histogram(
+    'ldap_admin_tak_command_duration_seconds', 'TAK server subprocess run time, by command and exit status',
+    ['command', 'outcome'], buckets=LATENCY_BUCKETS
+)
+REJECTED_REQUESTS = Counter(
+    'ldap_admin_rejected_requests_total', 'Requests turned away before doing their work, by limiter',
+    ['limiter', 'endpoint']
+)
+# Point-in-time state from each component's snapshot(); one series per
+# worker ('liveall') so pool and queue sizes can be summed or maxed in PromQL
+COMPONENT_STATE = Gauge(
+    'ldap_admin_component_state', 'Numeric fields of component snapshots (pools, limiters, queues, caches)',
+    ['component', 'field'], multiprocess_mode='liveall'
+)
+BREAKER_STATES = {'closed': 0, 'half_open': 1, 'open': 2}
+
+def multiprocess_dir():
+    """Directory shared by gunicorn workers for metric files, or None in a single process"""
+    return os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+
+def render():
+    """Exposition text for every live worker; returns (body, content_type)"""
+    if multiprocess_dir():
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+def record_snapshot(component, snapshot):
+    """Export the numeric fields of a component snapshot; breaker states map to 0/1/2"""
+    for field, value in snapshot.items():
+        if isinstance(value, str):
+            value = BREAKER_STATES.get(value)
+        if isinstance(value, (int, float)):
+            COMPONENT_STATE.labels(component, field).set(value)
+
+def observe_ldap_span(span):
+    """LDAPTracer listener feeding the LDAP operation histogram"""
+    LDAP_OPERATION_SECONDS.labels(span.name, span.result).observe(span.duration)
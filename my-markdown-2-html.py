@@ -1,14 +1,21 @@
+import sys
+
 import markdown
 
+# Input and output files: python my-markdown-2-html.py [input.md] [output.html]
+input_file = sys.argv[1] if len(sys.argv) > 1 else "action_items.md"
+output_file = sys.argv[2] if len(sys.argv) > 2 else "test_action_items.html"
+
 # Read the Markdown file
-with open("action_items.md", "r") as md_file:
+with open(input_file, "r") as md_file:
     markdown_content = md_file.read()
 
-# Convert Markdown to HTML
-html_content = markdown.markdown(markdown_content)
+# Convert Markdown to HTML; the tables extension renders the report tables
+# and inline SVG charts pass through unchanged
+html_content = markdown.markdown(markdown_content, extensions=["tables"])
 
 # Save the HTML to a new file
-with open("test_action_items.html", "w") as html_file:
+with open(output_file, "w") as html_file:
     html_file.write(html_content)
 
-print("Markdown successfully converted to HTML.")
\ No newline at end of file
+print("Markdown successfully converted to HTML.")
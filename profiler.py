@@ -0,0 +1,174 @@
+import cProfile
+import html
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter, deque
+
+def frame_name(code):
+    """Flamegraph frame label: function (dir/file.py:first line)"""
+    path = code.co_filename.replace(os.sep, '/').rsplit('/', 2)
+    return f"{code.co_name} ({'/'.join(path[-2:])}:{code.co_firstlineno})"
+
+def collapse(frame):
+    """Collapsed-stack key for frame, outermost call first"""
+    names = []
+    while frame is not None:
+        names.append(frame_name(frame.f_code))
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+def sample_stacks(thread_ids, counter):
+    """Add one sample of each listed thread's current stack to counter"""
+    frames = sys._current_frames()
+    for thread_id in thread_ids:
+        frame = frames.get(thread_id)
+        if frame is not None:
+            counter[collapse(frame)] += 1
+
+def render_collapsed(stacks):
+    """Brendan Gregg's folded format, readable by flamegraph.pl and speedscope"""
+    return ''.join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+def render_html(stacks, title, limit=50):
+    """Self-contained report of the hottest functions and stacks"""
+    total = sum(stacks.values()) or 1
+    own, inclusive = Counter(), Counter()
+    for stack, count in stacks.items():
+        frames = stack.split(';')
+        own[frames[-1]] += count
+        for name in set(frames):
+            inclusive[name] += count
+
+    def table(heading, rows):
+        body = ''.join(
+            f"<tr><td>{count}</td><td>{100.0 * count / total:.1f}%</td><td><code>{html.escape(label)}</code></td></tr>"
+            for label, count in rows
+        )
+        return f"<h2>{heading}</h2><table><tr><th>Samples</th><th>%</th><th></th></tr>{body}</table>"
+
+    stack_rows = [('\n  \u2190 '.join(reversed(stack.split(';'))), count) for stack, count in stacks.most_common(limit)]
+    return (
+        f"<!DOCTYPE html><html><head><meta charset='utf-8'><title>{html.escape(title)}</title>"
+        "<style>body{font-family:sans-serif}td{padding:2px 8px;vertical-align:top}code{white-space:pre-wrap}</style>"
+        f"</head><body><h1>{html.escape(title)}</h1><p>{sum(stacks.values())} samples</p>"
+        + table('Self time', own.most_common(limit))
+        + table('Total time', inclusive.most_common(limit))
+        + table('Stacks (innermost first)', stack_rows)
+        + "</body></html>"
+    )
+
+class RequestProfile:
+    """Profile one request on its own thread.
+
+    mode 'sample' polls the thread's stack every interval seconds from a
+    helper thread; 'cprofile' records every call deterministically, which
+    is exact but slows the request down several times.
+    """
+
+    def __init__(self, mode='sample', interval=0.001):
+        self.mode = 'cprofile' if mode in ('cprofile', 'deterministic') else 'sample'
+        self.interval = interval
+        self.stacks = Counter()
+        self.elapsed = 0.0
+        self._profile = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._started = time.perf_counter()
+        if self.mode == 'cprofile':
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+            return
+        target = threading.get_ident()
+
+        def run():
+            while not self._stop.wait(self.interval):
+                sample_stacks([target], self.stacks)
+
+        self._thread = threading.Thread(target=run, name='request-profiler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self.elapsed = time.perf_counter() - self._started
+        if self._profile:
+            self._profile.disable()
+        else:
+            self._stop.set()
+            self._thread.join()
+
+    def render(self, fmt, title):
+        """(body, mimetype) for fmt 'collapsed', 'html' or, for cprofile, 'text'"""
+        title = f"{title} ({self.elapsed * 1000:.1f} ms, {self.mode})"
+        if self._profile:
+            out = io.StringIO()
+            pstats.Stats(self._profile, stream=out).sort_stats('cumulative').print_stats(60)
+            if fmt == 'text':
+                return out.getvalue(), 'text/plain'
+            return (f"<!DOCTYPE html><html><head><meta charset='utf-8'><title>{html.escape(title)}</title></head>"
+                    f"<body><h1>{html.escape(title)}</h1><pre>{html.escape(out.getvalue())}</pre></body></html>"), 'text/html'
+        if fmt == 'html':
+            return render_html(self.stacks, title), 'text/html'
+        return render_collapsed(self.stacks), 'text/plain'
+
+class RollingSampler:
+    """Always-on sampler of the threads that are serving requests.
+
+    A daemon thread samples the stacks of get_thread_ids() every interval
+    seconds into bucket_seconds-wide buckets, keeping window seconds of
+    history. Idle workers are not sampled, so the cost is a few
+    microseconds per busy thread per sample.
+    """
+
+    def __init__(self, get_thread_ids, interval=0.02, window=300, bucket_seconds=10):
+        self.get_thread_ids = get_thread_ids
+        self.interval = interval
+        self.window = window
+        self.bucket_seconds = bucket_seconds
+        self.samples = 0
+        self._buckets = deque()
+        self._lock = threading.Lock()
+        self._pid = None
+
+    def ensure_started(self):
+        # Started on first use, and again in each forked worker
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._buckets.clear()
+                threading.Thread(target=self._run, name='rolling-sampler', daemon=True).start()
+
+    def top(self, seconds=None, limit=None):
+        """The limit hottest stacks over the last seconds (default the whole window)"""
+        cutoff = time.time() - (seconds or self.window)
+        merged = Counter()
+        with self._lock:
+            for started, stacks in self._buckets:
+                if started + self.bucket_seconds > cutoff:
+                    merged.update(stacks)
+        return Counter(dict(merged.most_common(limit)))
+
+    def snapshot(self):
+        with self._lock:
+            return {'samples': self.samples, 'buckets': len(self._buckets), 'interval_ms': self.interval * 1000}
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            thread_ids = self.get_thread_ids()
+            if not thread_ids:
+                continue
+            now = time.time()
+            with self._lock:
+                if not self._buckets or now - self._buckets[-1][0] >= self.bucket_seconds:
+                    self._buckets.append((now, Counter()))
+                    while now - self._buckets[0][0] > self.window:
+                        self._buckets.popleft()
+                sample_stacks(thread_ids, self._buckets[-1][1])
+                self.samples += 1
@@ -0,0 +1,137 @@
+import gc
+import os
+import resource
+import threading
+import tracemalloc
+
+# TCP states in /proc/net/tcp that matter for leaks
+TCP_STATES = {'01': 'established', '08': 'close_wait'}
+# Frames that only show the act of measuring, including this module's baseline
+IGNORED_FRAMES = (tracemalloc.__file__, __file__, '<frozen importlib._bootstrap')
+
+class ResourceMonitor:
+    """Per-process resource counts for spotting leaks in long runs.
+
+    snapshot() reports RSS, open file descriptors by kind, TCP sockets by
+    peer port and state, threads and GC-tracked objects. A socket in
+    close_wait has been closed by the server but never by us, which is what
+    a connection that was never unbound looks like. When tracemalloc is
+    tracing, the source lines whose allocations grew most since the first
+    snapshot are listed too. Start it with start_tracing() once the worker
+    is up: with PYTHONTRACEMALLOC=1 every import is traced as well, and a
+    snapshot of all that can outlast a worker timeout.
+    /proc is read where it exists; elsewhere only the portable counts are
+    filled in.
+    """
+
+    def __init__(self, top=10):
+        self.top = top
+        self._baseline = None
+        self._lock = threading.Lock()
+
+    def start_tracing(self, frames=1):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+
+    def snapshot(self, top=None, collect=False):
+        if collect:
+            gc.collect()
+        fds = open_fds()
+        snapshot = {
+            'pid': os.getpid(),
+            'rss_mb': round(rss_bytes() / 1024 / 1024, 2),
+            'fds': sum(fds.values()) if fds is not None else None,
+            'fd_kinds': fds,
+            'sockets': tcp_sockets(),
+            'threads': threading.active_count(),
+            'gc_objects': len(gc.get_objects())
+        }
+        if tracemalloc.is_tracing():
+            snapshot['tracemalloc'] = self._allocations(self.top if top is None else top)
+        return snapshot
+
+    def _allocations(self, top):
+        # Per-line totals, compared by hand: filtering and diffing whole
+        # snapshots takes seconds on a worker's heap, and keeping one as the
+        # baseline would itself show up as growth
+        current = {}
+        for stat in tracemalloc.take_snapshot().statistics('lineno'):
+            frame = stat.traceback[0]
+            if not frame.filename.startswith(IGNORED_FRAMES):
+                current[f"{frame.filename}:{frame.lineno}"] = (stat.size, stat.count)
+        with self._lock:
+            if self._baseline is None:
+                self._baseline = current
+            baseline = self._baseline
+        growth = []
+        for where, (size, count) in current.items():
+            base_size, base_count = baseline.get(where, (0, 0))
+            if size > base_size:
+                growth.append((size - base_size, count - base_count, size, where))
+        growth.sort(reverse=True)
+        traced, peak = tracemalloc.get_traced_memory()
+        return {
+            'traced_mb': round(traced / 1024 / 1024, 2),
+            'peak_mb': round(peak / 1024 / 1024, 2),
+            'top_growth': [{
+                'where': where,
+                'size_kb': round(size / 1024, 1),
+                'size_diff_kb': round(size_diff / 1024, 1),
+                'count_diff': count_diff
+            } for size_diff, count_diff, size, where in growth[:top]]
+        }
+
+def rss_bytes():
+    """Current resident set size; the peak where /proc is unavailable"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if os.uname().sysname == 'Darwin' else peak * 1024
+
+def open_fds():
+    """Open descriptors by kind (socket, pipe, file, other), or None without /proc"""
+    try:
+        names = os.listdir('/proc/self/fd')
+    except OSError:
+        return None
+    kinds = {'socket': 0, 'pipe': 0, 'file': 0, 'other': 0}
+    for name in names:
+        try:
+            target = os.readlink(f'/proc/self/fd/{name}')
+        except OSError:
+            continue
+        kind = target.split(':', 1)[0] if ':' in target and not target.startswith('/') else 'file'
+        kinds[kind if kind in kinds else 'other'] += 1
+    return kinds
+
+def tcp_sockets():
+    """This process's TCP sockets as {'remote port': {state: count}}, or None without /proc"""
+    inodes = set()
+    try:
+        for name in os.listdir('/proc/self/fd'):
+            try:
+                target = os.readlink(f'/proc/self/fd/{name}')
+            except OSError:
+                continue
+            if target.startswith('socket:['):
+                inodes.add(target[8:-1])
+    except OSError:
+        return None
+    sockets = {}
+    for table in ('/proc/self/net/tcp', '/proc/self/net/tcp6'):
+        try:
+            with open(table) as f:
+                rows = f.read().splitlines()[1:]
+        except OSError:
+            continue
+        for row in rows:
+            fields = row.split()
+            if len(fields) < 10 or fields[9] not in inodes:
+                continue
+            port = str(int(fields[2].rsplit(':', 1)[1], 16))
+            state = TCP_STATES.get(fields[3], 'listen' if fields[3] == '0A' else 'other')
+            counts = sockets.setdefault(port, {})
+            counts[state] = counts.get(state, 0) + 1
+    return sockets
@@ -18,12 +18,24 @@ function initializeApp() {
     // Initialize tooltips
     initializeTooltips();
     
-    // Initialize auto-refresh for dashboard
-    if (window.location.pathname === '/') {
-        startAutoRefresh();
+    // Subscribe to pushed stats and directory changes
+    if (['/', '/users', '/groups'].includes(window.location.pathname)) {
+        startLiveUpdates();
     }
     
-    // Add loading states to forms
+    // Writes push changes in the counts rather than fresh totals
+function applyStatsDelta(delta) {
+    const cards = { users: '.card.bg-primary .card-title', groups: '.card.bg-success .card-title' };
+    Object.keys(delta).forEach(function(name) {
+        const card = cards[name] && document.querySelector(cards[name]);
+        const count = card ? parseInt(card.textContent, 10) : NaN;
+        if (!isNaN(count)) {
+            card.textContent = count + delta[name];
+        }
+    });
+}
+
+// Add loading states to forms
     initializeFormLoading();
     
     // Initialize keyboard shortcuts
@@ -40,9 +52,49 @@ function initializeTooltips() {
     });
 }
 
-// Auto-refresh dashboard stats
+// Live updates over Server-Sent Events; EventSource reconnects by itself
+function startLiveUpdates() {
+    if (!window.EventSource) {
+        if (window.location.pathname === '/') {
+            startAutoRefresh();
+        }
+        return;
+    }
+    
+    const source = new EventSource('/api/events');
+    source.addEventListener('stats', function(e) {
+        const stats = JSON.parse(e.data);
+        if (stats.delta) {
+            applyStatsDelta(stats.delta);
+        } else {
+            updateStatsCards(stats);
+        }
+    });
+    source.addEventListener('directory', function(e) {
+        document.dispatchEvent(new CustomEvent('directory-change', { detail: JSON.parse(e.data) }));
+        if (typeof loadRecentActivity === 'function') {
+            loadRecentActivity();
+        }
+    });
+    source.addEventListener('error', function() {
+        // EventSource gives up on a refused stream (503 when the worker has
+        // no stream slot free): poll instead and try streaming again later
+        if (source.readyState === EventSource.CLOSED) {
+            const polling = window.location.pathname === '/' ? startAutoRefresh() : null;
+            setTimeout(function() {
+                clearInterval(polling);
+                startLiveUpdates();
+            }, 60000);
+        }
+    });
+    window.addEventListener('beforeunload', function() {
+        source.close();
+    });
+}
+
+// Auto-refresh dashboard stats for browsers without EventSource
 function startAutoRefresh() {
-    setInterval(function() {
+    return setInterval(function() {
         refreshDashboardStats();
     }, 30000); // Refresh every 30 seconds
 }
@@ -4,6 +4,25 @@ import os
 from flask import current_app
 import base64
 import subprocess
+import time
+
+from metrics import TAK_COMMAND_SECONDS
+
+def run_command(args, **kwargs):
+    """subprocess.run, timed into the TAK command histogram"""
+    program = args[1:] if args[0] == 'sudo' else args
+    if program[0] == '-u':
+        program = program[2:]
+    command = os.path.basename(program[0])
+    start = time.perf_counter()
+    try:
+        result = subprocess.run(args, **kwargs)
+    except Exception:
+        TAK_COMMAND_SECONDS.labels(command, 'error').observe(time.perf_counter() - start)
+        raise
+    outcome = 'ok' if getattr(result, 'returncode', 0) == 0 else 'failed'
+    TAK_COMMAND_SECONDS.labels(command, outcome).observe(time.perf_counter() - start)
+    return result
 
 class TAKServerAPI:
     def __init__(self, base_url, admin_username, admin_password):
@@ -68,8 +87,8 @@ class TAKServerAPI:
             shutil.copy("/opt/tak/certs/files/ca.pem", f"temp/{username}/cert/caCert.p12")
         except:
             # If that fails, try with sudo
-            subprocess.run(["sudo", "cp", "/opt/tak/certs/files/ca.pem", f"temp/{username}/cert/caCert.p12"])
-            subprocess.run(["sudo", "chmod", "644", f"temp/{username}/cert/caCert.p12"])
+            run_command(["sudo", "cp", "/opt/tak/certs/files/ca.pem", f"temp/{username}/cert/caCert.p12"])
+            run_command(["sudo", "chmod", "644", f"temp/{username}/cert/caCert.p12"])
         
         # Create manifest
         manifest = f"""<?xml version="1.0" encoding="UTF-8"?>
@@ -90,7 +109,7 @@ class TAKServerAPI:
         
         # Create zip file
         os.makedirs("static/enrollment_packages", exist_ok=True)
-        subprocess.run(["zip", "-r", f"../../static/enrollment_packages/{username}.zip", "*"], cwd=f"temp/{username}")
+        run_command(["zip", "-r", f"../../static/enrollment_packages/{username}.zip", "*"], cwd=f"temp/{username}")
         
         # Clean up
         shutil.rmtree(f"temp/{username}")
@@ -102,10 +121,10 @@ class TAKServerAPI:
         os.makedirs("static/certificates", exist_ok=True)
         
         # Execute the makeCert.sh script
-        subprocess.run(["sudo", "-u", "tak", "/opt/tak/certs/makeCert.sh", "client", username], cwd="/opt/tak/certs")
+        run_command(["sudo", "-u", "tak", "/opt/tak/certs/makeCert.sh", "client", username], cwd="/opt/tak/certs")
         
         # Create P12 file
-        subprocess.run([
+        run_command([
             "sudo", "openssl", "pkcs12", "-export", 
             "-in", f"/opt/tak/certs/files/{username}.pem", 
             "-inkey", f"/opt/tak/certs/files/{username}.key", 
@@ -115,6 +134,6 @@ class TAKServerAPI:
         ])
         
         # Set permissions
-        subprocess.run(["sudo", "chmod", "644", f"static/certificates/{username}.p12"])
+        run_command(["sudo", "chmod", "644", f"static/certificates/{username}.p12"])
         
         return f"static/certificates/{username}.p12"
@@ -4,6 +4,11 @@ import tempfile
 from unittest.mock import patch, MagicMock
 import logging
 
+# Keep rate limit counters in process memory; a test run never needs Redis
+os.environ.setdefault('RATELIMIT_STORAGE_URI', 'memory://')
+os.environ.setdefault('AUDIT_LOG_FILE', os.path.join(tempfile.gettempdir(), 'ldap-admin-test-audit.log'))
+os.environ.setdefault('AUDIT_DB_DIR', os.path.join(tempfile.gettempdir(), 'ldap-admin-test-audit'))
+
 # Mock the logging configuration before importing the app
 @pytest.fixture(scope="session", autouse=True)
 def mock_logging():
@@ -14,6 +19,14 @@ def mock_logging():
         mock_file_handler.return_value = mock_handler
         yield mock_handler
 
+@pytest.fixture(autouse=True)
+def reset_ldap_breaker():
+    """Start every test with closed LDAP circuit breakers."""
+    import sys
+    if 'app' in sys.modules and hasattr(sys.modules['app'], 'ldap_topology'):
+        sys.modules['app'].ldap_topology.reset()
+    yield
+
 # Now we can safely import the app
 @pytest.fixture(scope="session")
 def flask_app():
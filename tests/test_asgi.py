@@ -0,0 +1,94 @@
+import asyncio
+import time
+import pytest
+from unittest.mock import patch
+
+pytest.importorskip('asgiref')
+
+def call(application, path):
+    """Drive one GET request through the ASGI app and return (status, body)."""
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+        'scheme': 'http', 'path': path, 'raw_path': path.encode(), 'root_path': '', 'query_string': b'',
+        'headers': [(b'host', b'localhost')], 'client': ('127.0.0.1', 5000), 'server': ('localhost', 80)
+    }
+    sent = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message):
+        sent.append(message)
+
+    async def run():
+        await application(scope, receive, send)
+        status = next(m['status'] for m in sent if m['type'] == 'http.response.start')
+        return status, b''.join(m.get('body', b'') for m in sent if m['type'] == 'http.response.body')
+    return run()
+
+class TestAsgiApplication:
+    """Test the ASGI deployment entry point."""
+
+    def test_serves_flask_routes(self, app):
+        """Requests are answered by the existing Flask routes."""
+        import json
+        from asgi import application
+        with patch.dict(app.config, {'LOGIN_DISABLED': True}), \
+             patch('app.get_ldap_connection', return_value=None):
+            status, body = asyncio.run(call(application, '/api/stats'))
+        assert status == 200
+        assert json.loads(body)['status'] == 'disconnected'
+
+    def test_requests_run_concurrently(self, app):
+        """Slow LDAP calls overlap instead of queueing behind one another."""
+        from asgi import application
+
+        def slow_connection(**kwargs):
+            time.sleep(0.3)
+            return None
+
+        async def burst():
+            return await asyncio.gather(*[call(application, '/api/stats') for _ in range(8)])
+
+        with patch.dict(app.config, {'LOGIN_DISABLED': True}), \
+             patch('app.get_ldap_connection', side_effect=slow_connection):
+            start = time.monotonic()
+            results = asyncio.run(burst())
+            elapsed = time.monotonic() - start
+        assert all(status == 200 for status, _ in results)
+        assert elapsed < 1.5
+
+    def test_runs_on_adapter_threads(self):
+        """The WSGI app runs on the adapter's executor and its body is cut at Content-Length."""
+        import asgi
+        import threading
+        threads = []
+
+        def wsgi_app(environ, start_response):
+            threads.append(threading.current_thread().name)
+            start_response('200 OK', [('Content-Length', '5')])
+            return [b'hello', b' world']
+
+        adapter = asgi.ThreadedWsgiToAsgi(wsgi_app, max_threads=2)
+        assert asyncio.run(call(adapter, '/')) == (200, b'hello')
+        assert threads[0].startswith('asgi')
+
+    def test_lifespan_shutdown_closes_pools(self):
+        """Lifespan shutdown drains idle pooled connections."""
+        import asgi
+        from unittest.mock import MagicMock
+        pool = MagicMock()
+        adapter = asgi.ThreadedWsgiToAsgi(MagicMock(), max_threads=1)
+        messages = iter([{'type': 'lifespan.startup'}, {'type': 'lifespan.shutdown'}])
+        sent = []
+
+        async def receive():
+            return next(messages)
+
+        async def send(message):
+            sent.append(message['type'])
+
+        with patch.object(asgi, 'ldap_pool', pool):
+            asyncio.run(adapter({'type': 'lifespan'}, receive, send))
+        assert sent == ['lifespan.startup.complete', 'lifespan.shutdown.complete']
+        pool.close_all.assert_called_once()
@@ -0,0 +1,172 @@
+import gzip
+import json
+import os
+import threading
+import time
+import pytest
+from unittest.mock import patch, MagicMock
+
+from audit_log import AuditWriter, FileSink, RedisStreamSink
+
+class GatedSink:
+    """Sink whose first write blocks until released."""
+
+    def __init__(self):
+        self.batches = []
+        self.gate = threading.Event()
+
+    def write(self, events):
+        self.gate.wait(5)
+        self.batches.append(list(events))
+
+    def close(self):
+        pass
+
+class TestAuditWriter:
+    """Test the batched background audit writer."""
+
+    def test_events_are_batched(self):
+        """Events queued while the writer is busy go out as one batch."""
+        sink = GatedSink()
+        writer = AuditWriter([sink])
+        writer.emit({'n': 0})
+        while writer.snapshot()['backlog']:
+            time.sleep(0.001)
+        for n in range(1, 51):
+            writer.emit({'n': n})
+        sink.gate.set()
+        assert writer.flush()
+        assert [len(batch) for batch in sink.batches] == [1, 50]
+        assert writer.snapshot()['written'] == 51
+
+    def test_full_queue_drops_and_counts(self):
+        """With overflow='drop' a full queue discards events instead of blocking."""
+        sink = GatedSink()
+        writer = AuditWriter([sink], max_queue=2)
+        results = [writer.emit({'n': n}) for n in range(10)]
+        assert results.count(False) >= 7
+        assert writer.snapshot()['dropped'] == results.count(False)
+        sink.gate.set()
+        writer.flush()
+
+    def test_sink_errors_are_counted(self):
+        """A failing sink does not stop the others."""
+        broken = MagicMock()
+        broken.write.side_effect = OSError("disk full")
+        good = MagicMock()
+        writer = AuditWriter([broken, good])
+        writer.emit({'action': 'login_success'})
+        assert writer.flush()
+        good.write.assert_called_once_with([{'action': 'login_success'}])
+        assert writer.snapshot()['sink_errors'] == 1
+
+class TestFileSink:
+    """Test the rotating JSON-lines file sink."""
+
+    def test_writes_json_lines(self, tmp_path):
+        """Each event becomes one JSON line."""
+        sink = FileSink(str(tmp_path / 'audit.log'))
+        sink.write([{'action': 'a'}, {'action': 'b'}])
+        sink.close()
+        lines = (tmp_path / 'audit.log').read_text().splitlines()
+        assert [json.loads(line)['action'] for line in lines] == ['a', 'b']
+
+    def test_rotates_by_size_and_compresses(self, tmp_path):
+        """Passing max_bytes moves the file aside gzipped and keeps backup_count files."""
+        path = str(tmp_path / 'audit.log')
+        sink = FileSink(path, max_bytes=100, backup_count=2)
+        for n in range(4):
+            sink.write([{'action': 'x' * 100, 'n': n}])
+        rotated = sorted((p for p in os.listdir(tmp_path) if p != 'audit.log'), key=lambda p: os.path.getmtime(tmp_path / p))
+        assert len(rotated) == 2
+        assert all(name.endswith('.gz') for name in rotated)
+        with gzip.open(tmp_path / rotated[-1], 'rt') as f:
+            assert json.loads(f.read())['n'] == 3
+        assert sink.rotations == 4
+
+    def test_rotates_by_age(self, tmp_path):
+        """A file older than max_age is rotated on the next write."""
+        path = str(tmp_path / 'audit.log')
+        sink = FileSink(path, max_age=60, compress=False)
+        with patch('audit_log.time.time', return_value=1000.0):
+            sink.write([{'n': 1}])
+        with patch('audit_log.time.time', return_value=1100.0):
+            sink.write([{'n': 2}])
+        assert sink.rotations == 1
+        assert not os.path.exists(path)
+
+    def test_sinks_sharing_a_path_lose_nothing(self, tmp_path):
+        """A sink whose file another sink rotated away writes to the new file."""
+        path = str(tmp_path / 'audit.log')
+        first = FileSink(path, max_bytes=100, backup_count=100, compress=False)
+        second = FileSink(path, max_bytes=100, backup_count=100, compress=False)
+        second.write([{'n': 0}])
+        first.write([{'n': 1, 'pad': 'x' * 100}])
+        second.write([{'n': 2}])
+        assert first.rotations == 1
+        with open(path) as f:
+            assert [json.loads(line)['n'] for line in f] == [2]
+
+    def test_concurrent_processes_lose_nothing(self, tmp_path):
+        """Two forked workers rotating one path keep every event."""
+        import multiprocessing
+        path = str(tmp_path / 'audit.log')
+
+        def worker(name):
+            sink = FileSink(path, max_bytes=2000, backup_count=1000)
+            for n in range(300):
+                sink.write([{'worker': name, 'n': n}])
+            sink.close()
+
+        context = multiprocessing.get_context('fork')
+        processes = [context.Process(target=worker, args=(name,)) for name in ('a', 'b')]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join(30)
+        events = []
+        for name in os.listdir(tmp_path):
+            opener = gzip.open if name.endswith('.gz') else open
+            with opener(tmp_path / name, 'rt') as f:
+                events.extend(json.loads(line) for line in f)
+        assert sorted((event['worker'], event['n']) for event in events) == \
+            sorted((name, n) for name in ('a', 'b') for n in range(300))
+
+    def test_failed_rotation_releases_lock(self, tmp_path):
+        """A rotation that raises leaves the file unlocked for other sinks."""
+        import fcntl
+        path = str(tmp_path / 'audit.log')
+        sink = FileSink(path)
+        sink.write([{'n': 0}])
+        with patch('audit_log.os.replace', side_effect=OSError('disk full')), pytest.raises(OSError):
+            sink.rotate()
+        with open(path) as other:
+            fcntl.flock(other.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+
+class TestRedisStreamSink:
+    """Test the optional Redis stream sink."""
+
+    def test_batch_is_one_pipeline(self):
+        """All events of a batch are XADDed through a single pipeline."""
+        client = MagicMock()
+        sink = RedisStreamSink(lambda: client, maxlen=1000)
+        sink.write([{'n': 1}, {'n': 2}])
+        pipe = client.pipeline.return_value
+        assert pipe.xadd.call_count == 2
+        assert pipe.xadd.call_args.kwargs == {'maxlen': 1000, 'approximate': True}
+        pipe.execute.assert_called_once()
+
+class TestLogAction:
+    """Test log_action feeds the audit writer."""
+
+    def test_log_action_enqueues_event(self, app):
+        """log_action queues a structured event instead of writing synchronously."""
+        import app as app_module
+        writer = MagicMock()
+        with patch.object(app_module, 'audit_log', writer, create=True), \
+             app.test_request_context('/', environ_base={'REMOTE_ADDR': '10.0.0.5'}):
+            app_module.log_action('list_users', 'Retrieved 3 users')
+        event = writer.emit.call_args.args[0]
+        assert event['action'] == 'list_users'
+        assert event['user'] == 'anonymous'
+        assert event['ip'] == '10.0.0.5'
@@ -0,0 +1,109 @@
+import sqlite3
+import time
+import pytest
+from unittest.mock import patch
+
+from audit_store import AuditStore, parse_since
+
+DAY = 86400
+
+def event(ts, user='admin', action='list_users'):
+    """Audit event as queued by log_action."""
+    return {'timestamp': ts, 'user': user, 'action': action, 'details': '', 'ip': '10.0.0.1'}
+
+@pytest.fixture
+def store(tmp_path):
+    """Store with a few days of events for two users."""
+    store = AuditStore(str(tmp_path), retention_days=3650)
+    now = time.time()
+    store.write([event(now - 2 * DAY + n, user='operator' if n % 2 else 'admin') for n in range(10)])
+    store.write([event(now - DAY + n, action='login_success') for n in range(5)])
+    store.write([event(now + n) for n in range(5)])
+    yield store
+    store.close()
+
+class TestAuditStore:
+    """Test the day-partitioned audit store."""
+
+    def test_one_partition_per_day(self, store):
+        """Events land in one SQLite file per UTC day."""
+        assert len(store.partitions()) == 3
+
+    def test_newest_first_across_partitions(self, store):
+        """Queries return newest events first, crossing partitions."""
+        events, _ = store.query(limit=100)
+        timestamps = [e['timestamp'] for e in events]
+        assert len(events) == 20
+        assert timestamps == sorted(timestamps, reverse=True)
+
+    def test_filters(self, store):
+        """user, action and since narrow the results."""
+        assert len(store.query(user='operator')[0]) == 5
+        assert len(store.query(action='login_success')[0]) == 5
+        assert len(store.query(since=time.time() - 60)[0]) == 5
+
+    def test_cursor_paging(self, store):
+        """Following next_cursor visits every event exactly once."""
+        seen, cursor = [], None
+        while True:
+            events, cursor = store.query(limit=7, cursor=cursor)
+            seen.extend(e['id'] for e in events)
+            if not cursor:
+                break
+        assert len(seen) == len(set(seen)) == 20
+
+    def test_queries_use_indexes(self, store):
+        """Filtered, ordered queries are index range scans, not table scans."""
+        conn = sqlite3.connect(store._path(store.partitions()[0]))
+        plan = ' '.join(row[-1] for row in conn.execute(
+            'EXPLAIN QUERY PLAN SELECT * FROM events WHERE user = ? AND (ts, id) < (?, ?) ORDER BY ts DESC, id DESC LIMIT 50',
+            ('admin', time.time(), 10)
+        ))
+        conn.close()
+        assert 'events_user_ts' in plan
+        assert 'TEMP B-TREE' not in plan
+
+    def test_old_partitions_expire(self, tmp_path):
+        """Partitions older than retention_days are deleted when a new day opens."""
+        store = AuditStore(str(tmp_path), retention_days=1)
+        store.write([event(time.time() - 5 * DAY)])
+        store.write([event(time.time())])
+        assert len(store.partitions()) == 1
+        store.close()
+
+    def test_parse_since(self):
+        """since accepts epoch seconds or ISO 8601."""
+        assert parse_since('1700000000') == 1700000000.0
+        assert parse_since('2024-01-01T00:00:00+00:00') == 1704067200.0
+        assert parse_since('') is None
+        with pytest.raises(ValueError):
+            parse_since('yesterday')
+
+class TestAuditApi:
+    """Test GET /api/audit."""
+
+    def test_returns_events_and_cursor(self, authenticated_admin_client, store):
+        """Admins can query every user's events with paging."""
+        import app as app_module
+        with patch.object(app_module, 'audit_store', store, create=True):
+            data = authenticated_admin_client.get('/api/audit?limit=5&user=operator').get_json()
+        assert len(data['events']) == 5
+        assert all(e['user'] == 'operator' for e in data['events'])
+
+    def test_invalid_since_is_rejected(self, authenticated_admin_client, store):
+        """An unparseable since is a 400, not a 500."""
+        import app as app_module
+        with patch.object(app_module, 'audit_store', store, create=True):
+            response = authenticated_admin_client.get('/api/audit?since=yesterday')
+        assert response.status_code == 400
+
+    def test_viewer_sees_only_own_events(self, client, store):
+        """Viewers are restricted to their own trail."""
+        import app as app_module
+        with client.session_transaction() as sess:
+            sess['_user_id'] = 'viewer'
+            sess['_fresh'] = True
+        store.write([event(time.time(), user='viewer')])
+        with patch.object(app_module, 'audit_store', store, create=True):
+            data = client.get('/api/audit?user=admin').get_json()
+        assert [e['user'] for e in data['events']] == ['viewer']
@@ -0,0 +1,82 @@
+import random
+
+from benchmarks import history
+
+def run(commit, timestamp, latency_ms=10.0, rss_mb=50.0, seed=0):
+    """One bench_api result document with a single endpoint."""
+    rng = random.Random(seed)
+    samples = sorted(latency_ms * rng.uniform(0.9, 1.1) for _ in range(100))
+    return {
+        'benchmark': 'api',
+        'commit': commit,
+        'timestamp': timestamp,
+        'scenarios': [{'users': 1000, 'groups': 100, 'endpoints': {'GET /api/users': {
+            'p50_ms': samples[50], 'p99_ms': samples[99], 'throughput_rps': 100.0,
+            'peak_rss_mb': rss_mb, 'samples_ms': samples
+        }}}]
+    }
+
+class TestHistoryFile:
+    """Test the append-only history file."""
+
+    def test_append_and_load(self, tmp_path):
+        """Runs come back in order; re-adding a run is a no-op."""
+        path = str(tmp_path / 'history.jsonl')
+        assert history.append(run('aaa', '1'), path)
+        assert history.append(run('bbb', '2'), path)
+        assert not history.append(run('aaa', '1'), path)
+        assert [r['commit'] for r in history.load(path)] == ['aaa', 'bbb']
+
+    def test_torn_line_is_skipped(self, tmp_path):
+        """A partly written last line does not hide the runs before it."""
+        path = tmp_path / 'history.jsonl'
+        history.append(run('aaa', '1'), str(path))
+        with open(path, 'a') as f:
+            f.write('{"commit": "bb')
+        assert [r['commit'] for r in history.load(str(path))] == ['aaa']
+
+    def test_runs_of_a_commit_are_pooled(self):
+        """Two runs of one commit contribute to the same series."""
+        table = history.series([run('aaa', '1'), run('aaa', '2', seed=1)])
+        pooled = table['1000x100']['GET /api/users']['aaa']
+        assert len(pooled['samples_ms']) == 200
+        assert len(pooled['peak_rss_mb']) == 2
+
+class TestRegressions:
+    """Test regression detection."""
+
+    def test_mann_whitney(self):
+        """Shifted samples give a small p-value, identical ones a large one."""
+        baseline = [float(v) for v in range(50)]
+        assert history.mann_whitney_greater([v + 20 for v in baseline], baseline) < 0.001
+        assert history.mann_whitney_greater(baseline, baseline) > 0.4
+        assert history.mann_whitney_greater([1.0] * 20, [1.0] * 20) == 1.0
+
+    def test_latency_regression_flagged(self):
+        """A 30% slower endpoint is reported against the previous commit."""
+        runs = [run('aaa', '1'), run('bbb', '2', seed=1), run('ccc', '3', latency_ms=13.0, seed=2)]
+        commit, baseline, findings = history.find_regressions(runs)
+        assert (commit, baseline) == ('ccc', 'bbb')
+        finding, = findings
+        assert finding['metric'].startswith('latency')
+        assert finding['endpoint'] == 'GET /api/users'
+        assert 25 < finding['change_pct'] < 35
+
+    def test_noise_is_not_flagged(self):
+        """Runs drawn from the same distribution are not regressions."""
+        runs = [run(f'c{n}', str(n), rss_mb=50 + n % 2 * 0.2, seed=n) for n in range(5)]
+        assert history.find_regressions(runs)[2] == []
+
+    def test_memory_regression_flagged(self):
+        """Peak RSS far outside the spread of earlier commits is reported."""
+        runs = [run(f'c{n}', str(n), rss_mb=50 + n % 2 * 0.2, seed=n) for n in range(4)]
+        runs.append(run('new', '9', rss_mb=60, seed=9))
+        finding, = history.find_regressions(runs)[2]
+        assert finding['metric'].startswith('peak RSS')
+        assert finding['current'] == 60
+
+    def test_explicit_baseline(self):
+        """A baseline commit can be chosen; an unknown one yields no findings."""
+        runs = [run('aaa', '1'), run('bbb', '2', latency_ms=13.0, seed=1), run('ccc', '3', latency_ms=13.0, seed=2)]
+        assert history.find_regressions(runs, baseline='aaa')[2]
+        assert history.find_regressions(runs, baseline='zzz')[2] == []
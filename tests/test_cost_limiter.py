@@ -0,0 +1,155 @@
+import pytest
+from unittest.mock import patch, MagicMock
+
+from cost_limiter import CostLimiter
+
+class TestCostLimiter:
+    """Test the cost-weighted token bucket."""
+
+    def test_consume_within_capacity(self):
+        """Calls are allowed while the bucket holds enough tokens."""
+        limiter = CostLimiter(capacity=10, refill_rate=1)
+        assert limiter.consume('admin', 4) == (True, 0)
+        assert limiter.consume('admin', 4) == (True, 0)
+
+    def test_consume_over_capacity_returns_retry_after(self):
+        """A call costing more than the remaining tokens is rejected."""
+        limiter = CostLimiter(capacity=10, refill_rate=1)
+        limiter.consume('admin', 8)
+        allowed, retry_after = limiter.consume('admin', 5)
+        assert allowed is False
+        assert retry_after >= 3
+
+    def test_buckets_are_per_key(self):
+        """One operator's spending does not affect another's."""
+        limiter = CostLimiter(capacity=10, refill_rate=1)
+        limiter.consume('admin', 10)
+        assert limiter.consume('operator', 10) == (True, 0)
+
+    def test_charge_puts_bucket_in_debt(self):
+        """Post-hoc charges are applied even beyond the balance."""
+        limiter = CostLimiter(capacity=10, refill_rate=1)
+        limiter.consume('admin', 5)
+        limiter.charge('admin', 8)
+        allowed, retry_after = limiter.consume('admin', 1)
+        assert allowed is False
+        assert retry_after >= 4
+
+    def test_charge_capped_at_capacity(self):
+        """One oversized charge empties a full bucket and no more."""
+        limiter = CostLimiter(capacity=10, refill_rate=1)
+        limiter.charge('admin', 1000)
+        assert limiter.consume('admin', 1) == (False, 1)
+
+    def test_refund(self):
+        """Refunded tokens can be spent again."""
+        limiter = CostLimiter(capacity=10, refill_rate=0.01)
+        limiter.consume('admin', 10)
+        limiter.refund('admin', 10)
+        assert limiter.consume('admin', 10) == (True, 0)
+
+    def test_refill_over_time(self):
+        """Tokens are refilled at refill_rate per second."""
+        limiter = CostLimiter(capacity=10, refill_rate=2)
+        with patch('cost_limiter.time.time', return_value=1000.0):
+            limiter.consume('admin', 10)
+        with patch('cost_limiter.time.time', return_value=1003.0):
+            assert limiter.consume('admin', 6) == (True, 0)
+
+    def test_refund_on_full_bucket(self):
+        """A refund never lifts the balance above capacity."""
+        limiter = CostLimiter(capacity=10, refill_rate=0.01)
+        limiter.refund('admin', 10)
+        assert limiter.consume('admin', 10) == (True, 0)
+        allowed, _ = limiter.consume('admin', 5)
+        assert allowed is False
+
+    def test_redis_error_falls_back_to_memory(self):
+        """A Redis failure should not fail the request."""
+        mock_redis = MagicMock()
+        mock_redis.register_script.return_value = MagicMock(side_effect=Exception("Redis down"))
+        limiter = CostLimiter(capacity=10, refill_rate=1, redis_client=mock_redis)
+        assert limiter.consume('admin', 5) == (True, 0)
+
+    def test_redis_script_result(self):
+        """The Redis script result is used when Redis answers."""
+        mock_redis = MagicMock()
+        mock_redis.register_script.return_value = MagicMock(return_value=[0, '-2.5'])
+        limiter = CostLimiter(capacity=10, refill_rate=1, redis_client=mock_redis)
+        allowed, retry_after = limiter.consume('admin', 5)
+        assert allowed is False
+        assert retry_after == 8
+
+class TestLdapCostDecorator:
+    """Test the ldap_cost decorator on API routes."""
+
+    def test_budget_exceeded_returns_429(self, client_with_rate_limits):
+        """Exhausting the budget returns 429 with Retry-After."""
+        import app as app_module
+        with client_with_rate_limits.session_transaction() as sess:
+            sess['_user_id'] = 'admin'
+            sess['_fresh'] = True
+
+        with patch.object(app_module, 'cost_limiter', CostLimiter(capacity=2, refill_rate=0.01)), \
+             patch('app.get_ldap_connection', return_value=None):
+            statuses = [client_with_rate_limits.get('/api/test-connection') for _ in range(3)]
+
+        assert [r.status_code for r in statuses[:2]] == [200, 200]
+        assert statuses[2].status_code == 429
+        assert int(statuses[2].headers['Retry-After']) >= 1
+        assert statuses[2].get_json()['error'] == 'LDAP budget exceeded'
+
+    def test_result_size_is_charged(self, client_with_rate_limits):
+        """Listing charges per returned entry after the search."""
+        import app as app_module
+        with client_with_rate_limits.session_transaction() as sess:
+            sess['_user_id'] = 'admin'
+            sess['_fresh'] = True
+
+        mock_conn = MagicMock()
+        mock_conn.strategy.sync = True
+        mock_conn.response = [{'type': 'searchResEntry', 'dn': f'uid=u{i}', 'attributes': {}} for i in range(100)]
+        mock_conn.result = {'result': 0}
+        budget = CostLimiter(capacity=100, refill_rate=0.01)
+        with patch.object(app_module, 'cost_limiter', budget), \
+             patch('app.get_ldap_connection', return_value=mock_conn):
+            response = client_with_rate_limits.get('/api/users')
+
+        assert response.status_code == 200
+        allowed, retry_after = budget.consume('admin', 85)
+        assert allowed is False
+
+    def test_large_listing_does_not_lock_out(self, client_with_rate_limits):
+        """A listing far larger than the budget costs at most one full bucket."""
+        import app as app_module
+        with client_with_rate_limits.session_transaction() as sess:
+            sess['_user_id'] = 'admin'
+            sess['_fresh'] = True
+
+        mock_conn = MagicMock()
+        mock_conn.strategy.sync = True
+        mock_conn.response = [{'type': 'searchResEntry', 'dn': f'uid=u{i}', 'attributes': {}} for i in range(20000)]
+        mock_conn.result = {'result': 0}
+        with patch.object(app_module, 'cost_limiter', CostLimiter(capacity=1000, refill_rate=5)), \
+             patch('app.get_ldap_connection', return_value=mock_conn):
+            assert client_with_rate_limits.get('/api/users').status_code == 200
+            response = client_with_rate_limits.get('/api/users')
+
+        assert response.status_code == 429
+        assert int(response.headers['Retry-After']) <= 5
+
+    def test_shed_request_is_refunded(self, client_with_rate_limits):
+        """A request shed with 503 before reaching LDAP costs nothing."""
+        import app as app_module
+        from ldap_concurrency import LDAPOverloaded
+        with client_with_rate_limits.session_transaction() as sess:
+            sess['_user_id'] = 'admin'
+            sess['_fresh'] = True
+
+        budget = CostLimiter(capacity=10, refill_rate=0.01)
+        with patch.object(app_module, 'cost_limiter', budget), \
+             patch.object(app_module.ldap_concurrency, 'slot', side_effect=LDAPOverloaded(1)):
+            statuses = [client_with_rate_limits.get('/api/users').status_code for _ in range(3)]
+
+        assert statuses == [503, 503, 503]
+        assert budget.consume('admin', 10) == (True, 0)
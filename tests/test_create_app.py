@@ -0,0 +1,67 @@
+import os
+import subprocess
+import sys
+import pytest
+from unittest.mock import patch, MagicMock
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+class TestCreateApp:
+    """Test the application factory and lazy resources."""
+
+    def test_import_has_no_side_effects(self, tmp_path):
+        """Importing app contacts no Redis, hashes no passwords and creates no directories."""
+        env = dict(os.environ, REDIS_HOST='10.255.255.1', PYTHONPATH=ROOT)
+        env.pop('RATELIMIT_STORAGE_URI', None)
+        script = (
+            "import app, json; "
+            "import sys; "
+            "print(json.dumps({'cached': [n for n in app._RESOURCE_FACTORIES if n in vars(app)], "
+            "'storage': app.RATELIMIT_STORAGE_URI, "
+            "'lazy_imported': [m for m in ('requests', 'bcrypt', 'tak_server') if m in sys.modules]}))"
+        )
+        result = subprocess.run([sys.executable, '-c', script], cwd=tmp_path, env=env,
+                                capture_output=True, text=True, timeout=30)
+        assert result.returncode == 0, result.stderr
+        output = result.stdout.strip().splitlines()[-1]
+        assert '"cached": []' in output
+        assert 'redis://10.255.255.1:6379/0' in output
+        assert '"lazy_imported": []' in output
+        assert not (tmp_path / 'static').exists()
+
+    def test_resource_created_once_on_first_use(self, app, monkeypatch):
+        """A lazy resource is built on first access and then reused."""
+        import app as app_module
+        factory = MagicMock(return_value=object())
+        monkeypatch.setitem(app_module._RESOURCE_FACTORIES, 'widget', factory)
+        first = app_module.get_resource('widget')
+        assert app_module.widget is first
+        assert factory.call_count == 1
+        monkeypatch.delitem(vars(app_module), 'widget')
+
+    def test_redis_client_is_lazy(self, app, monkeypatch):
+        """Redis is pinged on first use and an unreachable server yields None."""
+        import app as app_module
+        monkeypatch.delitem(vars(app_module), 'redis_client', raising=False)
+        with patch('redis.Redis') as mock_redis:
+            mock_redis.return_value.ping.side_effect = Exception("unreachable")
+            assert app_module.redis_client is None
+            assert mock_redis.call_args.kwargs['socket_connect_timeout'] == 0.25
+        monkeypatch.delitem(vars(app_module), 'redis_client')
+
+    def test_patched_resource_is_used(self, app):
+        """Patching a module attribute replaces the lazy resource."""
+        import app as app_module
+        users = {'solo': {'password_hash': b'', 'role': 'viewer', 'name': 'Solo'}}
+        with patch('app.ADMIN_USERS', users):
+            assert app_module.load_user('solo').name == 'Solo'
+            assert app_module.load_user('admin') is None
+
+    def test_create_app_configures_logging_once(self):
+        """create_app returns the app and sets up logging only the first time."""
+        import app as app_module
+        with patch.object(app_module, '_logging_configured', False), \
+             patch('app.configure_logging') as configure:
+            assert app_module.create_app() is app_module.app
+            assert app_module.create_app() is app_module.app
+        configure.assert_called_once()
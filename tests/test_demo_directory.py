@@ -0,0 +1,189 @@
+import pytest
+from unittest.mock import patch
+
+from ldap3 import Server, Connection, ALL, ASYNC, NONE, SUBTREE, MODIFY_ADD, MODIFY_REPLACE
+from demo_directory import DemoDirectory, DemoLDAPServer, generate_entries, open_demo_directory
+
+BASE_DN = 'dc=tak,dc=local'
+ADMIN_DN = 'cn=admin,dc=tak,dc=local'
+
+def entries(users, groups, seed=0):
+    return list(generate_entries(users, groups, seed, BASE_DN, 'ou=users', 'ou=groups', ADMIN_DN, 'secret'))
+
+@pytest.fixture
+def directory():
+    directory = DemoDirectory(BASE_DN, ADMIN_DN, 'secret')
+    directory.populate(users=500, groups=40, seed=7)
+    return directory
+
+class TestGenerator:
+    """Test the synthetic directory generator."""
+
+    def test_same_seed_same_directory(self):
+        """A seed always produces the same entries; another seed does not."""
+        assert entries(200, 20, seed=1) == entries(200, 20, seed=1)
+        assert entries(200, 20, seed=1) != entries(200, 20, seed=2)
+
+    def test_counts(self):
+        """Base, admin and OU entries plus the requested users and groups."""
+        generated = entries(300, 30)
+        users = [dn for dn, _ in generated if dn.startswith('uid=')]
+        groups = [dn for dn, _ in generated if dn.startswith('cn=') and dn != ADMIN_DN]
+        assert len(users) == 300
+        assert len(groups) == 30
+        assert len(generated) == 300 + 30 + 4
+
+    def test_users_are_tak_operators(self):
+        """Users carry names, a callsign, a role and a unit."""
+        dn, user = entries(1, 10)[4]
+        assert dn.startswith('uid=') and dn.endswith(',ou=users,dc=tak,dc=local')
+        assert user['cn'][0] == user['givenName'][0] + b' ' + user['sn'][0]
+        assert b'-' in user['displayName'][0]
+        assert user['ou'][0].startswith(b'Platoon-')
+        assert user['entryDN'] == [dn.encode()]
+
+    def test_groups_nest_and_are_skewed(self):
+        """Companies contain platoons, every user is in a platoon and platoon sizes vary widely."""
+        groups = {dn: entry for dn, entry in entries(5000, 100) if dn.startswith('cn=') and dn != ADMIN_DN}
+        company = groups['cn=Company-A,ou=groups,dc=tak,dc=local']
+        assert all(member.startswith(b'cn=Platoon-') for member in company['member'])
+        platoon_sizes = [len(entry['member']) for dn, entry in groups.items() if dn.startswith('cn=Platoon-')]
+        assert sum(platoon_sizes) == 5000
+        assert max(platoon_sizes) > 10 * min(platoon_sizes)
+
+class TestDemoDirectory:
+    """Test the in-process directory."""
+
+    def test_search(self, directory):
+        """Connections search the generated entries through the ldap3 API."""
+        conn = directory.connect()
+        conn.search('ou=users,dc=tak,dc=local', '(objectClass=inetOrgPerson)', SUBTREE, attributes=['uid'])
+        assert len(conn.entries) == 500
+        conn.search('ou=groups,dc=tak,dc=local', '(cn=Company-A)', SUBTREE, attributes=['member'])
+        assert len(conn.entries) == 1
+
+    def test_async_connection(self, directory):
+        """asynchronous=True gives a MOCK_ASYNC connection answering through get_response()."""
+        conn = directory.connect(asynchronous=True)
+        message_id = conn.search('ou=groups,dc=tak,dc=local', '(objectClass=groupOfNames)', SUBTREE)
+        response, result = conn.get_response(message_id)
+        assert result['description'] == 'success'
+        assert len(response) == 40
+
+    def test_writes(self, directory):
+        """Adds, modifies and deletes are visible to other connections."""
+        conn = directory.connect()
+        assert conn.add('uid=newbie,ou=users,dc=tak,dc=local', ['inetOrgPerson'], {'cn': 'New Bie', 'sn': 'Bie'})
+        other = directory.connect()
+        other.search('ou=users,dc=tak,dc=local', '(uid=newbie)', SUBTREE)
+        assert len(other.entries) == 1
+        assert conn.delete('uid=newbie,ou=users,dc=tak,dc=local')
+
+    def test_new_attribute_stays_on_its_entry(self, directory):
+        """Adding an attribute to one entry leaves entries of the same shape untouched."""
+        conn = directory.connect()
+        conn.search('ou=users,dc=tak,dc=local', '(objectClass=inetOrgPerson)', SUBTREE)
+        first, second = conn.entries[0].entry_dn, conn.entries[1].entry_dn
+        assert conn.modify(first, {'telephoneNumber': [(MODIFY_ADD, ['555-0100'])]})
+        assert 'telephoneNumber' in directory.server.dit[first]
+        assert 'telephoneNumber' not in directory.server.dit[second]
+
+    def test_snapshot_round_trip(self, directory, tmp_path):
+        """A snapshot reloads the same directory, including changes made since generation."""
+        directory.connect().delete(next(dn for dn in directory.server.dit if dn.startswith('uid=')))
+        path = str(tmp_path / 'demo.snapshot')
+        directory.save(path)
+        reloaded = DemoDirectory(BASE_DN, ADMIN_DN, 'secret')
+        assert reloaded.load(path) == len(directory.server.dit)
+        assert dict(reloaded.server.dit.items()).keys() == dict(directory.server.dit.items()).keys()
+
+    def test_load_rejects_other_files(self, tmp_path):
+        """Only files written by save() are loaded."""
+        path = tmp_path / 'other'
+        path.write_bytes(b'\xe9not a snapshot')
+        with pytest.raises(ValueError):
+            DemoDirectory(BASE_DN, ADMIN_DN, 'secret').load(str(path))
+
+    def test_open_saves_then_reloads(self, tmp_path):
+        """open_demo_directory generates once, then loads the snapshot."""
+        path = str(tmp_path / 'demo.snapshot')
+        first = open_demo_directory(BASE_DN, ADMIN_DN, 'secret', users=50, groups=5, snapshot=path)
+        with patch('demo_directory.generate_entries') as generate:
+            second = open_demo_directory(BASE_DN, ADMIN_DN, 'secret', users=50, groups=5, snapshot=path)
+        generate.assert_not_called()
+        assert len(second.server.dit) == len(first.server.dit)
+
+class TestDemoLDAPServer:
+    """Test serving the demo directory over the network."""
+
+    @pytest.fixture
+    def server(self, directory):
+        server = DemoLDAPServer(directory).start()
+        yield server
+        server.stop()
+
+    def test_bind_and_search(self, server):
+        """Real ldap3 clients bind, read the root DSE and search with compound filters."""
+        conn = Connection(Server(server.url, get_info=ALL), ADMIN_DN, 'secret', receive_timeout=5)
+        assert conn.bind()
+        assert conn.server.info.naming_contexts == [BASE_DN]
+        conn.search('ou=users,dc=tak,dc=local', '(&(objectClass=inetOrgPerson)(|(title=Medic)(title=RTO))(!(ou=Platoon-1)))',
+                    SUBTREE, attributes=['title', 'ou'])
+        assert conn.entries
+        assert all(str(entry.title) in ('Medic', 'RTO') and str(entry.ou) != 'Platoon-1' for entry in conn.entries)
+        conn.unbind()
+        assert not Connection(Server(server.url, get_info=NONE), ADMIN_DN, 'wrong').bind()
+
+    def test_writes(self, server, directory):
+        """Adds, modifies, renames, compares and deletes reach the shared directory."""
+        conn = Connection(Server(server.url, get_info=NONE), ADMIN_DN, 'secret', auto_bind=True)
+        dn = 'uid=wire,ou=users,dc=tak,dc=local'
+        assert conn.add(dn, ['inetOrgPerson'], {'cn': 'Wire Test', 'sn': 'Test'})
+        assert not conn.add(dn, ['inetOrgPerson'], {'cn': 'Wire Test', 'sn': 'Test'})
+        assert conn.result['description'] == 'entryAlreadyExists'
+        assert conn.modify(dn, {'cn': [(MODIFY_REPLACE, ['Wire (changed)'])]})
+        assert conn.compare(dn, 'cn', 'Wire (changed)')
+        assert conn.modify_dn(dn, 'uid=wired')
+        assert 'uid=wired,ou=users,dc=tak,dc=local' in directory.server.dit
+        assert conn.delete('uid=wired,ou=users,dc=tak,dc=local')
+        conn.unbind()
+
+    def test_missing_attributes_left_out(self, server):
+        """Requested attributes an entry lacks are not sent, as an async client reads them."""
+        conn = Connection(Server(server.url, get_info=NONE), ADMIN_DN, 'secret', auto_bind=True,
+                          client_strategy=ASYNC, return_empty_attributes=False)
+        message_id = conn.search('ou=users,dc=tak,dc=local', '(objectClass=inetOrgPerson)', SUBTREE,
+                                 attributes=['uid', 'carLicense'])
+        response, _ = conn.get_response(message_id)
+        assert response and all(list(item['raw_attributes']) == ['uid'] for item in response)
+        conn.unbind()
+
+    def test_types_only_lists_requested_names(self, server):
+        """A types-only search still names each attribute without its values."""
+        conn = Connection(Server(server.url, get_info=NONE), ADMIN_DN, 'secret', auto_bind=True)
+        conn.search('ou=users,dc=tak,dc=local', '(objectClass=inetOrgPerson)', SUBTREE, attributes=['uid', 'mail'],
+                    types_only=True, size_limit=1)
+        assert conn.entries and all(not values for values in conn.response[0]['raw_attributes'].values())
+        assert {'uid', 'mail'} <= set(conn.response[0]['raw_attributes'])
+        conn.unbind()
+
+    def test_extended_operations_refused(self, server):
+        """StartTLS and other extended operations get unwillingToPerform."""
+        conn = Connection(Server(server.url, get_info=NONE), ADMIN_DN, 'secret', auto_bind=True)
+        conn.extend.standard.who_am_i()
+        assert conn.result['description'] == 'unwillingToPerform'
+        conn.unbind()
+
+class TestDemoMode:
+    """Test demo mode wired into the app."""
+
+    def test_api_lists_demo_users(self, authenticated_admin_client, directory):
+        """With LDAP_DEMO_MODE the API reads from the demo directory."""
+        import app as app_module
+        with patch.object(app_module, 'LDAP_DEMO_MODE', True), \
+             patch.object(app_module, 'demo_directory', directory, create=True):
+            response = authenticated_admin_client.get('/api/users')
+        assert response.status_code == 200
+        users = response.get_json()
+        assert len(users) == 500
+        assert all(user['groups'] for user in users)
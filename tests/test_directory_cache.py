@@ -0,0 +1,143 @@
+import pytest
+from unittest.mock import patch, MagicMock
+
+from ldap3 import SUBTREE
+from demo_directory import DemoDirectory
+from directory_cache import DirectoryCache, DirectorySnapshot
+
+BASE_DN = 'dc=tak,dc=local'
+ADMIN_DN = 'cn=admin,dc=tak,dc=local'
+
+@pytest.fixture(scope='module')
+def entries():
+    """(user entries, group entries) from a generated directory, as search_many returns them."""
+    import app as app_module
+    directory = DemoDirectory(BASE_DN, ADMIN_DN, 'secret')
+    directory.populate(users=300, groups=20, seed=5)
+    conn = directory.connect()
+    results = []
+    for base, object_class, attributes in (('ou=users', 'inetOrgPerson', app_module.USER_LISTING_ATTRIBUTES),
+                                           ('ou=groups', 'groupOfNames', app_module.GROUP_LISTING_ATTRIBUTES)):
+        conn.search(f'{base},{BASE_DN}', f'(objectClass={object_class})', SUBTREE, attributes=attributes)
+        results.append([item for item in conn.response if item['type'] == 'searchResEntry'])
+    return tuple(results)
+
+class TestDirectorySnapshot:
+    """Test the compact directory representation."""
+
+    def test_same_records_as_listings(self, entries):
+        """Users and groups come back exactly as the uncached listings build them."""
+        import app as app_module
+        user_entries, group_entries = entries
+        snapshot = DirectorySnapshot(user_entries, group_entries)
+        assert snapshot.users() == app_module.user_records(user_entries, app_module.group_membership(group_entries))
+        assert snapshot.groups() == app_module.group_records(group_entries)
+
+    def test_members_are_ids(self):
+        """Members resolve to user positions; other members only count."""
+        users = [{'dn': f'uid=u{n},ou=users,dc=tak,dc=local', 'attributes': {'uid': [f'u{n}']}} for n in range(3)]
+        groups = [
+            {'dn': 'cn=a,ou=groups,dc=tak,dc=local', 'attributes': {'cn': ['a'], 'member': [
+                'UID=u2,ou=users,dc=tak,dc=local', 'cn=b,ou=groups,dc=tak,dc=local', 'uid=u0,ou=users,dc=tak,dc=local'
+            ]}},
+            {'dn': 'cn=b,ou=groups,dc=tak,dc=local', 'attributes': {'cn': ['b'], 'member': ['uid=u2,ou=users,dc=tak,dc=local']}}
+        ]
+        snapshot = DirectorySnapshot(users, groups)
+        assert list(snapshot.members(0)) == [2, 0]
+        assert [group['member_count'] for group in snapshot.groups()] == [3, 1]
+        assert [user['groups'] for user in snapshot.users()] == [['a'], [], ['a', 'b']]
+
+    def test_repeated_names_shared(self, entries):
+        """Repeated first names are one string object."""
+        snapshot = DirectorySnapshot(*entries)
+        by_value = {}
+        for name in snapshot.first_names:
+            assert by_value.setdefault(name, name) is name
+
+class TestDirectoryCache:
+    """Test reloading and invalidating the cache."""
+
+    def test_reused_until_ttl(self, entries):
+        """The snapshot is loaded once per ttl."""
+        load = MagicMock(return_value=entries)
+        cache = DirectoryCache(load, ttl=60)
+        assert cache.get() is cache.get()
+        assert load.call_count == 1
+        with patch('directory_cache.time.monotonic', return_value=cache.get().loaded_at + 61):
+            cache.get()
+        assert load.call_count == 2
+
+    def test_invalidate(self, entries):
+        """A write drops the snapshot."""
+        cache = DirectoryCache(MagicMock(return_value=entries), ttl=60)
+        first = cache.get()
+        cache.invalidate()
+        assert cache.get() is not first
+
+    def test_write_during_load_not_kept(self, entries):
+        """A snapshot loaded across a write serves that request only."""
+        def load():
+            cache.invalidate()
+            return entries
+
+        cache = DirectoryCache(load, ttl=60)
+        cache.get()
+        cache.get()
+        assert cache.loads == 2
+
+    def test_stats(self, entries):
+        """Hits, misses, loads and invalidations are counted with the snapshot size."""
+        cache = DirectoryCache(MagicMock(return_value=entries), ttl=60)
+        cache.get()
+        cache.get()
+        cache.invalidate()
+        cache.get()
+        stats = cache.snapshot()
+        assert {key: stats[key] for key in ('hits', 'misses', 'loads', 'invalidations', 'discarded')} == {
+            'hits': 1, 'misses': 2, 'loads': 2, 'invalidations': 1, 'discarded': 0
+        }
+        assert (stats['users'], stats['groups']) == (300, 20)
+
+    def test_exported_as_component_metrics(self, entries):
+        """refresh_component_metrics() exports the cache like the other components."""
+        import app as app_module
+        from prometheus_client import REGISTRY
+        cache = DirectoryCache(MagicMock(return_value=entries), ttl=60)
+        cache.get()
+        with patch.object(app_module, 'directory_cache', cache):
+            app_module.refresh_component_metrics()
+        assert REGISTRY.get_sample_value('ldap_admin_component_state',
+                                         {'component': 'directory_cache', 'field': 'loads'}) == 1
+
+class TestCachedListings:
+    """Test the listings served from the cache."""
+
+    @pytest.fixture
+    def cache(self, entries):
+        import app as app_module
+        cache = DirectoryCache(MagicMock(return_value=entries), ttl=60)
+        with patch.object(app_module, 'directory_cache', cache), \
+             patch.object(app_module, 'get_ldap_connection', side_effect=AssertionError('searched')) as get_conn:
+            yield cache, get_conn
+
+    def test_listings_from_cache(self, authenticated_admin_client, cache):
+        """Both listings come from one load without a connection."""
+        users = authenticated_admin_client.get('/api/users').get_json()
+        groups = authenticated_admin_client.get('/api/groups').get_json()
+        assert len(users) == 300 and len(groups) == 20
+        assert cache[0].loads == 1
+
+    def test_pinned_session_searches(self, authenticated_admin_client, cache):
+        """A session that just wrote reads the directory, not the cache."""
+        with authenticated_admin_client.session_transaction() as sess:
+            sess['ldap_ryw_until'] = 2 ** 40
+        assert authenticated_admin_client.get('/api/groups').status_code == 500
+        assert cache[1].called and cache[0].loads == 0
+
+    def test_write_invalidates(self, flask_app, authenticated_admin_client, cache):
+        """Writing through this worker drops its snapshot."""
+        import app as app_module
+        authenticated_admin_client.get('/api/users')
+        with flask_app[0].test_request_context():
+            app_module.mark_ldap_write()
+        assert cache[0]._snapshot is None
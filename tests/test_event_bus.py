@@ -0,0 +1,178 @@
+import json
+import pytest
+from unittest.mock import patch, MagicMock
+
+from event_bus import EventBus
+
+class TestEventBus:
+    """Test the publish/subscribe event bus."""
+
+    def test_local_fan_out_without_redis(self):
+        """Without Redis every local subscriber receives the event."""
+        bus = EventBus(lambda: None)
+        first, second = bus.subscribe(), bus.subscribe()
+        bus.publish('stats', {'users': 3})
+        assert first.get(timeout=1) == ('stats', {'users': 3})
+        assert second.get(timeout=1) == ('stats', {'users': 3})
+        assert bus.snapshot()['delivered'] == 2
+
+    def test_closed_subscription_receives_nothing(self):
+        """Closing a subscription removes it from the bus."""
+        bus = EventBus(lambda: None)
+        subscription = bus.subscribe()
+        subscription.close()
+        bus.publish('stats', {})
+        assert subscription.get(timeout=0.01) is None
+        assert bus.snapshot()['subscribers'] == 0
+
+    def test_slow_subscriber_drops_oldest(self):
+        """A full inbox drops its oldest events instead of blocking publishers."""
+        bus = EventBus(lambda: None)
+        subscription = bus.subscribe(max_events=2)
+        for n in range(5):
+            bus.publish('directory', {'n': n})
+        assert [subscription.get(timeout=1)[1]['n'] for _ in range(2)] == [3, 4]
+        assert bus.snapshot()['dropped'] == 3
+
+    def test_publish_goes_through_redis(self):
+        """With Redis, events are published to the shared channel, not fanned out locally."""
+        client = MagicMock()
+        client.pubsub.return_value.listen.return_value = iter([])
+        bus = EventBus(lambda: client)
+        bus.publish('directory', {'action': 'user_deleted'})
+        channel, message = client.publish.call_args.args
+        assert channel == 'ldap-admin:events'
+        assert json.loads(message) == {'type': 'directory', 'data': {'action': 'user_deleted'}}
+
+    def test_redis_failure_falls_back_to_local(self):
+        """A Redis error still delivers to subscribers in this process."""
+        client = MagicMock()
+        client.publish.side_effect = ConnectionError("down")
+        bus = EventBus(lambda: client)
+        with patch.object(bus, '_ensure_listener'):
+            subscription = bus.subscribe()
+        bus.publish('stats', {'users': 1})
+        assert subscription.get(timeout=1) == ('stats', {'users': 1})
+
+class TestEventsApi:
+    """Test the GET /api/events SSE stream."""
+
+    def test_streams_published_events(self, authenticated_admin_client):
+        """The stream sends a retry hint, then each event in SSE framing."""
+        import app as app_module
+        bus = EventBus(lambda: None)
+        with patch.object(app_module, 'event_bus', bus, create=True):
+            response = authenticated_admin_client.get('/api/events')
+            assert response.mimetype == 'text/event-stream'
+            assert response.headers['Cache-Control'] == 'no-cache'
+            chunks = iter(response.response)
+            assert next(chunks) == b'retry: 5000\n\n'
+            bus.publish('stats', {'users': 7})
+            assert next(chunks) == b'event: stats\ndata: {"users": 7}\n\n'
+            response.close()
+        assert bus.snapshot()['subscribers'] == 0
+
+    def test_keepalive_when_idle(self, authenticated_admin_client):
+        """An idle stream sends comment lines so proxies keep it open."""
+        import app as app_module
+        bus = EventBus(lambda: None)
+        with patch.object(app_module, 'event_bus', bus, create=True), \
+             patch.dict('os.environ', {'SSE_KEEPALIVE_SECONDS': '0.01'}):
+            response = authenticated_admin_client.get('/api/events')
+            chunks = iter(response.response)
+            next(chunks)
+            assert next(chunks) == b': keepalive\n\n'
+            response.close()
+
+    def test_streams_capped_per_worker(self, authenticated_admin_client):
+        """Streams past SSE_MAX_STREAMS get 503 until one closes."""
+        import threading
+        import app as app_module
+        bus = EventBus(lambda: None)
+        with patch.object(app_module, 'event_bus', bus, create=True), \
+             patch.object(app_module, 'sse_streams', threading.BoundedSemaphore(1)):
+            first = authenticated_admin_client.get('/api/events')
+            refused = authenticated_admin_client.get('/api/events')
+            assert (first.status_code, refused.status_code) == (200, 503)
+            assert refused.headers['Retry-After'] == '60'
+            first.close()
+            again = authenticated_admin_client.get('/api/events')
+            assert again.status_code == 200
+            again.close()
+        assert bus.snapshot()['subscribers'] == 0
+
+    def test_requires_login(self, client):
+        """Anonymous clients cannot subscribe."""
+        response = client.get('/api/events')
+        assert response.status_code in [302, 401]
+
+    def test_add_user_publishes_change(self, authenticated_admin_client, mock_ldap_connection):
+        """Writes push the change; counts are rescanned once per window, otherwise sent as a delta."""
+        import app as app_module
+        bus = MagicMock()
+        mock_ldap_connection.search.return_value = False
+        mock_ldap_connection.add.return_value = True
+        user_data = {
+            'username': 'newuser',
+            'email': 'newuser@example.com',
+            'first_name': 'New',
+            'last_name': 'User',
+            'password': 'SecurePass123!'
+        }
+        with patch.object(app_module, 'event_bus', bus, create=True), \
+             patch.dict(app_module._stats_rescan, at=float('-inf')), \
+             patch('app.get_ldap_connection', return_value=mock_ldap_connection), \
+             patch('app.directory_counts', return_value=(5, 2)) as counts:
+            response = authenticated_admin_client.post('/api/users', json=user_data)
+            assert response.get_json()['success']
+            mock_ldap_connection.delete.return_value = True
+            authenticated_admin_client.delete('/api/users/newuser')
+        events = [c.args for c in bus.publish.call_args_list]
+        assert events[0][0] == 'directory'
+        assert events[0][1]['action'] == 'user_added'
+        assert events[0][1]['user']['username'] == 'newuser'
+        assert events[1] == ('stats', {'users': 5, 'groups': 2, 'status': 'connected'})
+        # The delete inside the rescan window pushes a delta without recounting
+        assert events[2][1]['action'] == 'user_deleted'
+        assert events[3] == ('stats', {'delta': {'users': -1}, 'status': 'connected'})
+        assert counts.call_count == 1
+
+class TestStreamsUnderGunicorn:
+    """Test open streams against the shipped gunicorn configuration."""
+
+    def test_open_stream_does_not_block_other_requests(self, tmp_path):
+        """With one worker, a request is answered while a stream is open."""
+        import http.client
+        import os
+        import sys
+        import time
+        sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks'))
+        import soak
+        from replay import Client, login
+
+        ldap_url, server, _ = soak.start_directory(50, 5, [])
+        process = None
+        try:
+            # A short keepalive notices the closed stream quickly, so shutdown is not held up
+            with patch.dict(os.environ, SSE_KEEPALIVE_SECONDS='1'):
+                process, url = soak.start_app(ldap_url, 1, str(tmp_path))
+            cookies, _ = login(url, 'admin', 'admin123')
+            stream = http.client.HTTPConnection(url.split('//')[1], timeout=5)
+            stream.request('GET', '/api/events', headers={
+                'Cookie': '; '.join(f"{name}={value}" for name, value in cookies.items())
+            })
+            response = stream.getresponse()
+            assert response.status == 200
+            assert response.readline() == b'retry: 5000\n'
+
+            client = Client(url, timeout=5)
+            start = time.monotonic()
+            assert client.request('GET', '/login')[0] == 200
+            assert time.monotonic() - start < 2
+            client.close()
+            stream.close()
+        finally:
+            if process is not None:
+                process.terminate()
+                process.wait(10)
+            server.stop()
@@ -0,0 +1,133 @@
+import pytest
+from unittest.mock import patch, MagicMock
+
+from ldap_breaker import CircuitBreaker, CircuitOpenError, retry_with_jitter, CLOSED, OPEN, HALF_OPEN
+
+class TestCircuitBreaker:
+    """Test the circuit breaker state machine."""
+
+    def test_opens_after_threshold(self):
+        """Consecutive failures open the breaker."""
+        breaker = CircuitBreaker(failure_threshold=3)
+        for _ in range(3):
+            with pytest.raises(ValueError):
+                breaker.call(MagicMock(side_effect=ValueError("down")))
+        assert breaker.state == OPEN
+
+    def test_open_breaker_short_circuits(self):
+        """An open breaker fails without calling through."""
+        breaker = CircuitBreaker(failure_threshold=1)
+        with pytest.raises(ValueError):
+            breaker.call(MagicMock(side_effect=ValueError("down")))
+        func = MagicMock()
+        with pytest.raises(CircuitOpenError):
+            breaker.call(func)
+        func.assert_not_called()
+        assert breaker.short_circuited == 1
+
+    def test_half_open_trial_success_closes(self):
+        """A successful trial after reset_timeout closes the breaker."""
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+        with pytest.raises(ValueError):
+            breaker.call(MagicMock(side_effect=ValueError("down")))
+        assert breaker.call(lambda: 'ok') == 'ok'
+        assert breaker.state == CLOSED
+
+    def test_half_open_trial_failure_reopens(self):
+        """A failed trial re-opens the breaker."""
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+        with pytest.raises(ValueError):
+            breaker.call(MagicMock(side_effect=ValueError("down")))
+        with pytest.raises(ValueError):
+            breaker.call(MagicMock(side_effect=ValueError("still down")))
+        assert breaker.state == OPEN
+
+    def test_half_open_allows_single_trial(self):
+        """Only one call goes through while half-open."""
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+        breaker.record_failure()
+        breaker.before_call()
+        assert breaker.state == HALF_OPEN
+        with pytest.raises(CircuitOpenError):
+            breaker.before_call()
+
+    def test_success_resets_failure_count(self):
+        """A success clears earlier failures."""
+        breaker = CircuitBreaker(failure_threshold=2)
+        breaker.record_failure()
+        breaker.record_success()
+        breaker.record_failure()
+        assert breaker.state == CLOSED
+
+class TestRetryWithJitter:
+    """Test jittered retries."""
+
+    def test_retries_until_success(self):
+        """Transient failures are retried."""
+        func = MagicMock(side_effect=[ValueError("x"), 'ok'])
+        with patch('ldap_breaker.time.sleep') as mock_sleep:
+            assert retry_with_jitter(func, attempts=3) == 'ok'
+        assert func.call_count == 2
+        assert mock_sleep.call_count == 1
+
+    def test_gives_up_after_attempts(self):
+        """The last error is raised after all attempts."""
+        func = MagicMock(side_effect=ValueError("x"))
+        with patch('ldap_breaker.time.sleep'):
+            with pytest.raises(ValueError):
+                retry_with_jitter(func, attempts=3)
+        assert func.call_count == 3
+
+    def test_open_circuit_is_not_retried(self):
+        """CircuitOpenError is raised immediately."""
+        func = MagicMock(side_effect=CircuitOpenError("open"))
+        with pytest.raises(CircuitOpenError):
+            retry_with_jitter(func, attempts=3)
+        assert func.call_count == 1
+
+class TestLdapConnectionBreaker:
+    """Test the breaker wired into get_ldap_connection."""
+
+    def test_timeouts_passed_to_ldap3(self, app):
+        """Connect and receive timeouts come from LDAP_CONFIG."""
+        from app import get_ldap_connection, LDAP_CONFIG
+        with patch('app.Server') as mock_server, patch('app.Connection') as mock_conn:
+            get_ldap_connection()
+        assert mock_server.call_args.kwargs['connect_timeout'] == LDAP_CONFIG['connect_timeout']
+        assert mock_conn.call_args.kwargs['receive_timeout'] == LDAP_CONFIG['receive_timeout']
+
+    def test_receive_timeout_is_whole_seconds(self, app):
+        """ldap3 gets an int of at least one second, whatever LDAP_RECEIVE_TIMEOUT holds."""
+        import app as app_module
+        for configured, expected in ((2.5, 3), (0.5, 1), (10.0, 10)):
+            with patch.dict(app_module.LDAP_CONFIG, receive_timeout=configured), \
+                 patch('app.Server'), patch('app.Connection') as mock_conn:
+                app_module.get_ldap_connection()
+            timeout = mock_conn.call_args.kwargs['receive_timeout']
+            assert timeout == expected and isinstance(timeout, int)
+
+    def test_outage_short_circuits(self, app):
+        """Once open, get_ldap_connection stops touching the network."""
+        import app as app_module
+        with patch('app.Server', side_effect=Exception("down")) as mock_server:
+            for _ in range(app_module.ldap_breaker.failure_threshold):
+                assert app_module.get_ldap_connection() is None
+            calls = mock_server.call_count
+            assert app_module.get_ldap_connection() is None
+            assert mock_server.call_count == calls
+        assert app_module.ldap_breaker.state == OPEN
+
+    def test_readonly_connection_retries(self, app):
+        """Read-only callers retry a failed connect."""
+        import app as app_module
+        mock_connection = MagicMock()
+        with patch('app.Server'), \
+             patch('app.Connection', side_effect=[Exception("reset"), mock_connection]), \
+             patch('ldap_breaker.time.sleep'):
+            assert app_module.get_ldap_connection(readonly=True) == mock_connection
+
+    def test_breaker_state_in_test_connection(self, authenticated_admin_client):
+        """/api/test-connection reports the breaker state."""
+        with patch('app.get_ldap_connection', return_value=None):
+            response = authenticated_admin_client.get('/api/test-connection')
+        assert response.get_json()['breaker']['state'] == CLOSED
@@ -0,0 +1,97 @@
+import pytest
+from unittest.mock import patch, MagicMock
+
+from ldap_concurrency import AdaptiveConcurrencyLimiter, LDAPOverloaded
+
+class TestAdaptiveConcurrencyLimiter:
+    """Test the AIMD concurrency limiter."""
+
+    def test_rejects_when_limit_reached(self):
+        """Acquiring past the limit raises LDAPOverloaded."""
+        limiter = AdaptiveConcurrencyLimiter(initial_limit=2)
+        limiter.acquire()
+        limiter.acquire()
+        with pytest.raises(LDAPOverloaded):
+            limiter.acquire()
+        assert limiter.rejected == 1
+
+    def test_fast_operations_grow_limit(self):
+        """Latency under target increases the limit additively."""
+        limiter = AdaptiveConcurrencyLimiter(initial_limit=2, latency_target=0.5)
+        for _ in range(10):
+            limiter.acquire()
+            limiter.release(0.01)
+        assert limiter.limit > 4
+
+    def test_slow_operation_shrinks_limit(self):
+        """Latency over target decreases the limit multiplicatively."""
+        limiter = AdaptiveConcurrencyLimiter(initial_limit=8, latency_target=0.5, backoff=0.5)
+        limiter.acquire()
+        limiter.release(2.0)
+        assert limiter.limit == 4
+
+    def test_decrease_once_per_interval(self):
+        """A burst of slow completions counts as one congestion signal."""
+        limiter = AdaptiveConcurrencyLimiter(initial_limit=8, latency_target=0.5, backoff=0.5)
+        for _ in range(3):
+            limiter.acquire()
+        for _ in range(3):
+            limiter.release(2.0)
+        assert limiter.limit == 4
+
+    def test_limit_never_below_minimum(self):
+        """The limit is clamped at min_limit."""
+        limiter = AdaptiveConcurrencyLimiter(initial_limit=1, min_limit=1, backoff=0.5)
+        limiter.acquire()
+        limiter.release(5.0, success=False)
+        assert limiter.limit == 1
+
+    def test_retry_after_tracks_latency(self):
+        """Retry-After follows the smoothed latency."""
+        limiter = AdaptiveConcurrencyLimiter()
+        limiter.acquire()
+        limiter.release(2.5)
+        assert limiter.retry_after() == 3
+
+    def test_slot_releases_on_exception(self):
+        """The slot is released even when the operation fails."""
+        limiter = AdaptiveConcurrencyLimiter(initial_limit=1)
+        with pytest.raises(RuntimeError):
+            with limiter.slot():
+                raise RuntimeError("boom")
+        assert limiter.in_flight == 0
+
+class TestLdapGuard:
+    """Test load shedding on LDAP-backed routes."""
+
+    def test_saturated_api_returns_503(self, authenticated_admin_client):
+        """A saturated limiter sheds API calls with 503 and Retry-After."""
+        import app as app_module
+        saturated = AdaptiveConcurrencyLimiter(initial_limit=1)
+        saturated.acquire()
+        with patch.object(app_module, 'ldap_concurrency', saturated), \
+             patch('app.get_ldap_connection') as mock_get_conn:
+            response = authenticated_admin_client.get('/api/stats')
+        assert response.status_code == 503
+        assert 'Retry-After' in response.headers
+        mock_get_conn.assert_not_called()
+
+    def test_settings_unaffected_when_saturated(self, authenticated_admin_client):
+        """Pages without LDAP work stay available."""
+        import app as app_module
+        saturated = AdaptiveConcurrencyLimiter(initial_limit=1)
+        saturated.acquire()
+        with patch.object(app_module, 'ldap_concurrency', saturated):
+            response = authenticated_admin_client.get('/settings')
+        assert response.status_code != 503
+
+    def test_slot_released_after_request(self, authenticated_admin_client):
+        """Completed requests give their slot back."""
+        import app as app_module
+        limiter = AdaptiveConcurrencyLimiter(initial_limit=1)
+        with patch.object(app_module, 'ldap_concurrency', limiter), \
+             patch('app.get_ldap_connection', return_value=None):
+            authenticated_admin_client.get('/api/stats')
+            response = authenticated_admin_client.get('/api/stats')
+        assert response.status_code == 200
+        assert limiter.in_flight == 0
@@ -0,0 +1,65 @@
+import pytest
+from unittest.mock import patch, MagicMock
+
+from ldap3 import Server, Connection, MOCK_ASYNC, MOCK_SYNC, SUBTREE, NO_ATTRIBUTES
+from ldap3.core.exceptions import LDAPOperationResult
+from ldap_fanout import search_many
+
+SEARCHES = [
+    dict(search_base='ou=users,dc=tak,dc=local', search_filter='(objectClass=inetOrgPerson)',
+         search_scope=SUBTREE, attributes=['uid']),
+    dict(search_base='ou=groups,dc=tak,dc=local', search_filter='(objectClass=groupOfNames)',
+         search_scope=SUBTREE, attributes=[NO_ATTRIBUTES])
+]
+
+def mock_directory(strategy):
+    """Bound ldap3 mock connection with one user and one group."""
+    conn = Connection(Server('mock'), user='cn=admin,dc=tak,dc=local', password='secret', client_strategy=strategy)
+    conn.strategy.add_entry('cn=admin,dc=tak,dc=local', {'objectClass': 'person', 'userPassword': 'secret'})
+    conn.strategy.add_entry('uid=alpha,ou=users,dc=tak,dc=local', {'objectClass': 'inetOrgPerson', 'uid': 'alpha'})
+    conn.strategy.add_entry('cn=ops,ou=groups,dc=tak,dc=local', {
+        'objectClass': 'groupOfNames', 'cn': 'ops', 'member': 'uid=alpha,ou=users,dc=tak,dc=local'
+    })
+    conn.bind()
+    return conn
+
+class TestSearchMany:
+    """Test running several searches on one connection."""
+
+    @pytest.mark.parametrize('strategy', [MOCK_ASYNC, MOCK_SYNC])
+    def test_results_in_request_order(self, strategy):
+        """Each search gets its own entries, in the order requested."""
+        users, groups = search_many(mock_directory(strategy), SEARCHES)
+        assert [entry['dn'] for entry in users] == ['uid=alpha,ou=users,dc=tak,dc=local']
+        assert users[0]['attributes']['uid'] == ['alpha']
+        assert [entry['dn'] for entry in groups] == ['cn=ops,ou=groups,dc=tak,dc=local']
+
+    def test_async_sends_before_reading(self):
+        """On an ASYNC connection every request is sent before the first reply is read."""
+        conn = MagicMock()
+        conn.strategy.sync = False
+        calls = []
+        conn.search.side_effect = lambda **search: calls.append('send') or len(calls)
+        conn.get_response.side_effect = lambda message_id, timeout: calls.append('read') or ([], {'result': 0})
+        search_many(conn, SEARCHES)
+        assert calls == ['send', 'send', 'read', 'read']
+
+    def test_error_result_raises(self):
+        """A non-success result code is raised rather than returning partial data."""
+        conn = MagicMock()
+        conn.strategy.sync = False
+        conn.get_response.return_value = ([], {'result': 32, 'description': 'noSuchObject'})
+        with pytest.raises(LDAPOperationResult):
+            search_many(conn, SEARCHES)
+
+class TestDirectoryCounts:
+    """Test the dashboard counts use one multiplexed round trip."""
+
+    def test_stats_counts_users_and_groups(self, authenticated_admin_client):
+        """/api/stats counts both trees from an async connection."""
+        with patch('app.get_ldap_connection', return_value=mock_directory(MOCK_ASYNC)) as get_conn:
+            response = authenticated_admin_client.get('/api/stats')
+        assert response.status_code == 200
+        assert response.get_json()['users'] == 1
+        assert response.get_json()['groups'] == 1
+        assert get_conn.call_args.kwargs == {'readonly': True, 'asynchronous': True}
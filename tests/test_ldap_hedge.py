@@ -0,0 +1,141 @@
+import time
+import pytest
+from unittest.mock import patch, MagicMock
+
+from ldap3.core.exceptions import LDAPResponseTimeoutError
+from ldap_breaker import CircuitOpenError
+from ldap_hedge import HedgedSearcher, LatencyWindow
+
+ENTRY = {'type': 'searchResEntry', 'dn': 'uid=alpha,ou=users,dc=tak,dc=local',
+         'attributes': {'uid': ['alpha'], 'givenName': ['Al'], 'sn': ['Pha'], 'mail': ['a@tak.local']}}
+DONE = {'result': 0, 'description': 'success'}
+
+def make_conn(responder):
+    """Mock async connection whose get_response is driven by responder."""
+    conn = MagicMock()
+    conn.search.return_value = 7
+    conn.get_response.side_effect = responder
+    return conn
+
+class TestLatencyWindow:
+    """Test the hedge latency budget."""
+
+    def test_default_budget_until_enough_samples(self):
+        """The default budget is used while the window is warming up."""
+        window = LatencyWindow(min_samples=5, default_budget=0.2)
+        window.add(0.01)
+        assert window.budget() == 0.2
+
+    def test_budget_is_p95(self):
+        """The budget tracks the 95th percentile."""
+        window = LatencyWindow(min_samples=5, min_budget=0.0)
+        for ms in range(1, 101):
+            window.add(ms / 1000)
+        assert window.budget() == pytest.approx(0.096)
+
+    def test_budget_floor(self):
+        """The budget never drops under min_budget."""
+        window = LatencyWindow(min_samples=1, min_budget=0.05)
+        window.add(0.001)
+        assert window.budget() == 0.05
+
+class TestHedgedSearcher:
+    """Test hedged searches across two replicas."""
+
+    def test_fast_primary_does_not_hedge(self):
+        """A primary answering within budget is used alone."""
+        primary = make_conn(lambda msg, timeout: ([ENTRY], DONE))
+        opener = MagicMock(return_value=primary)
+        searcher = HedgedSearcher(opener)
+        entries, server = searcher.search(['ldap://a', 'ldap://b'], 'ou=users', '(uid=*)', 'SUBTREE')
+        assert server == 'ldap://a'
+        assert entries == [ENTRY]
+        assert opener.call_count == 1
+        assert searcher.hedged == 0
+
+    def test_slow_primary_hedges_and_abandons(self):
+        """A slow primary is hedged, the hedge wins and the primary is abandoned."""
+        calls = []
+
+        def slow(msg, timeout):
+            calls.append(timeout)
+            if len(calls) == 1:
+                raise LDAPResponseTimeoutError('no response from server')
+            time.sleep(0.2)
+            return [ENTRY], DONE
+
+        primary = make_conn(slow)
+        secondary = make_conn(lambda msg, timeout: ([ENTRY], DONE))
+        opener = MagicMock(side_effect=[primary, secondary])
+        searcher = HedgedSearcher(opener)
+        entries, server = searcher.search(['ldap://a', 'ldap://b'], 'ou=users', '(uid=*)', 'SUBTREE')
+        assert server == 'ldap://b'
+        assert searcher.hedged == 1
+        assert searcher.hedge_wins == 1
+        primary.abandon.assert_called_once_with(7)
+        secondary.abandon.assert_not_called()
+
+    def test_failed_primary_hedges_immediately(self):
+        """A primary that errors is replaced by the hedge without waiting."""
+        primary = make_conn(MagicMock(side_effect=Exception("connection reset")))
+        secondary = make_conn(lambda msg, timeout: ([ENTRY], DONE))
+        searcher = HedgedSearcher(MagicMock(side_effect=[primary, secondary]))
+        entries, server = searcher.search(['ldap://a', 'ldap://b'], 'ou=users', '(uid=*)', 'SUBTREE')
+        assert server == 'ldap://b'
+
+    def test_hedge_start_failure_keeps_primary(self):
+        """When the hedge cannot be opened the primary's answer is still used."""
+        calls = []
+
+        def slow(msg, timeout):
+            calls.append(timeout)
+            if len(calls) == 1:
+                raise LDAPResponseTimeoutError('no response from server')
+            return [ENTRY], DONE
+
+        primary = make_conn(slow)
+        searcher = HedgedSearcher(MagicMock(side_effect=[primary, CircuitOpenError('circuit open for ldap://b')]))
+        entries, server = searcher.search(['ldap://a', 'ldap://b'], 'ou=users', '(uid=*)', 'SUBTREE')
+        assert (entries, server) == ([ENTRY], 'ldap://a')
+        assert searcher.hedge_failures == 1 and searcher.hedge_wins == 0
+        primary.unbind.assert_called_once()
+        primary.abandon.assert_not_called()
+
+    def test_hedge_start_failure_after_primary_failure(self):
+        """With neither replica usable the error is raised and the primary released."""
+        primary = make_conn(MagicMock(side_effect=Exception("connection reset")))
+        searcher = HedgedSearcher(MagicMock(side_effect=[primary, CircuitOpenError('circuit open for ldap://b')]))
+        with pytest.raises(Exception, match='connection reset'):
+            searcher.search(['ldap://a', 'ldap://b'], 'ou=users', '(uid=*)', 'SUBTREE')
+        primary.discard.assert_called_once()
+
+    def test_non_entries_filtered(self):
+        """Only searchResEntry items are returned."""
+        reference = {'type': 'searchResRef', 'uri': ['ldap://elsewhere']}
+        primary = make_conn(lambda msg, timeout: ([ENTRY, reference], DONE))
+        searcher = HedgedSearcher(MagicMock(return_value=primary))
+        entries, _ = searcher.search(['ldap://a', 'ldap://b'], 'ou=users', '(uid=*)', 'SUBTREE')
+        assert entries == [ENTRY]
+
+class TestHedgedUsersRoute:
+    """Test /api/users with hedging enabled."""
+
+    def test_users_listing_uses_hedger(self, authenticated_admin_client):
+        """With hedging on, /api/users is served from raw hedged results."""
+        import app as app_module
+        from ldap_topology import LDAPTopology
+        topology = LDAPTopology('ldap://provider', ['ldap://a', 'ldap://b'])
+        hedger = MagicMock()
+        group = {'type': 'searchResEntry', 'dn': 'cn=ops,ou=groups,dc=tak,dc=local',
+                 'attributes': {'cn': ['ops'], 'member': [ENTRY['dn'].upper()]}}
+        hedger.search_many.return_value = ([[ENTRY], [group]], 'ldap://a')
+        # No read-your-writes pin in this session
+        with patch.dict(app_module.LDAP_CONFIG, {'hedge_reads': True}), \
+             patch.object(app_module, 'ldap_topology', topology), \
+             patch.object(app_module, 'ldap_hedger', hedger), \
+             patch('app.session', {}):
+            response = authenticated_admin_client.get('/api/users')
+        assert response.status_code == 200
+        assert response.get_json()[0]['username'] == 'alpha'
+        assert response.get_json()[0]['groups'] == ['ops']
+        assert set(hedger.search_many.call_args.args[0]) == {'ldap://a', 'ldap://b'}
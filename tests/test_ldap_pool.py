@@ -0,0 +1,103 @@
+import pytest
+from unittest.mock import patch, MagicMock
+
+from ldap_pool import LDAPConnectionPool, PooledConnection
+
+def new_conn():
+    conn = MagicMock()
+    conn.closed = False
+    conn.strategy._outstanding = {}
+    return conn
+
+class TestLDAPConnectionPool:
+    """Test the per-server connection pool."""
+
+    def test_unbind_returns_connection(self):
+        """unbind() on a pooled connection keeps it open for reuse."""
+        opener = MagicMock(side_effect=lambda url: new_conn())
+        pool = LDAPConnectionPool(opener)
+        first = pool.acquire('ldap://a')
+        raw = first._conn
+        first.unbind()
+        raw.unbind.assert_not_called()
+        second = pool.acquire('ldap://a')
+        assert second._conn is raw
+        assert opener.call_count == 1
+        assert pool.snapshot()['hits'] == 1
+
+    def test_pools_are_per_server(self):
+        """Connections are only reused for the same server."""
+        opener = MagicMock(side_effect=lambda url: new_conn())
+        pool = LDAPConnectionPool(opener)
+        pool.acquire('ldap://a').unbind()
+        pool.acquire('ldap://b')
+        assert opener.call_count == 2
+
+    def test_idle_connections_expire(self):
+        """Connections idle longer than max_idle are closed, not reused."""
+        opener = MagicMock(side_effect=lambda url: new_conn())
+        pool = LDAPConnectionPool(opener, max_idle=10)
+        with patch('ldap_pool.time.monotonic', return_value=100.0):
+            first = pool.acquire('ldap://a')
+            raw = first._conn
+            first.unbind()
+        with patch('ldap_pool.time.monotonic', return_value=200.0):
+            second = pool.acquire('ldap://a')
+        assert second._conn is not raw
+        raw.unbind.assert_called_once()
+
+    def test_closed_connections_are_dropped(self):
+        """A connection closed by the server is not reused."""
+        opener = MagicMock(side_effect=lambda url: new_conn())
+        pool = LDAPConnectionPool(opener)
+        first = pool.acquire('ldap://a')
+        first._conn.closed = True
+        first.unbind()
+        assert pool.snapshot()['idle'] == 0
+
+    def test_overflow_is_closed(self):
+        """Returning more than max_size connections closes the extras."""
+        pool = LDAPConnectionPool(lambda url: new_conn(), max_size=1)
+        first, second = pool.acquire('ldap://a'), pool.acquire('ldap://a')
+        first.unbind()
+        second.unbind()
+        assert pool.snapshot()['idle'] == 1
+        second._conn.unbind.assert_called_once()
+
+    def test_double_unbind_is_harmless(self):
+        """Unbinding twice only releases once."""
+        pool = LDAPConnectionPool(lambda url: new_conn())
+        conn = pool.acquire('ldap://a')
+        conn.unbind()
+        conn.unbind()
+        assert pool.snapshot()['idle'] == 1
+
+    def test_on_release_hook(self):
+        """on_release sees each connection going back to the pool."""
+        hook = MagicMock()
+        pool = LDAPConnectionPool(lambda url: new_conn(), on_release=hook)
+        conn = pool.acquire('ldap://a')
+        conn.unbind()
+        hook.assert_called_once_with(conn._conn)
+
+    def test_proxy_delegates(self):
+        """Attributes are read from the underlying connection."""
+        pool = LDAPConnectionPool(lambda url: new_conn())
+        conn = pool.acquire('ldap://a')
+        conn._conn.entries = ['x']
+        assert conn.entries == ['x']
+
+class TestPooledGetLdapConnection:
+    """Test get_ldap_connection with pooling enabled."""
+
+    def test_connections_reused_across_calls(self, app):
+        """With a pool, the second call reuses the first connection."""
+        import app as app_module
+        pool = LDAPConnectionPool(lambda url: app_module._open_ldap_connection(url))
+        with patch.object(app_module, 'ldap_pool', pool), \
+             patch('app.Server'), patch('app.Connection') as mock_conn:
+            mock_conn.return_value.closed = False
+            mock_conn.return_value.strategy._outstanding = {}
+            app_module.get_ldap_connection().unbind()
+            app_module.get_ldap_connection().unbind()
+        assert mock_conn.call_count == 1
@@ -0,0 +1,213 @@
+import random
+import threading
+import time
+import pytest
+from unittest.mock import patch
+
+from ldap3 import Server, Connection, NONE, SUBTREE
+from ldap3.core.exceptions import LDAPException
+from demo_directory import DemoDirectory, DemoLDAPServer
+from ldap_breaker import CircuitBreaker, OPEN
+from ldap_proxy import BUSY, CONNECT, FaultProfile, LDAPFaultProxy, parse_latency
+from ldap_topology import LDAPTopology
+
+BASE_DN = 'dc=tak,dc=local'
+ADMIN_DN = 'cn=admin,dc=tak,dc=local'
+USERS_BASE = 'ou=users,dc=tak,dc=local'
+
+@pytest.fixture(scope='module')
+def backend():
+    directory = DemoDirectory(BASE_DN, ADMIN_DN, 'secret')
+    directory.populate(users=300, groups=20, seed=3)
+    server = DemoLDAPServer(directory).start()
+    yield server
+    server.stop()
+
+@pytest.fixture
+def make_proxy(backend):
+    proxies = []
+
+    def make(profiles, **options):
+        proxies.append(LDAPFaultProxy(backend.url, profiles, seed=1, **options).start())
+        return proxies[-1]
+
+    yield make
+    for proxy in proxies:
+        proxy.stop()
+
+def bind(url, receive_timeout=5):
+    conn = Connection(Server(url, get_info=NONE, connect_timeout=2), ADMIN_DN, 'secret', receive_timeout=receive_timeout)
+    assert conn.bind()
+    return conn
+
+def timed_search(conn, filter_='(objectClass=inetOrgPerson)', attributes=('uid',)):
+    start = time.monotonic()
+    conn.search(USERS_BASE, filter_, SUBTREE, attributes=list(attributes))
+    return time.monotonic() - start
+
+class TestFaultSpecs:
+    """Test latency and fault spec parsing."""
+
+    def test_latency_distributions(self):
+        """Each distribution samples in seconds around its parameters."""
+        rng = random.Random(0)
+        assert parse_latency('fixed:250')(rng) == 0.25
+        assert all(0.1 <= parse_latency('uniform:100:300')(rng) <= 0.3 for _ in range(100))
+        normal = [parse_latency('normal:200:20')(rng) for _ in range(2000)]
+        assert 0.19 < sum(normal) / len(normal) < 0.21
+        lognormal = sorted(parse_latency('lognormal:100:0.5')(rng) for _ in range(2000))
+        assert 0.09 < lognormal[1000] < 0.11
+        exponential = [parse_latency('exponential:50')(rng) for _ in range(2000)]
+        assert 0.045 < sum(exponential) / len(exponential) < 0.055
+        assert parse_latency('normal:0:100')(rng) >= 0
+
+    def test_invalid_latency(self):
+        """Unknown distributions and wrong parameter counts are rejected."""
+        for spec in ('pareto:1', 'uniform:100', 'fixed'):
+            with pytest.raises(ValueError):
+                parse_latency(spec)
+
+    def test_parse_fault(self):
+        """A command line fault spec becomes an operation and profile."""
+        operation, profile = FaultProfile.parse('search:latency=normal:2000:300,error_rate=0.05,error_code=52')
+        assert operation == 'search'
+        assert profile.error_rate == 0.05 and profile.error_code == 52
+        assert profile.latency(random.Random(0)) > 0
+        with pytest.raises(ValueError):
+            FaultProfile.parse('search:jitter=5')
+
+class TestProxyFaults:
+    """Test faults injected between a client and the stand-in directory."""
+
+    def test_passthrough(self, backend, make_proxy):
+        """Without faults the proxy is transparent."""
+        direct, proxied = bind(backend.url), bind(make_proxy({}).url)
+        direct.search(USERS_BASE, '(objectClass=inetOrgPerson)', SUBTREE, attributes=['uid', 'cn'])
+        proxied.search(USERS_BASE, '(objectClass=inetOrgPerson)', SUBTREE, attributes=['uid', 'cn'])
+        assert len(proxied.response) == len(direct.response) == 300
+        assert proxied.response[0]['attributes'] == direct.response[0]['attributes']
+        direct.unbind()
+        proxied.unbind()
+
+    def test_latency_per_operation(self, make_proxy):
+        """Searches are slowed down, binds on the same proxy are not."""
+        proxy = make_proxy({'search': FaultProfile(latency='fixed:300')})
+        start = time.monotonic()
+        conn = bind(proxy.url)
+        assert time.monotonic() - start < 0.25
+        assert timed_search(conn) >= 0.3
+        conn.unbind()
+
+    def test_injected_error(self, make_proxy):
+        """An injected error comes back as the operation's result code."""
+        proxy = make_proxy({'search': FaultProfile(error_rate=1.0, error_code=BUSY)})
+        conn = bind(proxy.url)
+        assert not conn.search(USERS_BASE, '(uid=*)', attributes=['uid'])
+        assert conn.result['result'] == BUSY
+        assert proxy.snapshot()['search'] == {'error': 1}
+        conn.unbind()
+
+    def test_reset(self, make_proxy):
+        """A reset connection fails the operation instead of hanging."""
+        proxy = make_proxy({'search': FaultProfile(reset_rate=1.0)})
+        conn = bind(proxy.url)
+        start = time.monotonic()
+        with pytest.raises(LDAPException):
+            conn.search(USERS_BASE, '(uid=*)', attributes=['uid'])
+        assert time.monotonic() - start < 1
+
+    def test_hang_bounded_by_receive_timeout(self, make_proxy):
+        """A swallowed request costs the client its receive timeout and no more."""
+        proxy = make_proxy({'search': FaultProfile(hang_rate=1.0)})
+        conn = bind(proxy.url, receive_timeout=1)
+        start = time.monotonic()
+        with pytest.raises(LDAPException):
+            conn.search(USERS_BASE, '(uid=*)', attributes=['uid'])
+        assert 1 <= time.monotonic() - start < 2.5
+
+    def test_connect_reset(self, make_proxy):
+        """Connections can be refused before the first request."""
+        proxy = make_proxy({CONNECT: FaultProfile(reset_rate=1.0)})
+        with pytest.raises(LDAPException):
+            Connection(Server(proxy.url, connect_timeout=1), ADMIN_DN, 'secret', receive_timeout=1, auto_bind=True)
+
+    def test_bandwidth(self, backend, make_proxy):
+        """Responses are paced to the configured bytes per second."""
+        conn = bind(backend.url)
+        conn.search(USERS_BASE, '(objectClass=inetOrgPerson)', SUBTREE, attributes=['cn', 'mail'])
+        size = sum(len(str(item['raw_attributes'])) for item in conn.response)
+        conn.unbind()
+        proxy = make_proxy({'search': FaultProfile(bandwidth=size * 2)})
+        conn = bind(proxy.url)
+        assert timed_search(conn, attributes=('cn', 'mail')) >= 0.3
+        conn.unbind()
+
+class TestAppUnderFaults:
+    """Test how the app behaves with a degraded directory behind it."""
+
+    @pytest.fixture
+    def app_through(self, make_proxy):
+        import app as app_module
+
+        def through(profiles, receive_timeout=2.0, failure_threshold=5):
+            proxy = make_proxy(profiles)
+            topology = LDAPTopology(proxy.url, breaker_factory=lambda: CircuitBreaker(failure_threshold, 60))
+            config = dict(app_module.LDAP_CONFIG, server=proxy.url, admin_dn=ADMIN_DN, admin_password='secret',
+                          receive_timeout=receive_timeout, read_retries=0, hedge_reads=False)
+            patches = [
+                patch.object(app_module, 'LDAP_CONFIG', config),
+                patch.object(app_module, 'LDAP_DEMO_MODE', False),
+                patch.object(app_module, 'ldap_topology', topology),
+                patch.object(app_module, 'ldap_pool', None),
+                patch.object(app_module, 'ldap_async_pool', None),
+                # Every operation here is slow on purpose; keep it out of the slow-query log
+                patch.object(app_module.ldap_tracer, 'slow_threshold', float('inf'))
+            ]
+            for item in patches:
+                item.start()
+                stack.append(item)
+            return proxy, topology
+
+        stack = []
+        yield through
+        for item in reversed(stack):
+            item.stop()
+
+    def test_slow_search_fails_within_timeout(self, authenticated_admin_client, app_through):
+        """A search slower than the receive timeout returns an error, not a hung request."""
+        app_through({'search': FaultProfile(latency='fixed:3000')}, receive_timeout=0.5)
+        start = time.monotonic()
+        response = authenticated_admin_client.get('/api/groups')
+        assert response.status_code == 500
+        assert time.monotonic() - start < 2.5
+
+    def test_breaker_opens_after_failed_binds(self, authenticated_admin_client, app_through):
+        """Once the threshold is reached, requests fail fast without reaching the directory."""
+        proxy, topology = app_through({'bind': FaultProfile(error_rate=1.0, error_code=BUSY)}, failure_threshold=3)
+        for _ in range(3):
+            assert authenticated_admin_client.get('/api/groups').status_code == 500
+        assert topology.breakers[proxy.url].state == OPEN
+        start = time.monotonic()
+        assert authenticated_admin_client.get('/api/groups').status_code == 500
+        assert time.monotonic() - start < 0.2
+        assert proxy.snapshot()['bind'] == {'error': 3}
+
+    def test_workers_stay_available(self, flask_app, authenticated_admin_client, app_through):
+        """A request stuck on a slow directory does not hold up requests that do not need it."""
+        app_through({'search': FaultProfile(latency='fixed:1500')})
+        slow = {}
+
+        def list_groups():
+            start = time.monotonic()
+            slow['status'] = authenticated_admin_client.get('/api/groups').status_code
+            slow['seconds'] = time.monotonic() - start
+
+        thread = threading.Thread(target=list_groups)
+        thread.start()
+        time.sleep(0.3)
+        start = time.monotonic()
+        with patch.dict('os.environ', {'METRICS_PUBLIC': 'true'}):
+            assert flask_app[0].test_client().get('/metrics').status_code == 200
+        assert time.monotonic() - start < 0.5
+        thread.join()
+        assert slow['status'] == 200 and slow['seconds'] >= 1.5
@@ -0,0 +1,106 @@
+import hashlib
+import shutil
+import socket
+import ssl
+import subprocess
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from ldap3.core.exceptions import LDAPSSLConfigurationError
+from ldap_tls import ResumableTls
+
+pytestmark = pytest.mark.skipif(shutil.which('openssl') is None, reason="openssl CLI not available")
+
+@pytest.fixture(scope="module")
+def certificate(tmp_path_factory):
+    """Self-signed certificate for 127.0.0.1."""
+    directory = tmp_path_factory.mktemp('tls')
+    cert, key = directory / 'cert.pem', directory / 'key.pem'
+    subprocess.run([
+        'openssl', 'req', '-x509', '-newkey', 'rsa:2048', '-nodes', '-days', '1',
+        '-subj', '/CN=127.0.0.1', '-addext', 'subjectAltName=IP:127.0.0.1',
+        '-keyout', str(key), '-out', str(cert)
+    ], check=True, capture_output=True)
+    return str(cert), str(key)
+
+@pytest.fixture
+def tls_server(certificate):
+    """TLS 1.2 echo-less server accepting a few handshakes."""
+    cert, key = certificate
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    context.maximum_version = ssl.TLSVersion.TLSv1_2
+    context.load_cert_chain(cert, key)
+    listener = socket.socket()
+    listener.bind(('127.0.0.1', 0))
+    listener.listen(5)
+
+    def serve():
+        for _ in range(3):
+            try:
+                client, _ = listener.accept()
+            except OSError:
+                return
+            try:
+                with context.wrap_socket(client, server_side=True) as tls:
+                    tls.recv(1)
+            except (ssl.SSLError, OSError):
+                pass
+
+    thread = threading.Thread(target=serve, daemon=True)
+    thread.start()
+    yield listener.getsockname()[1]
+    listener.close()
+
+def handshake(tls, port):
+    """Run one client handshake through ResumableTls.wrap_socket."""
+    sock = socket.create_connection(('127.0.0.1', port), timeout=5)
+    connection = SimpleNamespace(server=SimpleNamespace(host='127.0.0.1', port=port), socket=sock)
+    tls.wrap_socket(connection, do_handshake=True)
+    return connection
+
+class TestResumableTls:
+    """Test TLS session reuse and pinning."""
+
+    def test_second_connection_resumes_session(self, tls_server):
+        """The second handshake to the same server resumes the session."""
+        tls = ResumableTls(validate=ssl.CERT_NONE)
+        first = handshake(tls, tls_server)
+        first.socket.close()
+        second = handshake(tls, tls_server)
+        assert second.socket.session_reused
+        second.socket.close()
+        assert tls.snapshot()['handshakes'] == 2
+        assert tls.snapshot()['resumed'] == 1
+
+    def test_context_is_shared(self):
+        """One SSLContext is built and reused."""
+        tls = ResumableTls(validate=ssl.CERT_NONE)
+        assert tls.ssl_context() is tls.ssl_context()
+
+    def test_pinned_ca_validates(self, tls_server, certificate):
+        """A certificate signed by the pinned CA is accepted."""
+        cert, _ = certificate
+        tls = ResumableTls(validate=ssl.CERT_REQUIRED, ca_certs_file=cert)
+        handshake(tls, tls_server).socket.close()
+
+    def test_unknown_ca_rejected(self, tls_server, certificate):
+        """Without the CA configured the self-signed server is rejected."""
+        tls = ResumableTls(validate=ssl.CERT_REQUIRED, ca_certs_data='')
+        with pytest.raises(ssl.SSLError):
+            handshake(tls, tls_server)
+
+    def test_fingerprint_pin_match(self, tls_server, certificate):
+        """A matching certificate fingerprint passes."""
+        cert, _ = certificate
+        with open(cert) as f:
+            der = ssl.PEM_cert_to_DER_cert(f.read())
+        tls = ResumableTls(validate=ssl.CERT_NONE, pin_sha256=hashlib.sha256(der).hexdigest())
+        handshake(tls, tls_server).socket.close()
+
+    def test_fingerprint_pin_mismatch(self, tls_server):
+        """A different fingerprint fails the connection."""
+        tls = ResumableTls(validate=ssl.CERT_NONE, pin_sha256='00' * 32)
+        with pytest.raises(LDAPSSLConfigurationError):
+            handshake(tls, tls_server)
@@ -0,0 +1,130 @@
+import pytest
+from unittest.mock import patch, MagicMock
+
+from ldap_topology import LDAPTopology
+
+PROVIDER = 'ldap://provider:389'
+REPLICAS = ['ldap://consumer1:389', 'ldap://consumer2:389']
+
+@pytest.fixture(autouse=True)
+def real_session():
+    """Some tests reload app while flask.session is patched; use the real proxy."""
+    import flask
+    with patch('app.session', flask.session):
+        yield
+
+class TestLDAPTopology:
+    """Test read/write server selection."""
+
+    def test_writes_go_to_provider(self):
+        """write_server is always the provider."""
+        topology = LDAPTopology(PROVIDER, REPLICAS)
+        assert topology.write_server() == PROVIDER
+
+    def test_reads_go_to_replicas(self):
+        """Reads are served by replicas when any are configured."""
+        topology = LDAPTopology(PROVIDER, REPLICAS)
+        assert {topology.read_server() for _ in range(50)} <= set(REPLICAS)
+
+    def test_reads_without_replicas_use_provider(self):
+        """A single-server setup reads from the provider."""
+        topology = LDAPTopology(PROVIDER)
+        assert topology.read_server() == PROVIDER
+
+    def test_reads_prefer_lower_latency(self):
+        """The faster of two replicas wins."""
+        topology = LDAPTopology(PROVIDER, REPLICAS)
+        topology.record_latency(REPLICAS[0], 0.5)
+        topology.record_latency(REPLICAS[1], 0.01)
+        assert {topology.read_server() for _ in range(20)} == {REPLICAS[1]}
+
+    def test_old_samples_decay(self):
+        """A replica that lost every comparison is tried again once its slow sample has aged."""
+        with patch('ldap_topology.time.monotonic', return_value=100.0):
+            topology = LDAPTopology(PROVIDER, REPLICAS, half_life=1.0)
+            topology.record_latency(REPLICAS[0], 0.5)
+            topology.record_latency(REPLICAS[1], 0.1)
+        with patch('ldap_topology.time.monotonic', return_value=104.0):
+            topology.record_latency(REPLICAS[1], 0.1)
+            assert {topology.read_server() for _ in range(20)} == {REPLICAS[0]}
+
+    def test_open_breaker_skips_replica(self):
+        """Replicas with an open breaker are not picked."""
+        topology = LDAPTopology(PROVIDER, REPLICAS)
+        for _ in range(topology.breakers[REPLICAS[0]].failure_threshold):
+            topology.breakers[REPLICAS[0]].record_failure()
+        assert {topology.read_server() for _ in range(20)} == {REPLICAS[1]}
+
+    def test_all_replicas_excluded_falls_back_to_provider(self):
+        """With every replica excluded, reads go to the provider."""
+        topology = LDAPTopology(PROVIDER, REPLICAS)
+        assert topology.read_server(exclude=REPLICAS) == PROVIDER
+
+    def test_snapshot_lists_roles(self):
+        """snapshot reports each server with its role."""
+        topology = LDAPTopology(PROVIDER, REPLICAS)
+        roles = {item['server']: item['role'] for item in topology.snapshot()}
+        assert roles[PROVIDER] == 'provider'
+        assert roles[REPLICAS[0]] == 'replica'
+
+class TestConnectionRouting:
+    """Test get_ldap_connection routing through the topology."""
+
+    def test_searches_update_latency(self):
+        """Searches on a reused connection keep its server's latency current."""
+        import app as app_module
+        from ldap_trace import Span
+        topology = LDAPTopology(PROVIDER, REPLICAS)
+        span = Span('search', {'server': REPLICAS[0]})
+        span.duration = 0.25
+        with patch.object(app_module, 'ldap_topology', topology):
+            app_module.observe_replica_latency(span)
+        assert topology.latency[REPLICAS[0]] == 0.25
+
+    def test_readonly_connection_uses_replica(self, app):
+        """Read-only connections are opened against a replica."""
+        import app as app_module
+        with patch.object(app_module, 'ldap_topology', LDAPTopology(PROVIDER, REPLICAS)), \
+             patch('app.Server') as mock_server, patch('app.Connection'):
+            app_module.get_ldap_connection(readonly=True)
+        assert mock_server.call_args.args[0] in REPLICAS
+
+    def test_write_connection_uses_provider(self, app):
+        """Connections for writes are opened against the provider."""
+        import app as app_module
+        with patch.object(app_module, 'ldap_topology', LDAPTopology(PROVIDER, REPLICAS)), \
+             patch('app.Server') as mock_server, patch('app.Connection'):
+            app_module.get_ldap_connection()
+        assert mock_server.call_args.args[0] == PROVIDER
+
+    def test_read_your_writes_pins_provider(self, app):
+        """After a write the session reads from the provider."""
+        import app as app_module
+        with app.test_request_context('/api/users'):
+            app_module.mark_ldap_write()
+            with patch.object(app_module, 'ldap_topology', LDAPTopology(PROVIDER, REPLICAS)), \
+                 patch('app.Server') as mock_server, patch('app.Connection'):
+                app_module.get_ldap_connection(readonly=True)
+        assert mock_server.call_args.args[0] == PROVIDER
+
+    def test_failed_replica_retries_elsewhere(self, app):
+        """A read retry does not go back to the replica that just failed."""
+        import app as app_module
+        topology = LDAPTopology(PROVIDER, REPLICAS[:1])
+        with patch.object(app_module, 'ldap_topology', topology), \
+             patch('app.Server') as mock_server, \
+             patch('app.Connection', side_effect=[Exception("down"), MagicMock()]), \
+             patch('ldap_breaker.time.sleep'):
+            assert app_module.get_ldap_connection(readonly=True) is not None
+        assert [c.args[0] for c in mock_server.call_args_list] == [REPLICAS[0], PROVIDER]
+
+    def test_add_user_marks_session(self, authenticated_admin_client, valid_user_data):
+        """A successful add pins the operator's reads to the provider."""
+        mock_conn = MagicMock()
+        mock_conn.search.return_value = False
+        mock_conn.add.return_value = True
+        with patch('app.get_ldap_connection', return_value=mock_conn):
+            response = authenticated_admin_client.post('/api/users', json=valid_user_data)
+        assert response.status_code == 200
+        with authenticated_admin_client.session_transaction() as sess:
+            assert 'ldap_ryw_until' in sess
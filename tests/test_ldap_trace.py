@@ -0,0 +1,124 @@
+import pytest
+from unittest.mock import patch, MagicMock
+
+from ldap3 import Server, Connection, MOCK_ASYNC, MOCK_SYNC, SUBTREE
+from ldap3.core.exceptions import LDAPBindError
+from ldap_trace import LDAPTracer, parse_traceparent
+
+def mock_directory(strategy):
+    """Bound ldap3 mock connection with two users."""
+    conn = Connection(Server('mock'), user='cn=admin,dc=tak,dc=local', password='secret', client_strategy=strategy)
+    conn.strategy.add_entry('cn=admin,dc=tak,dc=local', {'objectClass': 'person', 'userPassword': 'secret'})
+    for uid in ('alpha', 'bravo'):
+        conn.strategy.add_entry(f'uid={uid},ou=users,dc=tak,dc=local', {'objectClass': 'inetOrgPerson', 'uid': uid})
+    conn.bind()
+    return conn
+
+class TestLDAPTracer:
+    """Test LDAP operation spans."""
+
+    @pytest.mark.parametrize('strategy', [MOCK_SYNC, MOCK_ASYNC])
+    def test_search_span(self, strategy):
+        """A search records base, filter, scope, attributes, entry count, bytes and result."""
+        spans = []
+        tracer = LDAPTracer(slow_threshold=60, listeners=[spans.append])
+        conn = tracer.instrument(mock_directory(strategy))
+        message_id = conn.search('ou=users,dc=tak,dc=local', '(uid=*)', SUBTREE, attributes=['uid'])
+        if strategy == MOCK_ASYNC:
+            assert spans == []
+            conn.get_response(message_id)
+        span, = spans
+        assert span.name == 'search'
+        assert span.result == 'success'
+        assert span.attributes['base'] == 'ou=users,dc=tak,dc=local'
+        assert span.attributes['filter'] == '(uid=*)'
+        assert span.attributes['scope'] == 'SUBTREE'
+        assert span.attributes['attributes'] == 'uid'
+        assert span.attributes['entries'] == 2
+        assert span.attributes['bytes'] > 0
+        assert span.duration > 0
+
+    def test_write_spans_record_only_the_dn(self):
+        """Values sent to the server, such as passwords, are not recorded."""
+        spans = []
+        tracer = LDAPTracer(listeners=[spans.append])
+        conn = tracer.instrument(mock_directory(MOCK_SYNC))
+        conn.add('uid=charlie,ou=users,dc=tak,dc=local', 'inetOrgPerson', {'userPassword': 'hunter2'})
+        assert spans[0].name == 'add'
+        assert spans[0].attributes == {'dn': 'uid=charlie,ou=users,dc=tak,dc=local'}
+
+    @pytest.mark.parametrize('strategy', [MOCK_SYNC, MOCK_ASYNC])
+    def test_connection_attributes_on_every_span(self, strategy):
+        """Attributes given to instrument() are added to each operation's span."""
+        spans = []
+        tracer = LDAPTracer(listeners=[spans.append])
+        conn = tracer.instrument(mock_directory(strategy), server='ldap://consumer1:389')
+        message_id = conn.search('ou=users,dc=tak,dc=local', '(uid=*)', SUBTREE)
+        if strategy == MOCK_ASYNC:
+            conn.get_response(message_id)
+        assert spans[0].attributes['server'] == 'ldap://consumer1:389'
+
+    def test_instrument_is_idempotent_and_skips_mocks(self):
+        """Pooled connections are wrapped once; test doubles are left alone."""
+        tracer = LDAPTracer()
+        conn = tracer.instrument(mock_directory(MOCK_SYNC))
+        search = conn.search
+        assert tracer.instrument(conn).search is search
+        double = MagicMock()
+        assert tracer.instrument(double) is double
+
+    def test_slow_operations_are_logged(self):
+        """Spans at or above the threshold go to the slow-query log."""
+        tracer = LDAPTracer(slow_threshold=0)
+        conn = tracer.instrument(mock_directory(MOCK_SYNC))
+        with patch('ldap_trace.slow_logger') as slow_logger:
+            conn.search('ou=users,dc=tak,dc=local', '(uid=alpha)')
+        line = slow_logger.warning.call_args.args[0]
+        assert 'search success' in line
+        assert '(uid=alpha)' in line
+
+    def test_export_is_otlp_json(self):
+        """Exported documents nest LDAP spans under the request span of the caller's trace."""
+        exporter = MagicMock()
+        tracer = LDAPTracer(exporter=exporter)
+        with tracer.span('bind', dn='cn=admin') as span:
+            pass
+        tracer.export('GET /api/users', span.start, span.start + 1, [span],
+                      traceparent='00-0af7651916cd43dd8448eb211c80319c-b7ad6b7169203331-01')
+        document = exporter.emit.call_args.args[0]
+        root, child = document['resourceSpans'][0]['scopeSpans'][0]['spans']
+        assert root['traceId'] == child['traceId'] == '0af7651916cd43dd8448eb211c80319c'
+        assert root['parentSpanId'] == 'b7ad6b7169203331'
+        assert child['parentSpanId'] == root['spanId']
+        assert child['name'] == 'ldap.bind'
+        assert {'key': 'dn', 'value': {'stringValue': 'cn=admin'}} in child['attributes']
+
+    def test_parse_traceparent(self):
+        """A missing or malformed traceparent starts a new trace."""
+        trace_id, parent = parse_traceparent('garbage')
+        assert len(trace_id) == 32 and parent is None
+
+class TestRequestTracing:
+    """Test tracing wired into the app."""
+
+    def test_request_spans_in_server_timing_and_export(self, authenticated_admin_client):
+        """A listing request reports its LDAP time and exports its spans."""
+        import app as app_module
+        exporter = MagicMock()
+        conn = app_module.ldap_tracer.instrument(mock_directory(MOCK_SYNC))
+        with patch.object(app_module.ldap_tracer, 'exporter', exporter), \
+             patch('app.get_ldap_connection', return_value=conn):
+            response = authenticated_admin_client.get('/api/groups')
+        assert response.status_code == 200
+        assert response.headers['Server-Timing'].startswith('ldap;dur=')
+        spans = exporter.emit.call_args.args[0]['resourceSpans'][0]['scopeSpans'][0]['spans']
+        assert [span['name'] for span in spans] == ['GET /api/groups', 'ldap.search', 'ldap.materialize']
+
+    def test_failed_bind_raises(self):
+        """A rejected bind is an error, not a silently anonymous connection."""
+        import app as app_module
+        conn = MagicMock(bound=False, last_error='invalidCredentials')
+        with patch('app.Connection', return_value=conn), patch('app.Server'):
+            with pytest.raises(LDAPBindError):
+                app_module._open_ldap_connection('ldap://localhost:389')
+        conn.unbind.assert_called_once()
@@ -0,0 +1,38 @@
+import os
+import pytest
+from unittest.mock import patch
+
+from flask import Flask
+from flask_limiter import Limiter
+
+class TestLimiterStorage:
+    """Test the shared rate limit storage configuration."""
+
+    def test_storage_uri_override(self, flask_app):
+        """RATELIMIT_STORAGE_URI selects the storage without contacting Redis."""
+        import app as app_module
+        assert app_module.RATELIMIT_STORAGE_URI == os.environ['RATELIMIT_STORAGE_URI']
+
+    def test_limited_after_n_hits(self, flask_app, client_with_rate_limits):
+        """The sixth login page request in a minute is rejected."""
+        app_instance, limiter_instance = flask_app
+        limiter_instance.reset()
+        try:
+            statuses = [client_with_rate_limits.get('/login').status_code for _ in range(6)]
+        finally:
+            limiter_instance.reset()
+        assert statuses == [200] * 5 + [429]
+
+    def test_served_while_redis_unreachable(self):
+        """With Redis down, requests are served and still limited per process."""
+        import app as app_module
+        unreachable = Flask('unreachable')
+        limiter_instance = Limiter(app=unreachable, storage_uri='redis://127.0.0.1:1/0', **app_module.RATELIMIT_OPTIONS)
+
+        @unreachable.route('/limited')
+        @limiter_instance.limit('3 per minute')
+        def limited():
+            return 'ok'
+
+        client = unreachable.test_client()
+        assert [client.get('/limited').status_code for _ in range(4)] == [200, 200, 200, 429]
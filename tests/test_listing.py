@@ -0,0 +1,58 @@
+import pytest
+from unittest.mock import patch
+
+from ldap3 import SUBTREE
+from demo_directory import DemoDirectory
+
+BASE_DN = 'dc=tak,dc=local'
+ADMIN_DN = 'cn=admin,dc=tak,dc=local'
+
+@pytest.fixture(scope='module')
+def directory():
+    directory = DemoDirectory(BASE_DN, ADMIN_DN, 'secret')
+    directory.populate(users=200, groups=10, seed=4)
+    return directory
+
+class RawOnly:
+    """Connection wrapper that fails the test if conn.entries is used."""
+
+    def __init__(self, conn):
+        self._conn = conn
+
+    def __getattr__(self, name):
+        if name == 'entries':
+            raise AssertionError('conn.entries used')
+        return getattr(self._conn, name)
+
+class TestListingRecords:
+    """Test building listing records from raw search responses."""
+
+    def test_records_match_entry_objects(self, directory):
+        """Raw records carry the same values ldap3 Entry objects would."""
+        import app as app_module
+        conn = directory.connect()
+        conn.search(f'ou=users,{BASE_DN}', '(objectClass=inetOrgPerson)', SUBTREE,
+                    attributes=app_module.USER_LISTING_ATTRIBUTES)
+        users = app_module.user_records(conn.response, {})
+        expected = {str(entry.uid): (str(entry.givenName), str(entry.sn), str(entry.mail)) for entry in conn.entries}
+        assert len(users) == 200
+        assert all(expected[user['username']] == (user['first_name'], user['last_name'], user['email'])
+                   for user in users)
+
+    def test_missing_attributes_are_empty(self):
+        """Attributes an entry lacks come back as empty strings and counts."""
+        import app as app_module
+        entry = {'dn': 'cn=empty,ou=groups,dc=tak,dc=local', 'attributes': {'cn': ['empty'], 'member': []}}
+        assert app_module.group_records([entry]) == [{'name': 'empty', 'description': '', 'member_count': 0}]
+
+    def test_groups_route_reads_raw_response(self, authenticated_admin_client, directory):
+        """/api/groups never builds Entry objects."""
+        import app as app_module
+        conn = RawOnly(directory.connect())
+        with patch.dict(app_module.LDAP_CONFIG, hedge_reads=False), \
+             patch.object(app_module, 'get_ldap_connection', return_value=conn):
+            response = authenticated_admin_client.get('/api/groups')
+        assert response.status_code == 200
+        groups = response.get_json()
+        assert len(groups) == 10
+        assert all(group['name'] and group['member_count'] for group in groups)
@@ -0,0 +1,84 @@
+import os
+import pytest
+from types import SimpleNamespace
+from unittest.mock import patch, MagicMock
+
+import metrics
+from metrics import observe_ldap_span, record_snapshot
+
+def sample(name, **labels):
+    """Current value of a sample in the default registry, 0 when absent."""
+    return metrics.REGISTRY.get_sample_value(name, labels) or 0
+
+class TestRecordSnapshot:
+    """Test exporting component snapshots."""
+
+    def test_numeric_fields_and_breaker_states(self):
+        """Numbers are exported as-is, breaker states as 0/1/2, other strings skipped."""
+        record_snapshot('test_component', {'in_use': 3, 'state': 'open', 'server': 'ldap://x'})
+        assert sample('ldap_admin_component_state', component='test_component', field='in_use') == 3
+        assert sample('ldap_admin_component_state', component='test_component', field='state') == 2
+        assert sample('ldap_admin_component_state', component='test_component', field='server') == 0
+
+class TestObserveLdapSpan:
+    """Test the LDAP tracer listener."""
+
+    def test_span_lands_in_histogram(self):
+        """Each finished span is observed under its operation and LDAP result."""
+        labels = {'operation': 'search', 'result': 'noSuchObject'}
+        before = sample('ldap_admin_ldap_operation_duration_seconds_count', **labels)
+        observe_ldap_span(SimpleNamespace(name='search', result='noSuchObject', duration=0.01))
+        assert sample('ldap_admin_ldap_operation_duration_seconds_count', **labels) == before + 1
+
+class TestMetricsEndpoint:
+    """Test GET /metrics."""
+
+    def test_exposes_request_and_component_metrics(self, client):
+        """Requests are timed per endpoint and component state is included."""
+        client.get('/login')
+        with patch.dict('os.environ', {'METRICS_PUBLIC': 'true'}):
+            response = client.get('/metrics')
+        body = response.get_data(as_text=True)
+        assert response.status_code == 200
+        assert response.content_type.startswith('text/plain')
+        assert 'ldap_admin_request_duration_seconds_count{endpoint="login",method="GET",status="200"}' in body
+        assert 'ldap_admin_component_state{component="ldap_concurrency",field="in_flight"}' in body
+
+    def test_disabled_without_token_or_opt_in(self, client):
+        """With neither METRICS_TOKEN nor METRICS_PUBLIC, scrapes are refused."""
+        with patch.dict('os.environ'):
+            os.environ.pop('METRICS_TOKEN', None)
+            os.environ.pop('METRICS_PUBLIC', None)
+            assert client.get('/metrics').status_code == 403
+
+    def test_token_required_when_configured(self, client):
+        """With METRICS_TOKEN set, scrapes need the bearer token."""
+        with patch.dict('os.environ', {'METRICS_TOKEN': 's3cret'}):
+            assert client.get('/metrics').status_code == 401
+            response = client.get('/metrics', headers={'Authorization': 'Bearer s3cret'})
+        assert response.status_code == 200
+
+    def test_rejections_are_counted(self, app, client):
+        """Requests shed by the LDAP concurrency limiter are counted per endpoint."""
+        import app as app_module
+        from ldap_concurrency import LDAPOverloaded
+        labels = {'limiter': 'ldap_concurrency', 'endpoint': 'api_get_stats'}
+        before = sample('ldap_admin_rejected_requests_total', **labels)
+        with client.session_transaction() as sess:
+            sess['_user_id'] = 'admin'
+            sess['_fresh'] = True
+        with patch.object(app_module.ldap_concurrency, 'slot', side_effect=LDAPOverloaded(1)):
+            assert client.get('/api/stats').status_code == 503
+        assert sample('ldap_admin_rejected_requests_total', **labels) == before + 1
+
+class TestTakCommands:
+    """Test TAK subprocess timing."""
+
+    def test_command_name_skips_sudo(self):
+        """sudo and its -u option are not the command being timed."""
+        from tak_server import run_command
+        labels = {'command': 'makeCert.sh', 'outcome': 'ok'}
+        before = sample('ldap_admin_tak_command_duration_seconds_count', **labels)
+        with patch('subprocess.run', return_value=MagicMock(returncode=0)):
+            run_command(['sudo', '-u', 'tak', '/opt/tak/certs/makeCert.sh', 'client', 'alice'])
+        assert sample('ldap_admin_tak_command_duration_seconds_count', **labels) == before + 1
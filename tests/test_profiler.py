@@ -0,0 +1,99 @@
+import time
+import pytest
+from collections import Counter
+from unittest.mock import patch
+
+from profiler import RequestProfile, RollingSampler, render_collapsed, render_html
+
+def busy(seconds):
+    """Spin on the CPU so samplers have something to see."""
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+class TestRequestProfile:
+    """Test profiling a single request."""
+
+    def test_sampling_collects_folded_stacks(self):
+        """Sampled stacks name the busy function, outermost frame first."""
+        profile = RequestProfile('1')
+        profile.start()
+        busy(0.05)
+        profile.stop()
+        body, mimetype = profile.render('collapsed', 'test')
+        assert mimetype == 'text/plain'
+        stack, count = body.splitlines()[0].rsplit(' ', 1)
+        assert 'busy (tests/test_profiler.py' in stack.split(';')[-1]
+        assert int(count) > 0
+
+    def test_cprofile_report(self):
+        """The deterministic mode reports every call with pstats."""
+        profile = RequestProfile('cprofile')
+        profile.start()
+        busy(0.01)
+        profile.stop()
+        body, mimetype = profile.render('text', 'test')
+        assert mimetype == 'text/plain'
+        assert 'busy' in body
+
+class TestRendering:
+    """Test report formats."""
+
+    def test_collapsed_format(self):
+        """One 'frame;frame count' line per stack, hottest first."""
+        stacks = Counter({'a;b': 1, 'a;c': 3})
+        assert render_collapsed(stacks) == 'a;c 3\na;b 1\n'
+
+    def test_html_escapes_frames(self):
+        """Frame names such as <module> are escaped."""
+        page = render_html(Counter({'<module> (x.py:1);run (x.py:2)': 2}), 'report')
+        assert '&lt;module&gt;' in page
+        assert '<module>' not in page
+
+class TestRollingSampler:
+    """Test the always-on sampler."""
+
+    def test_samples_only_listed_threads(self):
+        """Busy request threads are sampled; nothing is recorded when idle."""
+        import threading
+        threads = []
+        sampler = RollingSampler(lambda: threads, interval=0.001)
+        sampler.ensure_started()
+        time.sleep(0.02)
+        assert sampler.snapshot()['samples'] == 0
+        threads.append(threading.get_ident())
+        busy(0.05)
+        threads.clear()
+        assert any('busy' in stack for stack in sampler.top())
+        assert len(sampler.top(limit=1)) == 1
+
+class TestProfileRoutes:
+    """Test the profiler wiring."""
+
+    def test_super_admin_gets_profile(self, authenticated_admin_client):
+        """?__profile=1 returns folded stacks in place of the page."""
+        response = authenticated_admin_client.get('/users?__profile=1')
+        assert response.mimetype == 'text/plain'
+        assert response.headers['X-Profile-Status'] == '200'
+        assert response.headers['Content-Disposition'].endswith('.folded"')
+
+    def test_html_report_via_header(self, authenticated_admin_client):
+        """The X-Profile headers select mode and format."""
+        response = authenticated_admin_client.get('/users', headers={'X-Profile': 'cprofile', 'X-Profile-Format': 'html'})
+        assert response.mimetype == 'text/html'
+        assert b'cprofile' in response.data
+
+    def test_ignored_for_other_roles(self, client):
+        """Non-super_admins get the normal response."""
+        with client.session_transaction() as sess:
+            sess['_user_id'] = 'viewer'
+            sess['_fresh'] = True
+        response = client.get('/login?__profile=1')
+        assert 'X-Profile-Status' not in response.headers
+
+    def test_rolling_stacks_json(self, authenticated_admin_client):
+        """/api/profile/stacks dumps the sampler's top stacks."""
+        import app as app_module
+        with patch.object(app_module.rolling_sampler, 'top', return_value=Counter({'a;b': 4})):
+            data = authenticated_admin_client.get('/api/profile/stacks?format=json').get_json()
+        assert data['stacks'] == [{'stack': ['a', 'b'], 'samples': 4}]
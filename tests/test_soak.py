@@ -0,0 +1,122 @@
+import os
+import random
+import socket
+import sys
+import pytest
+from unittest.mock import patch, MagicMock
+
+from resource_usage import ResourceMonitor, open_fds, tcp_sockets
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks'))
+import soak
+
+NEW_USER = {'username': 'soakuser', 'first_name': 'Soak', 'last_name': 'User',
+            'email': 'soak@example.com', 'password': 'Secret123!'}
+
+class TestResourceMonitor:
+    """Test the per-worker resource counts."""
+
+    @pytest.mark.skipif(not os.path.isdir('/proc/self/fd'), reason='needs /proc')
+    def test_counts_descriptors_and_sockets(self):
+        """An open socket pair shows up as descriptors and an established TCP socket."""
+        listener = socket.create_server(('127.0.0.1', 0))
+        port = str(listener.getsockname()[1])
+        before = open_fds()['socket']
+        client = socket.create_connection(listener.getsockname())
+        server, _ = listener.accept()
+        try:
+            assert open_fds()['socket'] == before + 2
+            assert tcp_sockets()[port] == {'established': 1}
+            snapshot = ResourceMonitor().snapshot()
+            assert snapshot['pid'] == os.getpid()
+            assert snapshot['rss_mb'] > 0 and snapshot['threads'] >= 1
+        finally:
+            for sock in (client, server, listener):
+                sock.close()
+
+    def test_route_requires_super_admin(self, client):
+        """Other roles are refused."""
+        with client.session_transaction() as sess:
+            sess['_user_id'] = 'viewer'
+            sess['_fresh'] = True
+        assert client.get('/api/profile/resources').status_code in (302, 403)
+
+    def test_route_reports_worker(self, authenticated_admin_client):
+        """/api/profile/resources returns this worker's counts."""
+        data = authenticated_admin_client.get('/api/profile/resources?collect=1').get_json()
+        assert data['pid'] == os.getpid()
+        assert 'fds' in data and 'gc_objects' in data
+
+class TestGrowthDetection:
+    """Test telling steady growth from noise."""
+
+    def test_mann_kendall(self):
+        """A rising series is significant, a flat one is not."""
+        assert soak.mann_kendall(list(range(20))) < 0.001
+        assert soak.mann_kendall([5] * 20) == 1.0
+        assert soak.mann_kendall(list(range(20, 0, -1))) == 1.0
+
+    def test_flags_steady_growth(self):
+        """A slow but steady leak is reported with its rate."""
+        rng = random.Random(1)
+        points = [{'t': t * 60, 'fds': 20 + t // 2, 'rss_mb': 80 + rng.uniform(-1, 1)} for t in range(30)]
+        findings = soak.find_growth({'worker 1': points})
+        assert [finding['metric'] for finding in findings] == ['fds']
+        assert findings[0]['growth'] >= soak.MIN_GROWTH['fds']
+
+    def test_ignores_noise_and_warmup(self):
+        """Noise is not growth, and neither is filling caches during warmup."""
+        rng = random.Random(2)
+        points = [{'t': t * 60, 'rss_mb': (60 + t * 5 if t < 5 else 85) + rng.uniform(-2, 2)} for t in range(30)]
+        assert soak.find_growth({'worker 1': points}, warmup=300) == []
+
+    def test_small_growth_is_below_floor(self):
+        """A significant trend smaller than the metric's floor is not reported."""
+        points = [{'t': t * 60, 'rss_mb': 80 + t * 0.01} for t in range(30)]
+        assert soak.find_growth({'worker 1': points}) == []
+
+class TestConnectionRelease:
+    """Test that every way out of a view releases its LDAP connection."""
+
+    @pytest.fixture
+    def ldap(self):
+        import app as app_module
+        conn = MagicMock()
+        with patch.dict(app_module.LDAP_CONFIG, hedge_reads=False), \
+             patch.object(app_module, 'get_ldap_connection', return_value=conn):
+            yield conn
+
+    def test_existing_user_unbinds_once(self, authenticated_admin_client, ldap):
+        """Adding a user that exists returns 409 and releases the connection."""
+        ldap.search.return_value = True
+        response = authenticated_admin_client.post('/api/users', json=NEW_USER)
+        assert response.status_code == 409
+        ldap.unbind.assert_called_once()
+
+    def test_no_connection(self, authenticated_admin_client):
+        """Without a connection the view answers 500 instead of failing on release."""
+        import app as app_module
+        with patch.object(app_module, 'get_ldap_connection', return_value=None):
+            response = authenticated_admin_client.post('/api/users', json=NEW_USER)
+        assert response.get_json() == {'error': 'LDAP connection failed'}
+
+    @pytest.mark.parametrize('path', ['/api/users', '/api/groups'])
+    def test_listing_error_unbinds(self, authenticated_admin_client, ldap, path):
+        """A listing that fails half way still releases its connection."""
+        ldap.search.side_effect = RuntimeError('connection reset')
+        ldap.strategy.sync = True
+        assert authenticated_admin_client.get(path).status_code == 500
+        ldap.unbind.assert_called_once()
+
+    def test_pooled_connection_discarded_on_error(self):
+        """A pooled connection the block failed on is closed, not returned to the pool."""
+        import app as app_module
+        from ldap_pool import PooledConnection
+        conn = MagicMock(spec=PooledConnection)
+        with patch.object(app_module, 'get_ldap_connection', return_value=conn):
+            with pytest.raises(RuntimeError):
+                with app_module.ldap_connection() as pooled:
+                    raise RuntimeError('timeout')
+        assert pooled is conn
+        conn.discard.assert_called_once()
+        conn.unbind.assert_not_called()
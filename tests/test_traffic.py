@@ -0,0 +1,123 @@
+import json
+import pytest
+from unittest.mock import patch, MagicMock
+
+from traffic import REDACTED, TrafficRecorder, pseudonym, sanitize
+from benchmarks import replay
+
+SALT = b'test-salt'
+
+class TestSanitize:
+    """Test trace sanitization."""
+
+    def test_credentials_are_redacted(self):
+        """Passwords, tokens and keys are replaced, enumerations are kept."""
+        assert sanitize({'username': 'alice', 'password': 'hunter22', 'api_key': 'k', 'group': ['ops']}, SALT) == {
+            'username': pseudonym('alice', SALT), 'password': REDACTED, 'api_key': REDACTED,
+            'group': [pseudonym('ops', SALT)]
+        }
+
+    def test_nested_json_and_csrf(self):
+        """Nested values are sanitized and CSRF tokens dropped."""
+        assert sanitize({'csrf_token': 'x', 'user': {'newPassword': 'p', 'groups': [{'token': 't'}]}}, SALT) == {
+            'user': {'newPassword': REDACTED, 'groups': [{'token': REDACTED}]}
+        }
+
+    def test_pseudonyms_are_stable_per_salt(self):
+        """One value maps to one pseudonym per salt; emails stay emails."""
+        assert pseudonym('Alice', SALT) == pseudonym('alice', SALT) != pseudonym('alice', b'other')
+        assert pseudonym('alice@tak.local', SALT).endswith('@example.com')
+        assert 'alice' not in pseudonym('alice@tak.local', SALT)
+
+class TestRecording:
+    """Test the recording middleware."""
+
+    @pytest.fixture
+    def recorder(self):
+        import app as app_module
+        recorder = TrafficRecorder(MagicMock(), salt=SALT)
+        with patch.object(app_module, 'traffic_recorder', recorder):
+            yield recorder
+
+    def test_records_route_params_role_and_timing(self, authenticated_admin_client, recorder):
+        """A page view is traced with its route, query, the caller's role and duration."""
+        authenticated_admin_client.get('/users?page=2')
+        event = recorder.writer.emit.call_args.args[0]
+        assert event['route'] == '/users'
+        assert event['path'] == '/users'
+        assert event['query'] == {'page': ['2']}
+        assert event['role'] == 'super_admin'
+        assert event['status'] == 200
+        assert event['duration_ms'] > 0
+        assert 'user' not in event and 'username' not in event
+
+    def test_json_body_is_sanitized(self, authenticated_admin_client, recorder):
+        """The password in a new user's JSON body never reaches the trace."""
+        with patch('app.get_ldap_connection', return_value=None):
+            authenticated_admin_client.post('/api/users', json={'username': 'zed', 'password': 'secret123'})
+        event = recorder.writer.emit.call_args.args[0]
+        assert event['route'] == '/api/users'
+        assert event['json'] == {'username': pseudonym('zed', SALT), 'password': REDACTED}
+
+    def test_no_submitted_value_or_path_username_recorded(self, authenticated_admin_client, recorder):
+        """Submitted fields and usernames in paths only appear as pseudonyms, which line up."""
+        user = {'username': 'zedediah', 'first_name': 'Zedediah', 'last_name': 'Quarrington',
+                'email': 'zq@tak.local', 'password': 'secret123'}
+        with patch('app.get_ldap_connection', return_value=None):
+            authenticated_admin_client.post('/api/users', json=user)
+            authenticated_admin_client.delete('/api/users/zedediah')
+            authenticated_admin_client.get('/api/audit?user=zedediah&limit=5')
+            authenticated_admin_client.get('/no/such/zedediah')
+        events = [c.args[0] for c in recorder.writer.emit.call_args_list]
+        trace = json.dumps(events).lower()
+        for value in user.values():
+            assert value.lower() not in trace
+        assert 'zq' not in trace and 'tak.local' not in trace
+        created, deleted, audit, missing = events
+        assert deleted['route'] == '/api/users/<username>'
+        assert deleted['path'] == f"/api/users/{created['json']['username']}"
+        assert audit['query'] == {'user': [created['json']['username']], 'limit': ['5']}
+        assert missing['path'].startswith('/u')
+
+    def test_sampling_and_skipped_endpoints(self, client, recorder):
+        """Metrics scrapes are never recorded; a zero sample rate records nothing."""
+        with patch.dict('os.environ', {'METRICS_PUBLIC': 'true'}):
+            client.get('/metrics')
+        recorder.writer.emit.assert_not_called()
+        recorder.sample_rate = 0
+        client.get('/login')
+        recorder.writer.emit.assert_not_called()
+
+class TestReplay:
+    """Test the replay driver's request building and report."""
+
+    def test_build_request(self):
+        """Redacted values are refilled and the session's CSRF token is sent."""
+        trace = {'method': 'POST', 'path': '/api/users', 'query': {'v': ['1']},
+                 'json': {'username': 'zed', 'password': REDACTED}}
+        method, path, body, headers = replay.build_request(trace, 'tok')
+        assert (method, path) == ('POST', '/api/users?v=1')
+        sent = json.loads(body)
+        assert sent['username'] == 'zed' and sent['password'] != REDACTED and len(sent['password']) >= 6
+        assert headers == {'X-CSRFToken': 'tok', 'Content-Type': 'application/json'}
+
+    def test_form_request_carries_csrf_field(self):
+        """Form posts get the session's token as a form field."""
+        trace = {'method': 'POST', 'path': '/login', 'form': {'username': ['alice'], 'password': REDACTED}}
+        body = replay.build_request(trace, 'tok')[2]
+        assert 'username=alice' in body and 'csrf_token=tok' in body
+
+    def test_summarize(self):
+        """Errors, status mismatches and per-route percentiles are reported."""
+        results = [
+            {'route': 'GET /a', 'status': 200, 'recorded_status': 200, 'error': False, 'latency': 0.010, 'lag': 0.0},
+            {'route': 'GET /a', 'status': 500, 'recorded_status': 200, 'error': True, 'latency': 0.030, 'lag': 0.001},
+            {'route': 'GET /b', 'status': None, 'recorded_status': 200, 'error': True, 'latency': 1.0, 'lag': 0.002},
+        ]
+        report = replay.summarize(results, skipped=1, wall=2.0)
+        assert report['requests'] == 3
+        assert report['error_rate'] == round(2 / 3, 4)
+        assert report['status_mismatches'] == 2
+        assert report['throughput_rps'] == 1.5
+        assert report['routes']['GET /a']['statuses'] == {'200': 1, '500': 1}
+        assert report['routes']['GET /a']['p99_ms'] == 30.0
@@ -0,0 +1,98 @@
+import hashlib
+import hmac
+import random
+import re
+import secrets
+
+REDACTED = '<redacted>'
+
+# Parameter names whose values are never written to a trace
+SENSITIVE = re.compile(r'pass|secret|token|key|auth|cookie|session|otp', re.IGNORECASE)
+# Parameters only meaningful to the session that sent them; replay supplies its own
+DROPPED = {'csrf_token'}
+# Parameters holding enumerations, numbers or audit cursors. Every other
+# string (usernames, names, emails, group names, redirect targets) is
+# identifying and is written as a pseudonym.
+PLAIN = {'action', 'since', 'cursor', 'limit', 'page', 'format', 'seconds', 'top', 'collect', 'trace',
+         '__profile', '__profile_format'}
+URL_VARIABLE = re.compile(r'<(?:[^<>:]+:)?([^<>]+)>')
+MAX_BODY_BYTES = 64 * 1024
+
+def pseudonym(value, salt):
+    """Stable stand-in for value: the same value gives the same pseudonym under one salt.
+
+    Emails stay emails so replayed forms still validate.
+    """
+    digest = hmac.new(salt, value.strip().lower().encode('utf-8'), hashlib.sha256).hexdigest()[:16]
+    return f'u{digest}@example.com' if '@' in value else f'u{digest}'
+
+def sanitize(value, salt, name=''):
+    """Copy of a parameter mapping or JSON value with sensitive values redacted
+    and identifying strings replaced by pseudonyms"""
+    if name and SENSITIVE.search(name):
+        return REDACTED
+    if isinstance(value, dict):
+        return {key: sanitize(item, salt, key) for key, item in value.items() if key not in DROPPED}
+    if isinstance(value, list):
+        return [sanitize(item, salt, name) for item in value]
+    if isinstance(value, str) and name not in PLAIN:
+        return pseudonym(value, salt)
+    return value
+
+def sanitize_path(request, salt):
+    """The request path with every URL variable (a username, say) replaced by its pseudonym"""
+    if request.url_rule is None:
+        # Unrouted paths can hold anything; keep only something that still 404s
+        return '/' + pseudonym(request.path, salt)
+    values = request.view_args or {}
+    return URL_VARIABLE.sub(lambda match: str(sanitize(values.get(match.group(1), ''), salt, match.group(1))),
+                            request.url_rule.rule)
+
+class TrafficRecorder:
+    """Writes a sanitized trace of each sampled request for later replay.
+
+    A trace holds the route, path, query and form parameters, JSON body,
+    the caller's role, response status and timing, never who the caller
+    was. Values of parameters that look like credentials are replaced by
+    REDACTED and CSRF tokens are dropped. Usernames and other identifying
+    strings, in parameters and in the path, are replaced by pseudonyms
+    keyed with salt, so a user created and later deleted still lines up in
+    the trace. Events go to writer (anything with emit(event)), so
+    recording costs the request one queue put.
+    """
+
+    def __init__(self, writer, sample_rate=1.0, skip_endpoints=('static', 'metrics'), salt=None):
+        self.writer = writer
+        self.sample_rate = sample_rate
+        self.salt = salt or secrets.token_bytes(16)
+        self.skip_endpoints = set(skip_endpoints)
+        self.recorded = 0
+
+    def wants(self, request, response):
+        if request.endpoint in self.skip_endpoints or response.is_streamed:
+            return False
+        return self.sample_rate >= 1 or random.random() < self.sample_rate
+
+    def record(self, request, response, role, started_at, duration):
+        event = {
+            'ts': round(started_at, 6),
+            'method': request.method,
+            'route': str(request.url_rule) if request.url_rule else None,
+            'endpoint': request.endpoint,
+            'path': sanitize_path(request, self.salt),
+            'query': sanitize(request.args.to_dict(flat=False), self.salt),
+            'role': role,
+            'status': response.status_code,
+            'duration_ms': round(duration * 1000, 3)
+        }
+        if request.content_length and request.content_length > MAX_BODY_BYTES:
+            event['body_omitted'] = request.content_length
+        elif request.is_json:
+            event['json'] = sanitize(request.get_json(silent=True), self.salt)
+        elif request.form:
+            event['form'] = sanitize(request.form.to_dict(flat=False), self.salt)
+        self.writer.emit(event)
+        self.recorded += 1
+
+    def snapshot(self):
+        return {'recorded': self.recorded, 'sample_rate': self.sample_rate}